@@ -1,4 +1,5 @@
 import os
+import socket
 
 API_ID = int(os.getenv("API_ID", "25617967"))
 API_HASH = os.getenv("API_HASH", "10555bea1cdfc7d2303fc13b7fd187cc")
@@ -22,6 +23,17 @@ PROGRESS_UPDATE_INTERVAL = int(os.getenv("PROGRESS_UPDATE_INTERVAL", "5"))
 if PROGRESS_UPDATE_INTERVAL < 1:
     PROGRESS_UPDATE_INTERVAL = 5
 
+# ⬇️ Direct download: parallel HTTP Range connections per file (1 = single stream)
+DOWNLOAD_CONNECTIONS = int(os.getenv("DOWNLOAD_CONNECTIONS", "4"))
+if DOWNLOAD_CONNECTIONS < 1:
+    DOWNLOAD_CONNECTIONS = 1
+
+# Isse chhoti files hamesha single stream me aayengi (MB)
+SEGMENTED_MIN_SIZE_MB = int(os.getenv("SEGMENTED_MIN_SIZE_MB", "8"))
+
+# Connection toot jaye to .part se kitni baar resume try kare
+DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "5"))
+
 # Telegram per-file limit (approx 2GB)
 MAX_FILE_SIZE = 2 * 1024 * 1024 * 1024  # bytes
 
@@ -34,10 +46,110 @@ LOG_CHANNEL = int(os.getenv("LOG_CHANNEL", "-1002256697098"))  # -100...
 
 BOT_USERNAME = os.getenv("BOT_USERNAME", "ProDemooBot")
 
-# Proxy support (optional)
-PROXY_URL = os.getenv("PROXY_URL", "").strip()
+# Proxy support (optional) – HTTP_PROXY / HTTPS_PROXY bhi chalega
+PROXY_URL = (
+    os.getenv("PROXY_URL", "").strip()
+    or os.getenv("HTTP_PROXY", "").strip()
+    or os.getenv("HTTPS_PROXY", "").strip()
+)
 PROXIES = {"http": PROXY_URL, "https": PROXY_URL} if PROXY_URL else None
 
+# 🌐 Shared aiohttp client (poore process ke liye ek connection pool)
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))            # total open connections
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "16"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))      # seconds
+HTTP_KEEPALIVE_TIMEOUT = int(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))  # seconds
+
+# 🔍 URL probe (HEAD + ranged GET) ka strict deadline, seconds
+PROBE_TIMEOUT = float(os.getenv("PROBE_TIMEOUT", "8"))
+
+# ⚙️ yt-dlp extraction / download alag processes me (max itne ek saath)
+YTDLP_WORKERS = int(os.getenv("YTDLP_WORKERS", "2"))
+YTDLP_EXTRACT_TIMEOUT = int(os.getenv("YTDLP_EXTRACT_TIMEOUT", "90"))     # seconds
+YTDLP_DOWNLOAD_TIMEOUT = int(os.getenv("YTDLP_DOWNLOAD_TIMEOUT", "3600"))  # seconds
+
+# Quality list wala info dict download ke liye kitni der reuse ho sakta hai
+# (agar format URLs me apna expiry na ho), seconds
+YTDLP_INFO_TTL = int(os.getenv("YTDLP_INFO_TTL", "600"))
+
+# 🗃 Probe / format extraction result cache
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2000"))
+CACHE_MAX_MB = int(os.getenv("CACHE_MAX_MB", "64"))            # in-process memory budget
+CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", "600"))  # seconds
+CACHE_NEGATIVE_TTL = int(os.getenv("CACHE_NEGATIVE_TTL", "60"))  # failures kitni der yaad rahein
+# per-host TTL override: "youtube.com=1800,instagram.com=300"
+CACHE_HOST_TTLS = {
+    k.strip().lower(): int(v)
+    for k, v in (
+        x.split("=", 1)
+        for x in os.getenv(
+            "CACHE_HOST_TTLS",
+            "youtube.com=1800,youtu.be=1800,instagram.com=300,facebook.com=300,tiktok.com=300",
+        ).split(",")
+        if "=" in x and x.split("=", 1)[1].strip().isdigit()
+    )
+}
+# Mongo shared tier (kai bot instances ek hi cache use karein): "1" = on
+SHARED_CACHE = os.getenv("SHARED_CACHE", "0").strip() == "1"
+
+# 📦 Same URL + quality dobara aaye to already uploaded file_id se turant bhejo
+MEDIA_CACHE = os.getenv("MEDIA_CACHE", "1").strip() == "1"
+
+# 📡 Size pehle se pata ho (range download) to download ke saath-saath upload
+STREAM_UPLOAD = os.getenv("STREAM_UPLOAD", "1").strip() == "1"
+STREAM_UPLOAD_MIN_MB = int(os.getenv("STREAM_UPLOAD_MIN_MB", "20"))
+
+# ⬆️ Badi files ke parts itne media sessions (connections) x workers se parallel
+UPLOAD_SESSIONS = int(os.getenv("UPLOAD_SESSIONS", "3"))            # 0 = pyrogram default upload
+UPLOAD_WORKERS_PER_SESSION = int(os.getenv("UPLOAD_WORKERS_PER_SESSION", "4"))
+UPLOAD_PART_RETRIES = int(os.getenv("UPLOAD_PART_RETRIES", "5"))
+
+# 💾 Complete downloads ka local content store (0 = band)
+DOWNLOAD_STORE_DIR = os.getenv("DOWNLOAD_STORE_DIR", "download_store")
+DOWNLOAD_STORE_MAX_MB = int(os.getenv("DOWNLOAD_STORE_MAX_MB", "2048"))
+
+# 🧵 Job queue: ek saath max itne download -> upload jobs (global + per user)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_PER_USER = int(os.getenv("JOB_PER_USER", "1"))
+# Scheduler: plan lanes ka weight (premium ko itne guna zyada slots milte hain)
+JOB_PREMIUM_WEIGHT = int(os.getenv("JOB_PREMIUM_WEIGHT", "3"))
+JOB_FREE_WEIGHT = int(os.getenv("JOB_FREE_WEIGHT", "1"))
+# chhoti files ke liye alag express workers (badi files inhe block nahi kar saktin)
+JOB_EXPRESS_WORKERS = int(os.getenv("JOB_EXPRESS_WORKERS", "1"))
+JOB_EXPRESS_MB = int(os.getenv("JOB_EXPRESS_MB", "50"))
+# ETA estimate: pehla job khatam hone tak maana hua speed, MB/s
+JOB_EST_MBPS = float(os.getenv("JOB_EST_MBPS", "4"))
+
+# 🗂 Har job ki alag working directory (download + thumbnail / sample / screenshots)
+#   DOWNLOAD_STORE_DIR ke saath same disk pe rakho (hardlink, copy nahi)
+WORKSPACE_DIR = os.getenv("WORKSPACE_DIR", "workspaces")
+# saare job workspaces ka max total (0 = sirf disk watermark)
+WORKSPACE_MAX_MB = int(os.getenv("WORKSPACE_MAX_MB", "0"))
+# naya job tabhi shuru jab uske reserve ke baad bhi disk pe itna free bache
+WORKSPACE_MIN_FREE_MB = int(os.getenv("WORKSPACE_MIN_FREE_MB", "1024"))
+
+# 🖧 Multi-node: har process ka unique naam + role
+#   all    = handlers + job workers (single box, default)
+#   front  = sirf Telegram updates / handlers, jobs enqueue karta hai
+#   worker = sirf queue se jobs chalata hai (updates nahi leta)
+#   NODE_ID restart ke baad same rehna chahiye (workspaces / recovery); Docker
+#   me hostname har container pe badalta hai -> NODE_ID env set karo. Heroku
+#   pe DYNO (worker.1) stable hai. Purane naam ke workspaces dead-node sweep
+#   se saaf hote hain.
+NODE_ID = os.getenv("NODE_ID") or os.getenv("DYNO") or socket.gethostname()
+NODE_ROLE = os.getenv("NODE_ROLE", "all").lower()
+# worker job pe itne seconds ka lease leta hai (LEASE/3 pe renew); renew na
+# ho to job dusre node ko mil jata hai, max itni baar
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# khatam hue jobs (done / failed / cancelled) Mongo me itne ghante rehte hain
+JOB_RETENTION_HOURS = int(os.getenv("JOB_RETENTION_HOURS", "72"))
+
+# 🎞 ffmpeg / ffprobe child processes: ek saath max itne (0 = CPU cores)
+FFMPEG_CONCURRENCY = int(os.getenv("FFMPEG_CONCURRENCY", "0"))
+FFMPEG_TIMEOUT = int(os.getenv("FFMPEG_TIMEOUT", "1800"))   # remux / sample, seconds
+FFPROBE_TIMEOUT = int(os.getenv("FFPROBE_TIMEOUT", "60"))   # probe / ek frame, seconds
+
 # cookies.txt path (for yt-dlp)
 COOKIES_FILE = os.getenv("COOKIES_FILE", "/app/cookies.txt")
 
@@ -1,6 +1,6 @@
 from datetime import datetime
 import time
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
 from config import (
     MONGO_URI,
     DB_NAME,
@@ -12,12 +12,19 @@ from config import (
 )
 
 
-mongo_client = MongoClient(MONGO_URI)
+# connect=False: connection / monitor threads pehli query pe – sirf import
+# karne wale process (yt-dlp forkserver, utils/executor.py) me threads na bane
+mongo_client = MongoClient(MONGO_URI, connect=False)
 db = mongo_client[DB_NAME]
 
 users_col = db["users"]
 bans_col = db["banned"]
 stats_col = db["stats"]  # global stats
+cache_col = db["cache"]  # shared probe / format cache (optional tier)
+media_col = db["media_cache"]  # URL + format -> already uploaded Telegram file_id
+jobs_col = db["jobs"]  # download -> upload job queue
+nodes_col = db["nodes"]  # live bot processes (heartbeat)
+state_col = db["runtime_state"]  # per-user conversational state (sab nodes share karte hain)
 
 
 def today_str():
@@ -77,6 +84,7 @@ def get_user_doc(user_id: int):
             "caption": None,
             "spoiler": False,
             "send_screenshots": False,
+            "screens_tile": False,
             "send_sample": False,
             "sample_duration": 15,
             "prefix": "",
@@ -110,6 +118,7 @@ def get_user_doc(user_id: int):
     user.setdefault("caption", None)
     user.setdefault("spoiler", False)
     user.setdefault("send_screenshots", False)
+    user.setdefault("screens_tile", False)
     user.setdefault("send_sample", False)
     user.setdefault("sample_duration", 15)
     user.setdefault("prefix", "")
@@ -210,6 +219,10 @@ def set_screenshots(user_id: int, flag: bool):
     set_flag(user_id, "send_screenshots", flag)
 
 
+def set_screens_tile(user_id: int, flag: bool):
+    set_flag(user_id, "screens_tile", flag)
+
+
 def set_sample(user_id: int, flag: bool, duration: int | None = None):
     update = {"send_sample": flag}
     if duration is not None:
@@ -250,3 +263,269 @@ def get_stats():
         "uploaded": s.get("uploaded_bytes", 0),
         "jobs": s.get("total_jobs", 0),
         }
+
+
+# ---------------------- shared result cache ---------------------- #
+def ensure_cache_indexes():
+    # expires_at nikalte hi Mongo khud document hata deta hai
+    cache_col.create_index("expires_at", expireAfterSeconds=0)
+
+
+def shared_cache_get(key: str):
+    doc = cache_col.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+    return doc
+
+
+def shared_cache_set(key: str, payload: str, negative: bool, expires_at: datetime):
+    cache_col.update_one(
+        {"_id": key},
+        {"$set": {"payload": payload, "negative": negative, "expires_at": expires_at}},
+        upsert=True,
+    )
+
+
+def shared_cache_delete(key: str):
+    cache_col.delete_one({"_id": key})
+
+
+# ==========================================
+#   UPLOADED MEDIA (file_id) CACHE
+# ==========================================
+
+def ensure_media_indexes():
+    media_col.create_index(
+        [("url_key", 1), ("fmt", 1), ("upload_type", 1), ("variant", 1)], unique=True
+    )
+
+
+def get_cached_media(url_key: str, fmt: str, upload_type: str, variant: str):
+    return media_col.find_one(
+        {"url_key": url_key, "fmt": fmt, "upload_type": upload_type, "variant": variant}
+    )
+
+
+def save_cached_media(url_key: str, fmt: str, upload_type: str, variant: str, data: dict):
+    now = datetime.utcnow()
+    media_col.update_one(
+        {"url_key": url_key, "fmt": fmt, "upload_type": upload_type, "variant": variant},
+        {
+            "$set": {**data, "updated": now},
+            "$setOnInsert": {"created": now, "hits": 0},
+        },
+        upsert=True,
+    )
+
+
+def touch_cached_media(doc_id):
+    media_col.update_one(
+        {"_id": doc_id},
+        {"$inc": {"hits": 1}, "$set": {"last_hit": datetime.utcnow()}},
+    )
+
+
+def delete_cached_media(url_key: str, fmt: str | None = None) -> int:
+    query = {"url_key": url_key}
+    if fmt is not None:
+        query["fmt"] = fmt
+    return media_col.delete_many(query).deleted_count
+
+
+def delete_cached_media_by_id(doc_id):
+    media_col.delete_one({"_id": doc_id})
+
+
+def media_cache_summary() -> dict:
+    agg = list(
+        media_col.aggregate(
+            [{"$group": {"_id": None, "entries": {"$sum": 1}, "hits": {"$sum": "$hits"},
+                         "bytes": {"$sum": "$file_size"}}}]
+        )
+    )
+    if not agg:
+        return {"entries": 0, "hits": 0, "bytes": 0}
+    return {"entries": agg[0]["entries"], "hits": agg[0]["hits"], "bytes": agg[0]["bytes"]}
+
+
+# ==========================================
+#   JOB QUEUE
+# ==========================================
+
+def ensure_job_indexes():
+    jobs_col.create_index([("state", 1), ("created", 1)])
+    jobs_col.create_index([("user_id", 1), ("state", 1)])
+    jobs_col.create_index([("state", 1), ("lease_until", 1)])
+    jobs_col.create_index([("state", 1), ("updated", 1)])
+
+
+def insert_job(doc: dict):
+    now = datetime.utcnow()
+    doc = {**doc, "created": now, "updated": now}
+    return jobs_col.insert_one(doc).inserted_id
+
+
+def list_jobs(states: list, user_id: int | None = None) -> list:
+    """
+    Scheduler / queue view ke liye halki projection (bade fields nahi).
+    """
+    query = {"state": {"$in": states}}
+    if user_id is not None:
+        query["user_id"] = user_id
+    return list(
+        jobs_col.find(
+            query,
+            {"user_id": 1, "premium": 1, "size": 1, "state": 1, "created": 1,
+             "started": 1, "job.filename": 1},
+        ).sort("created", 1)
+    )
+
+
+def prune_jobs(states: list, before) -> int:
+    """
+    `before` se pehle khatam hue (states) jobs hatao. Returns deleted count.
+    """
+    res = jobs_col.delete_many({"state": {"$in": states}, "updated": {"$lt": before}})
+    return res.deleted_count
+
+
+def claim_job(job_id, from_state: str, to_state: str, owner: str | None = None, lease_until=None):
+    """
+    Atomic claim: job abhi bhi from_state me ho tabhi. Returns doc ya None.
+    owner / lease_until: kis node ne liya aur kab tak (multi-node).
+    """
+    now = datetime.utcnow()
+    return jobs_col.find_one_and_update(
+        {"_id": job_id, "state": from_state},
+        {"$set": {"state": to_state, "started": now, "updated": now,
+                  "owner": owner, "lease_until": lease_until}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def set_job_state(job_id, state: str, owner: str | None = None, **extra) -> bool:
+    """
+    owner diya ho to update tabhi jab job abhi bhi usi node ke lease pe hai.
+    Returns update hua ya nahi.
+    """
+    query = {"_id": job_id}
+    if owner is not None:
+        query["owner"] = owner
+    res = jobs_col.update_one(
+        query,
+        {"$set": {"state": state, "updated": datetime.utcnow(), **extra}},
+    )
+    return res.matched_count > 0
+
+
+def renew_job_lease(job_id, owner: str, states: list, lease_until) -> bool:
+    res = jobs_col.update_one(
+        {"_id": job_id, "owner": owner, "state": {"$in": states}},
+        {"$set": {"lease_until": lease_until}},
+    )
+    return res.matched_count > 0
+
+
+def reclaim_jobs(
+    query: dict, states: list, queued_state: str, failed_state: str, max_attempts: int,
+    penalize: bool = True,
+):
+    """
+    query + states se match hone wale jobs wapas queue me (checkpoint ke saath),
+    ya max_attempts ke baad failed. penalize=False (graceful stop) pe attempt
+    nahi ginta. Returns (requeued_docs, failed_docs).
+    """
+    requeued, failed = [], []
+    for doc in jobs_col.find({**query, "state": {"$in": states}}):
+        attempts = doc.get("attempts", 0) + (1 if penalize else 0)
+        give_up = attempts >= max_attempts
+        update = {
+            "state": failed_state if give_up else queued_state,
+            "attempts": attempts,
+            "owner": None,
+            "lease_until": None,
+            "updated": datetime.utcnow(),
+        }
+        if give_up:
+            update["error"] = "worker lost"
+        # query dobara: find ke baad owner ne lease renew kiya ho to match na ho
+        res = jobs_col.update_one(
+            {**query, "_id": doc["_id"], "state": doc["state"], "owner": doc.get("owner")},
+            {"$set": update},
+        )
+        if not res.modified_count:
+            continue
+        if give_up:
+            failed.append(doc)
+        else:
+            requeued.append(doc)
+    return requeued, failed
+
+
+def save_job_checkpoint(job_id, owner: str, checkpoint: dict) -> bool:
+    """
+    Job ka last complete stage (crash / restart ke baad yahin se resume).
+    """
+    res = jobs_col.update_one(
+        {"_id": job_id, "owner": owner},
+        {"$set": {"checkpoint": {**checkpoint, "at": datetime.utcnow()}, "updated": datetime.utcnow()}},
+    )
+    return res.matched_count > 0
+
+
+def expired_lease_query(now) -> dict:
+    return {"$or": [{"lease_until": {"$lt": now}}, {"lease_until": None}]}
+
+
+def cancel_user_jobs(user_id: int, from_state: str, to_state: str) -> list:
+    """
+    Returns jo jobs sach me cancel hue unke ids.
+    """
+    ids = [d["_id"] for d in jobs_col.find({"user_id": user_id, "state": from_state}, {"_id": 1})]
+    cancelled = []
+    for job_id in ids:
+        res = jobs_col.update_one(
+            {"_id": job_id, "state": from_state},
+            {"$set": {"state": to_state, "updated": datetime.utcnow()}},
+        )
+        if res.modified_count:
+            cancelled.append(job_id)
+    return cancelled
+
+
+def node_heartbeat(node_id: str, info: dict):
+    nodes_col.update_one(
+        {"_id": node_id},
+        {"$set": {**info, "seen": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+def live_nodes(since) -> list:
+    return list(nodes_col.find({"seen": {"$gte": since}}))
+
+
+def remove_node(node_id: str):
+    nodes_col.delete_one({"_id": node_id})
+
+
+# ==========================================
+#   SHARED RUNTIME STATE
+# ==========================================
+
+def ensure_state_indexes():
+    state_col.create_index("expires_at", expireAfterSeconds=0)
+
+
+def state_get(key: str):
+    return state_col.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+
+
+def state_set(key: str, value, expires_at: datetime):
+    state_col.update_one(
+        {"_id": key},
+        {"$set": {"value": value, "expires_at": expires_at}},
+        upsert=True,
+    )
+
+
+def state_delete(key: str):
+    return state_col.find_one_and_delete({"_id": key})
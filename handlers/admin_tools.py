@@ -8,7 +8,14 @@ from database import (
     get_user_doc,
     users_col,
     get_users_count,
+    media_cache_summary,
 )
+from utils.metrics import recent_throughput, get_counter, hit_rate, counters
+from utils.cache import ALL_CACHES
+from utils.media_cache import invalidate_media
+from utils.file_store import download_store
+from utils.workspace import workspaces
+from utils.progress import human_readable, format_eta
 
 
 def register_admin_tools_handlers(app: Client):
@@ -17,6 +24,10 @@ def register_admin_tools_handlers(app: Client):
       - /refresh_user <user_id>
       - /refresh_all_users
       - /total_users
+      - /jobstats
+      - /cachestats
+      - /routestats
+      - /uncache <url> [format_id]
     """
 
     # ====================================
@@ -108,3 +119,158 @@ def register_admin_tools_handlers(app: Client):
             )
         except Exception as e:
             await message.reply_text(f"❌ Error: `{e}`")
+
+    # ====================================
+    #       DOWNLOAD THROUGHPUT SAMPLES
+    # ====================================
+    @app.on_message(filters.command("jobstats") & filters.user(ADMIN_IDS))
+    async def jobstats_handler(client: Client, message: Message):
+        """
+        /jobstats
+        -> Recent download jobs ka throughput (avg / peak speed) dikhata hai.
+        """
+        try:
+            jobs = recent_throughput(10)
+            if not jobs:
+                return await message.reply_text("📉 Abhi koi throughput sample nahi hai.")
+
+            lines = []
+            for j in jobs:
+                total = human_readable(j["total"]) if j["total"] else "?"
+                name = j["job"]
+                if len(name) > 40:
+                    # " #<n>" suffix dikhe – same naam ke jobs alag pehchane jayen
+                    name = name[:30] + "…" + name[-9:]
+                lines.append(
+                    f"• `{name}`\n"
+                    f"   {human_readable(j['done'])}/{total} in {format_eta(j['elapsed'])} | "
+                    f"avg {human_readable(int(j['avg_speed']))}/s | "
+                    f"peak {human_readable(int(j['peak_speed']))}/s | "
+                    f"{j['samples']} samples"
+                )
+            fs = counters("faststart.")
+            if fs:
+                lines.append(
+                    "\n🎞 Faststart: "
+                    f"in-place {fs.get('faststart.in_place', 0)} | "
+                    f"remux {fs.get('faststart.remux', 0)} | "
+                    f"already ok {fs.get('faststart.skip', 0)} | "
+                    f"non-mp4 {fs.get('faststart.not_mp4', 0)}"
+                )
+            ws = workspaces.stats()
+            lines.append(
+                f"\n🗂 Workspaces: {ws['active']} active | "
+                f"used {human_readable(ws['used'])} | "
+                f"reserved {human_readable(ws['reserved'])} | "
+                f"disk free {human_readable(ws['free'])}"
+            )
+            for key, (used, peak) in ws["jobs"].items():
+                lines.append(f"   `{key}` {human_readable(used)} (peak {human_readable(peak)})")
+            await message.reply_text("📈 Recent download throughput:\n\n" + "\n".join(lines))
+        except Exception as e:
+            await message.reply_text(f"❌ Error: `{e}`")
+
+    # ====================================
+    #       PROBE / FORMAT CACHE STATS
+    # ====================================
+    @app.on_message(filters.command("cachestats") & filters.user(ADMIN_IDS))
+    async def cachestats_handler(client: Client, message: Message):
+        """
+        /cachestats
+        -> probe / resolve / formats cache ka hit-rate aur size.
+        """
+        try:
+            lines = []
+            for cache in ALL_CACHES:
+                st = cache.stats()
+                prefix = f"cache.{st['name']}"
+                lines.append(
+                    f"• **{st['name']}** – {st['entries']} entries, "
+                    f"{human_readable(st['bytes'])}"
+                    f"{' (shared)' if st['shared'] else ''}\n"
+                    f"   hit {get_counter(prefix + '.hit')} | "
+                    f"miss {get_counter(prefix + '.miss')} | "
+                    f"negative {get_counter(prefix + '.negative_hit')} | "
+                    f"evict {get_counter(prefix + '.evict')} | "
+                    f"hit-rate {hit_rate(prefix) * 100:.1f}%"
+                )
+
+            media = media_cache_summary()
+            lines.append(
+                f"• **uploaded media** – {media['entries']} file_ids, "
+                f"{human_readable(media['bytes'] or 0)}, {media['hits']} re-deliveries\n"
+                f"   hit {get_counter('media_cache.hit')} | "
+                f"miss {get_counter('media_cache.miss')} | "
+                f"stale {get_counter('media_cache.stale')} | "
+                f"hit-rate {hit_rate('media_cache') * 100:.1f}%"
+            )
+
+            store = download_store.stats()
+            lines.append(
+                f"• **download store** – {store['blobs']} files, "
+                f"{human_readable(store['bytes'])}/{human_readable(store['max_bytes'])}, "
+                f"{store['pinned']} pinned\n"
+                f"   hit {get_counter('store.hit')} | "
+                f"miss {get_counter('store.miss')} | "
+                f"dedup {get_counter('store.dedup')} | "
+                f"evict {get_counter('store.evict')}"
+            )
+            await message.reply_text("🗃 Cache stats:\n\n" + "\n".join(lines))
+        except Exception as e:
+            await message.reply_text(f"❌ Error: `{e}`")
+
+    # ====================================
+    #       URL ROUTE COUNTERS
+    # ====================================
+    @app.on_message(filters.command("routestats") & filters.user(ADMIN_IDS))
+    async def routestats_handler(client: Client, message: Message):
+        """
+        /routestats
+        -> Kitne links direct fast path se gaye, kitne yt-dlp extraction se,
+           aur kitne requests chalti hui same job se attach hue.
+        """
+        try:
+            routes = counters("route.")
+            total = get_counter("route.direct") + get_counter("route.extract")
+            if not total:
+                return await message.reply_text("📉 Abhi tak koi link route nahi hua.")
+
+            lines = []
+            for name, count in routes.items():
+                label = name.split(".", 1)[1]
+                pct = f" ({count * 100 / total:.1f}%)" if label in ("direct", "extract") else ""
+                lines.append(f"• {label}: {count}{pct}")
+
+            # same link + format pe ek hi job (leader), baaki attach
+            flights = counters("singleflight.")
+            if flights:
+                lines.append("")
+                for name, count in flights.items():
+                    lines.append(f"• shared job {name.split('.', 1)[1]}: {count}")
+            await message.reply_text("🧭 URL routes:\n\n" + "\n".join(lines))
+        except Exception as e:
+            await message.reply_text(f"❌ Error: `{e}`")
+
+    # ====================================
+    #       UPLOADED MEDIA CACHE INVALIDATE
+    # ====================================
+    @app.on_message(filters.command("uncache") & filters.user(ADMIN_IDS))
+    async def uncache_handler(client: Client, message: Message):
+        """
+        /uncache <url> [format_id]
+        -> Is URL ke cached uploads (file_id) + local store entries hata deta hai,
+           agli baar fresh download.
+        """
+        try:
+            if len(message.command) < 2:
+                return await message.reply_text("⚠️ Usage: /uncache url [format_id]")
+
+            url = message.command[1]
+            fmt_id = message.command[2] if len(message.command) > 2 else None
+            removed = invalidate_media(url, fmt_id)
+            local = download_store.forget(url, fmt_id)
+            await message.reply_text(
+                f"🗑 {removed} cached upload(s) aur {local} local download(s) hata diye gaye."
+            )
+        except Exception as e:
+            await message.reply_text(f"❌ Error: `{e}`")
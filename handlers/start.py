@@ -41,7 +41,8 @@ def help_text():
         "• Telegram file/video rename: `/rename new_name.ext` (reply)\n"
         "• Thumbnail, caption, spoiler, screenshots album, sample clip\n"
         "• Daily count + size limit, premium system, cooldown\n"
-        "• Upload type: Video ya Document (URL se aaya file)\n\n"
+        "• Upload type: Video ya Document (URL se aaya file)\n"
+        "• Chal raha yt-dlp scan/download rokna: `/cancel`\n\n"
         "🎛 Neeche buttons se quick settings toggle / manage kar sakte ho."
     )
 
@@ -1,7 +1,6 @@
 import os
 import re
 import time
-import requests
 from urllib.parse import urlparse, parse_qs
 
 from pyrogram import Client, filters
@@ -10,7 +9,6 @@ from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from database import (
     get_user_doc,
     is_banned,
-    update_stats,
     set_screenshots,
     set_sample,
     set_thumb,
@@ -18,27 +16,37 @@ from database import (
     set_upload_type,
 )
 from utils.downloader import (
-    get_formats,
-    download_direct_with_progress,
-    download_with_ytdlp,
-    head_info,
+    extract_formats,
+    info_expires_at,
+    resolve_url,
     is_video_ext,
 )
-from utils.uploader import upload_with_thumb_and_progress
+from utils.jobs import job_queue, render_queue
+from utils.probe import probe_url, effective_type, classify_url, ROUTE_DIRECT
+from utils.metrics import incr
 from utils.progress import human_readable
-from config import MAX_FILE_SIZE, NORMAL_COOLDOWN_SECONDS
+from utils.executor import ytdlp_executor, TaskCancelled
+from config import (
+    ADMIN_IDS,
+    MAX_FILE_SIZE,
+    NORMAL_COOLDOWN_SECONDS,
+)
 from handlers.start import help_text, help_keyboard, about_text
 from utils.forcesub import ensure_forcesub
 from utils.reactions import react_message
+from utils.state_store import SharedState
 
 # simple URL regex
 URL_REGEX = r"https?://[^\s]+"
 
-# per-user pending job state (URL download)
-PENDING_DOWNLOAD: dict[int, dict] = {}
+# per-user pending job state (URL download) – Mongo me, taki multi-node setup
+# me rename / quality callback kisi bhi front node pe aaye.
+# yt-dlp ka "info" sirf is process me (dusre node pe pipeline fresh extract karega).
+# NOTE: state badalne ke baad `PENDING_DOWNLOAD[user_id] = state` se save karo.
+PENDING_DOWNLOAD = SharedState("pending_download", ttl=3600, local_keys=("info",))
 
 # thumbnail ke liye pending photo state
-THUMB_PENDING: dict[int, bool] = {}
+THUMB_PENDING = SharedState("thumb_pending", ttl=600)
 
 
 # ---------------------- helpers ---------------------- #
@@ -172,6 +180,34 @@ def register_url_handlers(app: Client):
         except Exception:
             pass
 
+    # ==============================
+    #   CANCEL RUNNING yt-dlp TASK + QUEUED JOBS
+    # ==============================
+    @app.on_message(filters.private & filters.command("cancel"))
+    async def cancel_cmd(client: Client, message: Message):
+        user_id = message.from_user.id
+        killed = ytdlp_executor.cancel(user_id)
+        dropped = job_queue.cancel_queued(user_id)
+        lines = []
+        if killed:
+            lines.append("🛑 Aapka chal raha yt-dlp task cancel kar diya gaya.")
+        if dropped:
+            lines.append(f"🗑 Queue se {dropped} job(s) hata diye gaye.")
+        if not lines:
+            lines.append("ℹ️ Abhi aapka koi yt-dlp task ya queued job nahi hai.")
+        await message.reply_text("\n".join(lines))
+
+    # ==============================
+    #   QUEUE STATUS
+    # ==============================
+    @app.on_message(filters.private & filters.command("queue"))
+    async def queue_cmd(client: Client, message: Message):
+        user_id = message.from_user.id
+        try:
+            await message.reply_text(render_queue(user_id, admin=user_id in ADMIN_IDS))
+        except Exception as e:
+            await message.reply_text(f"❌ Error: `{e}`")
+
     # ==============================
     #   MAIN URL MESSAGE HANDLER
     # ==============================
@@ -193,6 +229,8 @@ def register_url_handlers(app: Client):
                 "spoiler_off",
                 "screens_on",
                 "screens_off",
+                "screens_tile",
+                "screens_album",
                 "sample_on",
                 "sample_off",
                 "setsample",
@@ -210,6 +248,8 @@ def register_url_handlers(app: Client):
                 "unban",
                 "broadcast",
                 "banlist",
+                "cancel",
+                "queue",
             ]
         )
     )
@@ -263,6 +303,7 @@ def register_url_handlers(app: Client):
                         reply_markup=build_quality_keyboard(formats),
                     )
                     state["mode"] = "await_quality"
+                    PENDING_DOWNLOAD[user_id] = state
                     try:
                         await react_message(client, message, "rename")
                     except Exception:
@@ -286,32 +327,17 @@ def register_url_handlers(app: Client):
                     progress_msg = await message.reply_text("⬇️ Downloading...")
 
                     try:
-                        path, downloaded_bytes = await download_direct_with_progress(
-                            url, filename, progress_msg
+                        await job_queue.enqueue(
+                            client,
+                            message,
+                            progress_msg,
+                            user_id,
+                            {"url": url, "fmt_id": None, "filename": filename, "size": head_size},
                         )
-                        file_size = os.path.getsize(path)
-                        if file_size > MAX_FILE_SIZE:
-                            await message.reply_text(
-                                "❌ File Telegram limit se badi hai, upload nahi ho sakti."
-                            )
-                            os.remove(path)
-                            del PENDING_DOWNLOAD[user_id]
-                            return
-
-                        update_stats(downloaded=downloaded_bytes, uploaded=0)
-
-                        await upload_with_thumb_and_progress(
-                            client, message, path, user_id, progress_msg
-                        )
-                        try:
-                            await react_message(client, message, "success")
-                        except Exception:
-                            pass
                     except Exception as e:
                         await message.reply_text(f"❌ Error: `{e}`")
                     finally:
-                        if user_id in PENDING_DOWNLOAD:
-                            del PENDING_DOWNLOAD[user_id]
+                        PENDING_DOWNLOAD.pop(user_id, None)
                     return
 
         # =========================
@@ -323,7 +349,8 @@ def register_url_handlers(app: Client):
             # random text → ignore (koi warning nahi)
             return
 
-        url = match.group(0)
+        # share / redirect links ko ek hi baar resolve karo (shared HTTP pool)
+        url = await resolve_url(match.group(0))
 
         try:
             await react_message(client, message, "url")
@@ -364,7 +391,10 @@ def register_url_handlers(app: Client):
             "🔍 Link deep scan ho raha hai (`HEAD` + `yt-dlp`)..."
         )
 
-        head_size, head_ctype, head_fname = head_info(url)
+        probe = await probe_url(url)
+        head_size = probe["size"]
+        head_ctype = effective_type(probe) or None
+        head_fname = probe["filename"]
 
         remaining_size = None
         if limit_s and limit_s > 0:
@@ -384,12 +414,26 @@ def register_url_handlers(app: Client):
                 )
                 return
 
+        # direct media (mp4 / zip / pdf ...) pe yt-dlp generic extractor chalana bekaar hai
+        route = classify_url(probe)
+        incr(f"route.{route}")
+
         # ========= 2.1 yt-dlp TRY =========
         try:
-            formats, info = get_formats(url) if is_ytdlp_site(url) else ([], None)
+            if route != ROUTE_DIRECT and is_ytdlp_site(url):
+                formats, info = await extract_formats(url, key=user_id)
+            else:
+                formats, info = [], None
+        except TaskCancelled:
+            await wait_msg.edit_text("🛑 Scan cancel kar diya gaya.")
+            return
         except Exception:
             formats, info = [], None
 
+        if route != ROUTE_DIRECT and not formats:
+            # extraction ne kuch nahi diya -> direct mode fallback
+            incr("route.extract_fallback")
+
         if formats:
             title = (
                 info.get("title", head_fname or "video")
@@ -424,6 +468,9 @@ def register_url_handlers(app: Client):
                 "custom_name": custom_name,
                 "head_size": head_size,
                 "thumb_url": thumb_url,  # direct_dl + fmt_ dono use karenge
+                # extracted info fmt_ download me reuse hoga (dobara extract_info nahi)
+                "info": info,
+                "info_expires": info_expires_at(info) if info else 0,
                 "mode": "await_name_choice",
             }
 
@@ -863,6 +910,7 @@ def register_url_handlers(app: Client):
                     reply_markup=build_quality_keyboard(formats),
                 )
                 state["mode"] = "await_quality"
+                PENDING_DOWNLOAD[user_id] = state
                 try:
                     await react_message(client, msg, "settings")
                 except Exception:
@@ -891,40 +939,18 @@ def register_url_handlers(app: Client):
 
                 progress_msg = await msg.edit_text("⬇️ Downloading...")
                 try:
-                    path, downloaded_bytes = await download_direct_with_progress(
-                        url, filename, progress_msg
+                    await job_queue.enqueue(
+                        client,
+                        msg,
+                        progress_msg,
+                        user_id,
+                        {"url": url, "fmt_id": None, "filename": filename, "size": head_size},
+                        remaining_size=remaining_size,
                     )
-                    file_size = os.path.getsize(path)
-                    if file_size > MAX_FILE_SIZE:
-                        await msg.edit_text(
-                            "❌ File Telegram limit se badi hai, upload nahi ho sakti."
-                        )
-                        os.remove(path)
-                        del PENDING_DOWNLOAD[user_id]
-                        return
-
-                    if remaining_size is not None and file_size > remaining_size:
-                        await msg.edit_text(
-                            "⛔ Daily size limit exceed ho jayega is file se.\n"
-                            f"Remain: {human_readable(remaining_size)}, File: {human_readable(file_size)}"
-                        )
-                        os.remove(path)
-                        del PENDING_DOWNLOAD[user_id]
-                        return
-
-                    update_stats(downloaded=downloaded_bytes, uploaded=0)
-                    await upload_with_thumb_and_progress(
-                        client, msg, path, user_id, progress_msg
-                    )
-                    try:
-                        await react_message(client, msg, "success")
-                    except Exception:
-                        pass
                 except Exception as e:
                     await msg.edit_text(f"❌ Error: `{e}`")
                 finally:
-                    if user_id in PENDING_DOWNLOAD:
-                        del PENDING_DOWNLOAD[user_id]
+                    PENDING_DOWNLOAD.pop(user_id, None)
                 return
 
         # -------- name_rename ----------
@@ -935,6 +961,7 @@ def register_url_handlers(app: Client):
                 "example: `my_video.mp4`"
             )
             state["rename_prompt_msg_id"] = prompt.id
+            PENDING_DOWNLOAD[user_id] = state
             try:
                 await react_message(client, msg, "rename")
             except Exception:
@@ -950,72 +977,26 @@ def register_url_handlers(app: Client):
 
             progress_msg = await msg.edit_text("⬇️ Direct download try ho raha hai...")
 
-            # YouTube / site thumbnail agar available ho to pahle download karo
-            job_thumb_path = None
-            thumb_url = state.get("thumb_url")
-            if thumb_url:
-                try:
-                    r = requests.get(thumb_url, stream=True, timeout=10)
-                    r.raise_for_status()
-                    job_thumb_path = f"yt_thumb_direct_{user_id}.jpg"
-                    with open(job_thumb_path, "wb") as f:
-                        for chunk in r.iter_content(chunk_size=1024 * 8):
-                            if not chunk:
-                                continue
-                            f.write(chunk)
-                except Exception:
-                    job_thumb_path = None
-
             try:
-                path, downloaded_bytes = await download_direct_with_progress(
-                    state["url"], state["filename"], progress_msg
+                await job_queue.enqueue(
+                    client,
+                    msg,
+                    progress_msg,
+                    user_id,
+                    {
+                        "url": state["url"],
+                        "fmt_id": None,
+                        "filename": state["filename"],
+                        "size": state.get("head_size", 0),
+                        # YouTube / site thumbnail agar available ho
+                        "thumb_url": state.get("thumb_url"),
+                    },
+                    remaining_size=remaining_size,
                 )
             except Exception as e:
-                await msg.edit_text(f"❌ Direct download fail: `{e}`")
-                if job_thumb_path and os.path.exists(job_thumb_path):
-                    os.remove(job_thumb_path)
-                if user_id in PENDING_DOWNLOAD:
-                    del PENDING_DOWNLOAD[user_id]
-                return
-
-            file_size = os.path.getsize(path)
-            if file_size > MAX_FILE_SIZE:
-                await msg.edit_text("❌ File Telegram limit se badi hai, upload nahi ho sakti.")
-                try:
-                    os.remove(path)
-                except Exception:
-                    pass
-                if job_thumb_path and os.path.exists(job_thumb_path):
-                    os.remove(job_thumb_path)
-                if user_id in PENDING_DOWNLOAD:
-                    del PENDING_DOWNLOAD[user_id]
-                return
-
-            if remaining_size is not None and file_size > remaining_size:
-                await msg.edit_text(
-                    "⛔ Daily size limit exceed ho jayega is file se.\n"
-                    f"Remain: {human_readable(remaining_size)}, File: {human_readable(file_size)}"
-                )
-                try:
-                    os.remove(path)
-                except Exception:
-                    pass
-                if job_thumb_path and os.path.exists(job_thumb_path):
-                    os.remove(job_thumb_path)
-                if user_id in PENDING_DOWNLOAD:
-                    del PENDING_DOWNLOAD[user_id]
-                return
-
-            update_stats(downloaded=downloaded_bytes, uploaded=0)
-            await upload_with_thumb_and_progress(
-                client, msg, path, user_id, progress_msg, job_thumb_path=job_thumb_path
-            )
-            if user_id in PENDING_DOWNLOAD:
-                del PENDING_DOWNLOAD[user_id]
-            try:
-                await react_message(client, msg, "success")
-            except Exception:
-                pass
+                await msg.edit_text(f"❌ Error: `{e}`")
+            finally:
+                PENDING_DOWNLOAD.pop(user_id, None)
             return
 
         # -------- fmt_<id> (quality select) ----------
@@ -1037,72 +1018,26 @@ def register_url_handlers(app: Client):
                 del PENDING_DOWNLOAD[user_id]
                 return
 
-            await msg.edit_text(
-                f"⬇️ `{fmt_id}` quality me download ho raha hai... (yt-dlp)\n"
-                f"📄 File: `{filename}`"
-            )
-
-            tmp_name = "temp_ytdlp_video"
-
             try:
-                path = download_with_ytdlp(url, fmt_id, tmp_name)
-                final_path = filename
-                os.replace(path, final_path)
-                path = final_path
-            except Exception as e:
-                await msg.edit_text(f"❌ yt-dlp download fail: `{e}`")
-                if os.path.exists(tmp_name):
-                    os.remove(tmp_name)
-                del PENDING_DOWNLOAD[user_id]
-                return
-
-            file_size = os.path.getsize(path)
-            if file_size > MAX_FILE_SIZE:
-                await msg.edit_text("❌ File Telegram limit se badi hai, upload nahi ho sakti.")
-                os.remove(path)
-                del PENDING_DOWNLOAD[user_id]
-                return
-
-            if remaining_size is not None and file_size > remaining_size:
-                await msg.edit_text(
-                    "⛔ Daily size limit exceed ho jayega is file se.\n"
-                    f"Remain: {human_readable(remaining_size)}, File: {human_readable(file_size)}"
+                await job_queue.enqueue(
+                    client,
+                    msg,
+                    msg,
+                    user_id,
+                    {
+                        "url": url,
+                        "fmt_id": fmt_id,
+                        "filename": filename,
+                        "size": fmt_size,
+                        "thumb_url": state.get("thumb_url"),
+                        # extracted info reuse (signed URLs valid hon tab tak)
+                        "info": state.get("info"),
+                        "info_expires": state.get("info_expires", 0),
+                    },
+                    remaining_size=remaining_size,
                 )
-                os.remove(path)
-                del PENDING_DOWNLOAD[user_id]
-                return
-
-            # YouTube / site original thumbnail – final upload ke liye
-            job_thumb_path = None
-            thumb_url = state.get("thumb_url")
-            if thumb_url:
-                try:
-                    r = requests.get(thumb_url, stream=True, timeout=10)
-                    r.raise_for_status()
-                    job_thumb_path = f"yt_thumb_{user_id}.jpg"
-                    with open(job_thumb_path, "wb") as f:
-                        for chunk in r.iter_content(chunk_size=1024 * 8):
-                            if not chunk:
-                                continue
-                            f.write(chunk)
-                except Exception:
-                    job_thumb_path = None
-
-            update_stats(downloaded=0, uploaded=0)
-            progress_msg = await msg.edit_text("📤 Upload start ho raha hai...")
-
-            await upload_with_thumb_and_progress(
-                client,
-                msg,
-                path,
-                user_id,
-                progress_msg,
-                job_thumb_path=job_thumb_path,
-            )
-
-            del PENDING_DOWNLOAD[user_id]
-            try:
-                await react_message(client, msg, "success")
-            except Exception:
-                pass
+            except Exception as e:
+                await msg.edit_text(f"❌ Error: `{e}`")
+            finally:
+                PENDING_DOWNLOAD.pop(user_id, None)
             return
@@ -10,9 +10,11 @@ from database import (
     set_suffix,
     set_spoiler,
     set_screenshots,
+    set_screens_tile,
     set_sample,
 )
 from utils.uploader import upload_with_thumb_and_progress
+from utils.workspace import workspaces, WorkspaceFull
 from utils.forcesub import ensure_forcesub
 from utils.reactions import pick_reaction
 
@@ -218,6 +220,32 @@ def register_user_settings_handlers(app: Client):
         except Exception:
             pass
 
+    @app.on_message(filters.command("screens_tile") & filters.private)
+    async def screens_tile(client: Client, message: Message):
+        if is_banned(message.from_user.id):
+            return
+        if not await ensure_forcesub(client, message):
+            return
+        set_screens_tile(message.from_user.id, True)
+        await message.reply_text("✅ Screenshots ab ek hi image (contact sheet) me aayenge.")
+        try:
+            await message.react(pick_reaction("settings"))
+        except Exception:
+            pass
+
+    @app.on_message(filters.command("screens_album") & filters.private)
+    async def screens_album(client: Client, message: Message):
+        if is_banned(message.from_user.id):
+            return
+        if not await ensure_forcesub(client, message):
+            return
+        set_screens_tile(message.from_user.id, False)
+        await message.reply_text("✅ Screenshots ab album (alag-alag photos) me aayenge.")
+        try:
+            await message.react(pick_reaction("settings"))
+        except Exception:
+            pass
+
     @app.on_message(filters.command("sample_on") & filters.private)
     async def sample_on(client: Client, message: Message):
         if is_banned(message.from_user.id):
@@ -325,18 +353,33 @@ def register_user_settings_handlers(app: Client):
             await message.reply_text("Valid new_name.ext do.", quote=True)
             return
 
-        status = await message.reply_text("⬇️ File download ho rahi hai rename ke liye...")
-        dl_path = await app_.download_media(message.reply_to_message)
-
         import os
-        new_path = new_name
-        os.replace(dl_path, new_path)
 
-        progress_msg = await message.reply_text("📤 Re-upload start ho raha hai...")
-        await upload_with_thumb_and_progress(
-            app_, message, new_path, message.from_user.id, progress_msg
-        )
-        await status.delete()
+        media = message.reply_to_message.document or message.reply_to_message.video
+        try:
+            # rename bhi apni alag directory me (do /rename same naam pe na takraayein)
+            ws = workspaces.open(f"rename_{message.chat.id}_{message.id}", media.file_size or 0)
+        except WorkspaceFull:
+            await message.reply_text("💾 Server disk abhi bhari hai, thodi der baad try karo.")
+            return
+
+        try:
+            status = await message.reply_text("⬇️ File download ho rahi hai rename ke liye...")
+            dl_path = await app_.download_media(
+                message.reply_to_message, file_name=ws.path + os.sep
+            )
+
+            new_path = os.path.join(ws.path, os.path.basename(new_name))
+            os.replace(dl_path, new_path)
+
+            progress_msg = await message.reply_text("📤 Re-upload start ho raha hai...")
+            await upload_with_thumb_and_progress(
+                app_, message, new_path, message.from_user.id, progress_msg,
+                work_dir=ws.tmp,
+            )
+            await status.delete()
+        finally:
+            workspaces.release(ws.key)
         try:
             await message.react(pick_reaction("rename"))
         except Exception:
@@ -13,14 +13,20 @@ def home():
 def run_keep_alive():
     keep_app.run(host="0.0.0.0", port=8080)
 
-Thread(target=run_keep_alive, daemon=True).start()
+# server main() me start hota hai: yt-dlp forkserver (utils/executor.py) ye
+# file import karta hai, wahan server / threads nahi chahiye
 
 # =======================================================
 # ================== BOT IMPORTS =========================
 # =======================================================
 import logging
-from pyrogram import Client
-from config import API_ID, API_HASH, BOT_TOKEN
+from pyrogram import Client, idle
+from config import API_ID, API_HASH, BOT_TOKEN, NODE_ID, NODE_ROLE
+from utils.http_client import start_http_client, close_http_client
+from utils.executor import ytdlp_executor
+from utils.tg_upload import close_upload_sessions
+from utils.jobs import job_queue
+from database import ensure_media_indexes, ensure_job_indexes, ensure_state_indexes
 
 # Handlers
 from handlers.start import register_start_handlers
@@ -39,12 +45,50 @@ logging.basicConfig(
 )
 
 
+# =======================================================
+# ================== LIFECYCLE ===========================
+# =======================================================
+async def run(app: Client):
+    # shared HTTP pool pehle, taki pehla update aate hi ready ho
+    await start_http_client()
+    try:
+        ensure_media_indexes()
+    except Exception as e:
+        logging.warning("⚠️ media cache index create fail: %s", e)
+    try:
+        ensure_job_indexes()
+        ensure_state_indexes()
+    except Exception as e:
+        logging.warning("⚠️ job queue / state index create fail: %s", e)
+    try:
+        await app.start()
+        # front node sirf enqueue karta hai, jobs worker nodes chalate hain
+        job_queue.start(app, run_workers=NODE_ROLE != "front")
+        logging.info("🔥 Bot is now running...")
+        await idle()
+        await job_queue.stop()
+        await close_upload_sessions()
+        await app.stop()
+    finally:
+        ytdlp_executor.shutdown()
+        await close_http_client()
+        logging.info("🛑 HTTP pool closed.")
+
+
 # =======================================================
 # ================== MAIN FUNCTION =======================
 # =======================================================
 def main():
+    Thread(target=run_keep_alive, daemon=True).start()
+
+    logging.info("🚀 Initializing Advanced Uploader Bot (node %s, role %s)...", NODE_ID, NODE_ROLE)
+
+    if NODE_ROLE not in ("all", "front", "worker"):
+        raise SystemExit(f"NODE_ROLE galat hai: {NODE_ROLE} (all / front / worker)")
 
-    logging.info("🚀 Initializing Advanced Uploader Bot...")
+    # worker node Telegram updates nahi leta (warna do nodes same update handle
+    # karte) – sirf queue ke jobs ke liye bot session
+    worker_only = NODE_ROLE == "worker"
 
     app = Client(
         "advanced_uploader_bot",
@@ -52,20 +96,21 @@ def main():
         api_hash=API_HASH,
         bot_token=BOT_TOKEN,
         workers=50,                 # Fast processing
-        in_memory=True              # Speed optimization
+        in_memory=True,             # Speed optimization
+        no_updates=worker_only,
     )
 
-    # Register Handlers
-    register_start_handlers(app)
-    register_user_settings_handlers(app)
-    register_admin_handlers(app)
-    register_admin_tools_handlers(app)
-    register_url_handlers(app)
+    if not worker_only:
+        # Register Handlers
+        register_start_handlers(app)
+        register_user_settings_handlers(app)
+        register_admin_handlers(app)
+        register_admin_tools_handlers(app)
+        register_url_handlers(app)
 
-    logging.info("✅ All handlers registered successfully.")
-    logging.info("🔥 Bot is now running...")
+        logging.info("✅ All handlers registered successfully.")
 
-    app.run()
+    app.run(run(app))
 
 
 # =======================================================
@@ -0,0 +1,198 @@
+# tests/test_mp4.py
+import os
+import shutil
+import struct
+import subprocess
+
+import pytest
+
+from utils import mp4
+
+
+# ==========================================
+#   SYNTHETIC MP4 HELPERS
+# ==========================================
+
+def _box(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _offsets_table(kind: bytes, offsets: list) -> bytes:
+    code = "Q" if kind == b"co64" else "I"
+    body = struct.pack(">II", 0, len(offsets)) + struct.pack(f">{len(offsets)}{code}", *offsets)
+    return _box(kind, body)
+
+
+def _trak(kind: bytes, offsets: list) -> bytes:
+    stbl = _box(b"stbl", _offsets_table(kind, offsets))
+    return _box(b"trak", _box(b"mdia", _box(b"minf", stbl)))
+
+
+def _build(path: str, samples: list) -> dict:
+    """
+    ftyp | free | mdat(samples) | moov – moov end me (faststart nahi).
+    Aadhe samples ka offset stco me, baaki co64 me.
+    Returns {offset: sample bytes}.
+    """
+    ftyp = _box(b"ftyp", b"isom" + struct.pack(">I", 512) + b"isomiso2mp41")
+    free = _box(b"free", b"\0" * 16)
+    mdat_start = len(ftyp) + len(free) + 8
+
+    expected = {}
+    offsets = []
+    pos = mdat_start
+    for data in samples:
+        offsets.append(pos)
+        expected[pos] = data
+        pos += len(data)
+    half = len(offsets) // 2
+    moov = _box(b"moov", _trak(b"stco", offsets[:half]) + _trak(b"co64", offsets[half:]))
+
+    with open(path, "wb") as f:
+        f.write(ftyp + free + _box(b"mdat", b"".join(samples)) + moov)
+    return expected
+
+
+def _read_offsets(path: str) -> list:
+    """
+    File ke moov ke saare stco / co64 offsets, table order me.
+    """
+    atoms = mp4.scan_atoms(path)
+    _, moov_off, moov_size = next(a for a in atoms if a[0] == "moov")
+    with open(path, "rb") as f:
+        f.seek(moov_off)
+        buf = bytearray(f.read(moov_size))
+
+    found = []
+
+    def walk(start, end):
+        for kind, pos, header, size in mp4._child_boxes(buf, start, end):
+            body = pos + header
+            if kind in mp4._CONTAINERS:
+                walk(body, pos + size)
+            elif kind in (b"stco", b"co64"):
+                code = "Q" if kind == b"co64" else "I"
+                count = struct.unpack_from(">I", buf, body + 4)[0]
+                found.extend(struct.unpack_from(f">{count}{code}", buf, body + 8))
+
+    walk(0, moov_size)
+    return found
+
+
+def _samples(n: int = 12) -> list:
+    # har sample alag bytes + alag size, taaki galat offset pakda jaye
+    return [bytes([i + 1]) * (100 + 37 * i) + f"sample-{i}".encode() for i in range(n)]
+
+
+# ==========================================
+#   RELOCATE_MOOV
+# ==========================================
+
+@pytest.mark.parametrize("block", [mp4._SHIFT_BLOCK, 64])
+def test_relocate_moov_keeps_sample_offsets(tmp_path, monkeypatch, block):
+    # block=64 -> mdat kai chhote blocks me khiskta hai (overlap wala path)
+    monkeypatch.setattr(mp4, "_SHIFT_BLOCK", block)
+    path = str(tmp_path / "end.mp4")
+    samples = _samples()
+    expected = _build(path, samples)
+    size = os.path.getsize(path)
+
+    assert mp4.moov_before_mdat(path) is False
+    assert mp4.relocate_moov(path) is True
+    assert mp4.moov_before_mdat(path) is True
+    assert os.path.getsize(path) == size
+
+    offsets = _read_offsets(path)
+    assert len(offsets) == len(samples)
+    with open(path, "rb") as f:
+        for new, (old, data) in zip(offsets, sorted(expected.items())):
+            assert new != old
+            f.seek(new)
+            assert f.read(len(data)) == data
+
+
+def test_relocate_moov_marker_survives_crash(tmp_path, monkeypatch):
+    monkeypatch.setattr(mp4, "_SHIFT_BLOCK", 64)
+    path = str(tmp_path / "end.mp4")
+    _build(path, _samples())
+    real = mp4._pwrite_all
+    calls = []
+
+    def crash(fd, data, offset):
+        calls.append(offset)
+        if len(calls) == 3:
+            raise OSError("killed")
+        real(fd, data, offset)
+
+    monkeypatch.setattr(mp4, "_pwrite_all", crash)
+    with pytest.raises(OSError):
+        mp4.relocate_moov(path)
+    assert mp4.relocation_pending(path)
+
+    monkeypatch.setattr(mp4, "_pwrite_all", real)
+    path2 = str(tmp_path / "ok.mp4")
+    _build(path2, _samples())
+    mp4.relocate_moov(path2)
+    assert not mp4.relocation_pending(path2)
+
+
+def test_relocate_moov_already_faststart(tmp_path):
+    path = str(tmp_path / "end.mp4")
+    _build(path, _samples())
+    mp4.relocate_moov(path)
+    with open(path, "rb") as f:
+        before = f.read()
+
+    assert mp4.relocate_moov(path) is True
+    with open(path, "rb") as f:
+        assert f.read() == before
+
+
+def test_relocate_moov_unsupported_leaves_file(tmp_path):
+    path = str(tmp_path / "cmov.mp4")
+    ftyp = _box(b"ftyp", b"isom" + struct.pack(">I", 512))
+    data = ftyp + _box(b"mdat", b"x" * 64) + _box(b"moov", _box(b"cmov", b"\0" * 8))
+    with open(path, "wb") as f:
+        f.write(data)
+
+    with pytest.raises(mp4.FaststartUnsupported):
+        mp4.relocate_moov(path)
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+
+def test_relocate_moov_not_mp4(tmp_path):
+    path = str(tmp_path / "plain.bin")
+    with open(path, "wb") as f:
+        f.write(b"hello world, not an mp4 file")
+    assert mp4.relocate_moov(path) is False
+
+
+# ==========================================
+#   FFPROBE COMPARISON (ffmpeg + ffprobe installed ho tabhi)
+# ==========================================
+
+@pytest.mark.skipif(
+    not (shutil.which("ffmpeg") and shutil.which("ffprobe")),
+    reason="ffmpeg / ffprobe not installed",
+)
+def test_relocate_moov_matches_ffprobe(tmp_path):
+    src = str(tmp_path / "src.mp4")
+    subprocess.run(
+        [
+            "ffmpeg", "-v", "error", "-y",
+            "-f", "lavfi", "-i", "testsrc=duration=2:size=160x120:rate=25",
+            "-f", "lavfi", "-i", "sine=duration=2",
+            "-c:v", "mpeg4", "-c:a", "aac", "-shortest",
+            src,
+        ],
+        check=True,
+    )
+    # ffmpeg default me moov end me likhta hai
+    assert mp4.moov_before_mdat(src) is False
+
+    copy = str(tmp_path / "relocated.mp4")
+    shutil.copyfile(src, copy)
+    assert mp4.relocate_moov(copy) is True
+    assert mp4.moov_before_mdat(copy) is True
+    assert mp4._ffprobe_packets(copy) == mp4._ffprobe_packets(src)
@@ -0,0 +1,240 @@
+# utils/cache.py
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+from utils.metrics import incr
+from config import (
+    CACHE_MAX_ENTRIES,
+    CACHE_MAX_MB,
+    CACHE_DEFAULT_TTL,
+    CACHE_NEGATIVE_TTL,
+    CACHE_HOST_TTLS,
+    SHARED_CACHE,
+)
+
+# ==========================================
+#   TTL + LRU RESULT CACHE
+# ==========================================
+#
+# Probe / URL resolve / yt-dlp format extraction ke results yahan cache hote
+# hain, taki same (viral) link pe har user ke liye network round trip na ho.
+#
+#   - in-process tier: OrderedDict LRU, entry count + approx bytes budget
+#   - per-host TTL (CACHE_HOST_TTLS), failures ke liye chhota negative TTL
+#   - optional Mongo tier (SHARED_CACHE=1) – kai bot instances share karein
+#
+# Counters (metrics): cache.<name>.hit / .miss / .negative_hit / .shared_hit
+
+MISS = "miss"
+HIT = "hit"
+NEGATIVE = "negative"
+
+# share links me aane wale tracking params – key me inka koi matlab nahi
+_TRACKING_PARAMS = {"fbclid", "gclid", "igshid", "si", "feature", "ref", "ref_src", "mibextid"}
+
+
+def normalize_cache_url(url: str) -> str:
+    """
+    scheme/host lowercase, fragment + tracking params (utm_* etc.) hata ke.
+    """
+    try:
+        u = urlparse(url.strip())
+        query = [
+            (k, v)
+            for k, v in parse_qsl(u.query, keep_blank_values=True)
+            if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith("utm_")
+        ]
+        return urlunparse(
+            (
+                u.scheme.lower(),
+                u.netloc.lower(),
+                u.path or "/",
+                u.params,
+                urlencode(query),
+                "",
+            )
+        )
+    except Exception:
+        return url
+
+
+def cache_key(url: str, opts: dict | None = None) -> str:
+    """
+    Normalized URL + relevant options (e.g. ydl opts) ka hash.
+    """
+    base = normalize_cache_url(url)
+    if not opts:
+        return base
+    blob = json.dumps(opts, sort_keys=True, default=str)
+    return base + "#" + hashlib.sha1(blob.encode("utf-8")).hexdigest()[:12]
+
+
+def host_ttl(url: str, default: int = CACHE_DEFAULT_TTL) -> int:
+    host = (urlparse(url).netloc or "").lower().split(":")[0]
+    for suffix, ttl in CACHE_HOST_TTLS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return ttl
+    return default
+
+
+def _approx_size(value) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except Exception:
+        return 1024
+
+
+class TTLCache:
+    """
+    get() -> (status, value) jahan status MISS / HIT / NEGATIVE hai.
+    NEGATIVE me value = cached error message.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_MB * 1024 * 1024,
+        shared: bool = SHARED_CACHE,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shared = shared
+        # key -> (expires_at, negative, value, size)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._indexes_ready = False
+
+    # ----------------------- in-process tier ----------------------- #
+
+    def _drop(self, key: str):
+        entry = self._data.pop(key, None)
+        if entry:
+            self._bytes -= entry[3]
+
+    def _put_local(self, key: str, value, negative: bool, expires_at: float):
+        size = _approx_size(value)
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._data[key] = (expires_at, negative, value, size)
+        self._bytes += size
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            _, old = self._data.popitem(last=False)
+            self._bytes -= old[3]
+            incr(f"cache.{self.name}.evict")
+
+    # ----------------------- shared (Mongo) tier ----------------------- #
+
+    def _shared_id(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def _shared_get(self, key: str):
+        try:
+            from database import shared_cache_get
+            doc = shared_cache_get(self._shared_id(key))
+        except Exception as e:
+            logging.debug("shared cache get failed: %s", e)
+            return None
+        if not doc or not isinstance(doc.get("expires_at"), datetime):
+            return None
+        # Mongo naive UTC datetime deta hai -> bacha hua TTL nikal ke local epoch
+        remaining = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+        if remaining <= 0:
+            return None
+        try:
+            value = json.loads(doc["payload"])
+        except Exception:
+            return None
+        return time.time() + remaining, bool(doc.get("negative")), value
+
+    def _shared_set(self, key: str, value, negative: bool, ttl: int):
+        try:
+            from database import shared_cache_set, ensure_cache_indexes
+            if not self._indexes_ready:
+                ensure_cache_indexes()
+                self._indexes_ready = True
+            shared_cache_set(
+                self._shared_id(key),
+                json.dumps(value, default=str),
+                negative,
+                datetime.utcnow() + timedelta(seconds=ttl),
+            )
+        except Exception as e:
+            logging.debug("shared cache set failed: %s", e)
+
+    # ----------------------- public API ----------------------- #
+
+    def get(self, key: str):
+        now = time.time()
+        entry = self._data.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._data.move_to_end(key)
+                if entry[1]:
+                    incr(f"cache.{self.name}.negative_hit")
+                    return NEGATIVE, entry[2]
+                incr(f"cache.{self.name}.hit")
+                return HIT, entry[2]
+            self._drop(key)
+
+        if self.shared:
+            found = self._shared_get(key)
+            if found is not None:
+                expires_at, negative, value = found
+                self._put_local(key, value, negative, expires_at)
+                incr(f"cache.{self.name}.shared_hit")
+                if negative:
+                    incr(f"cache.{self.name}.negative_hit")
+                    return NEGATIVE, value
+                incr(f"cache.{self.name}.hit")
+                return HIT, value
+
+        incr(f"cache.{self.name}.miss")
+        return MISS, None
+
+    def set(self, key: str, value, ttl: int | None = None):
+        ttl = CACHE_DEFAULT_TTL if ttl is None else int(ttl)
+        if ttl <= 0:
+            return
+        self._put_local(key, value, False, time.time() + ttl)
+        if self.shared:
+            self._shared_set(key, value, False, ttl)
+
+    def set_negative(self, key: str, error: str, ttl: int = CACHE_NEGATIVE_TTL):
+        if ttl <= 0:
+            return
+        self._put_local(key, error, True, time.time() + ttl)
+        if self.shared:
+            self._shared_set(key, error, True, ttl)
+
+    def invalidate(self, key: str):
+        self._drop(key)
+        if self.shared:
+            try:
+                from database import shared_cache_delete
+                shared_cache_delete(self._shared_id(key))
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "shared": self.shared,
+        }
+
+
+# process-wide caches
+probe_cache = TTLCache("probe")
+resolve_cache = TTLCache("resolve")
+formats_cache = TTLCache("formats")
+
+ALL_CACHES = (probe_cache, resolve_cache, formats_cache)
@@ -1,14 +1,39 @@
 # utils/downloader.py
 import os
-import mimetypes
+import asyncio
+import hashlib
 import time
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qs
 
 import aiohttp
-import requests
 from yt_dlp import YoutubeDL
 
 from utils.progress import human_readable
+from utils import resume
+from utils.http_client import USER_AGENT, get_http_session, request_kwargs
+from utils.probe import parse_content_range_total
+from utils.executor import emit_progress, ytdlp_executor, TaskError, TaskCancelled
+from utils.metrics import record_throughput, throughput_key
+from utils.file_store import download_store
+from utils.media_tools import ensure_mp4_faststart
+from utils.cache import (
+    resolve_cache,
+    formats_cache,
+    cache_key,
+    host_ttl,
+    normalize_cache_url,
+    HIT,
+    NEGATIVE,
+)
+from config import (
+    PROXY_URL,
+    DOWNLOAD_CONNECTIONS,
+    SEGMENTED_MIN_SIZE_MB,
+    DOWNLOAD_RETRIES,
+    PROGRESS_UPDATE_INTERVAL,
+    YTDLP_INFO_TTL,
+    YTDLP_EXTRACT_TIMEOUT,
+)
 
 # ==========================================
 #   BASIC HELPERS
@@ -30,14 +55,14 @@ DOC_LIKE_EXTS = [
 
 HTML_EXTS = [".html", ".htm", ".php", ".asp", ".aspx", ".jsp"]
 
-USER_AGENT = (
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-    "AppleWebKit/537.36 (KHTML, like Gecko) "
-    "Chrome/120.0.0.0 Safari/537.36"
-)
-
 COOKIES_FILE = os.getenv("COOKIES_FILE", "cookies.txt")
-PROXY_URL = os.getenv("HTTP_PROXY") or os.getenv("HTTPS_PROXY") or None  # optional proxy
+
+# stored info ko expiry se itne seconds pehle hi purana maan lo (download start hone me time lagta hai)
+_INFO_EXPIRY_MARGIN = 60
+
+# yt-dlp progress hook child process me kitni der me max ek baar emit kare (seconds)
+_HOOK_MIN_INTERVAL = 0.5
+_last_hook_emit = 0.0
 
 
 # ----------------------- EXT HELPERS ----------------------- #
@@ -69,92 +94,69 @@ def is_html_like(filename: str) -> bool:
     return False
 
 
-def _guess_extension_from_type(content_type: str | None) -> str | None:
-    if not content_type:
-        return None
-    ext = mimetypes.guess_extension(content_type.split(";")[0].strip())
-    if not ext:
-        return None
-    return ext
+# ----------------------- URL RESOLVE ----------------------- #
+#
+# Share / redirect links (fb share, fb.watch) handler me hi resolve_url se
+# final URL ban jate hain (shared aiohttp pool, cached). Job / yt-dlp ko wahi
+# resolved URL milta hai – yahan koi blocking network call nahi.
 
+def _needs_resolve(url: str) -> bool:
+    lower = url.lower()
+    return "facebook.com/share/" in lower or "fb.watch" in lower
 
-# ----------------------- URL NORMALIZE ----------------------- #
 
-def normalize_url(url: str) -> str:
+async def resolve_url(url: str) -> str:
     """
-    Try to resolve some redirecting/share URLs to their final location.
+    Share / redirect URL ka final location – shared HTTP pool se redirect
+    follow karta hai (event loop block nahi hota), result cache hota hai.
     """
+    if not _needs_resolve(url):
+        return url
+    key = cache_key(url)
+    status, cached = resolve_cache.get(key)
+    if status == HIT:
+        return cached
     try:
-        lower = url.lower()
-        if "facebook.com/share/" in lower or "fb.watch" in lower:
-            resp = requests.get(
-                url,
-                allow_redirects=True,
-                timeout=15,
-                headers={"User-Agent": USER_AGENT},
-                proxies={"http": PROXY_URL, "https": PROXY_URL} if PROXY_URL else None,
-            )
-            return resp.url or url
+        session = get_http_session()
+        async with session.get(
+            url,
+            allow_redirects=True,
+            timeout=aiohttp.ClientTimeout(total=15),
+            **request_kwargs(),
+        ) as resp:
+            final = str(resp.url) or url
     except Exception:
-        pass
-    return url
-
+        return url
+    resolve_cache.set(key, final, host_ttl(final))
+    return final
 
-# ----------------------- HEAD INFO ----------------------- #
 
-def head_info(url: str) -> tuple[int, str | None, str | None]:
+async def download_thumbnail(url: str, out_path: str) -> str | None:
     """
-    Do a HEAD request to get Content-Length, Content-Type, filename (if possible).
-    Returns: (size_in_bytes_or_0, content_type_or_None, suggested_filename_or_None)
+    Site / YouTube thumbnail ko shared HTTP pool se disk pe save karta hai.
+    Returns out_path ya None on failure.
     """
-    url = normalize_url(url)
-
-    size = 0
-    ctype = None
-    filename = None
-
     try:
-        resp = requests.head(
+        session = get_http_session()
+        async with session.get(
             url,
-            allow_redirects=True,
-            timeout=10,
-            headers={"User-Agent": USER_AGENT},
-            proxies={"http": PROXY_URL, "https": PROXY_URL} if PROXY_URL else None,
-        )
-        if resp.status_code >= 400:
-            # some servers don't allow HEAD; try GET
-            resp = requests.get(
-                url,
-                stream=True,
-                timeout=10,
-                headers={"User-Agent": USER_AGENT},
-                proxies={"http": PROXY_URL, "https": PROXY_URL} if PROXY_URL else None,
-            )
-        ctype = resp.headers.get("Content-Type")
-
-        cl = resp.headers.get("Content-Length")
-        if cl and cl.isdigit():
-            size = int(cl)
-
-        cd = resp.headers.get("Content-Disposition")
-        if cd and "filename=" in cd:
-            part = cd.split("filename=")[-1].strip().strip('"')
-            filename = part
-        else:
-            parsed = urlparse(resp.url)
-            base = os.path.basename(parsed.path)
-            if base:
-                filename = base
-
-        if not filename and ctype:
-            ext = _guess_extension_from_type(ctype)
-            if ext:
-                filename = "file" + ext
-
+            timeout=aiohttp.ClientTimeout(total=10),
+            **request_kwargs(),
+        ) as resp:
+            resp.raise_for_status()
+            with open(out_path, "wb") as f:
+                async for chunk in resp.content.iter_chunked(1024 * 8):
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+        return out_path
     except Exception:
-        pass
-
-    return size, ctype, filename
+        try:
+            if os.path.exists(out_path):
+                os.remove(out_path)
+        except Exception:
+            pass
+        return None
 
 
 # ==========================================
@@ -183,6 +185,10 @@ def _build_ydl_opts(
         "merge_output_format": "mp4",
         "concurrent_fragment_downloads": 4,
         "retries": 5,
+        "fragment_retries": 10,
+        # .part / .ytdl files se adhoora download resume hota hai
+        "continuedl": True,
+        "nopart": False,
         "http_headers": {
             "User-Agent": USER_AGENT,
             "Accept-Language": "en-US,en;q=0.9",
@@ -274,7 +280,6 @@ def get_formats(url: str) -> tuple[list[dict], dict]:
     Use yt-dlp to fetch available formats for a URL.
     Returns (formats_list, full_info_dict)
     """
-    url = normalize_url(url)
     ydl_opts = _build_ydl_opts(url, outtmpl="NA", download=False)
     parsed = urlparse(url)
     host = (parsed.netloc or "").lower()
@@ -293,6 +298,9 @@ def get_formats(url: str) -> tuple[list[dict], dict]:
         else:
             raise e
 
+    # JSON-safe copy: process pool se pickle hoke event loop tak jata hai
+    info = YoutubeDL.sanitize_info(info)
+
     formats = info.get("formats", []) or []
     simple_formats = []
 
@@ -343,13 +351,156 @@ def get_formats(url: str) -> tuple[list[dict], dict]:
 #   DOWNLOAD WITH YT-DLP
 # ==========================================
 
-def download_with_ytdlp(url: str, fmt_id: str | None, tmp_name: str) -> str | None:
+def _ytdlp_progress_hook(d: dict):
+    """
+    Child process me yt-dlp ka progress hook: compact payload parent ko bhejta hai.
+    Fragment threads bahut baar call karte hain, isliye yahin thoda throttle.
+    """
+    global _last_hook_emit
+    status = d.get("status")
+    now = time.time()
+    if status == "downloading" and now - _last_hook_emit < _HOOK_MIN_INTERVAL:
+        return
+    _last_hook_emit = now
+    emit_progress(
+        {
+            "status": status,
+            "filename": os.path.basename(d.get("filename") or ""),
+            "downloaded": d.get("downloaded_bytes") or 0,
+            "total": d.get("total_bytes") or d.get("total_bytes_estimate") or 0,
+            "speed": d.get("speed") or 0,
+            "eta": d.get("eta"),
+        }
+    )
+
+
+def _ytdlp_postprocessor_hook(d: dict):
+    if d.get("status") == "started":
+        emit_progress({"status": "postprocessing", "postprocessor": d.get("postprocessor")})
+
+
+def ytdlp_progress_renderer(progress_msg, job: str):
+    """
+    Event loop side: yt-dlp payloads ko direct download jaisa progress text
+    bana ke message edit karta hai (PROGRESS_UPDATE_INTERVAL rate limit) aur
+    har payload ko is download ke throughput sample me record karta hai.
+    """
+    key = throughput_key(job)
+    start_time = time.time()
+    last_edit = 0.0
+    files: dict[str, tuple[int, int]] = {}   # video + audio alag files ho sakti hain
+    postprocessing = False
+
+    async def on_progress(p: dict):
+        nonlocal last_edit, postprocessing
+        if p.get("status") == "postprocessing":
+            if not postprocessing:
+                postprocessing = True
+                try:
+                    await progress_msg.edit_text("⚙️ Merge / post-processing ho raha hai...")
+                except Exception:
+                    pass
+            return
+
+        files[p.get("filename") or ""] = (p.get("downloaded") or 0, p.get("total") or 0)
+        done = sum(v[0] for v in files.values())
+        total = sum(v[1] for v in files.values())
+        record_throughput(key, done, total, p.get("speed"))
+
+        now = time.time()
+        if now - last_edit < PROGRESS_UPDATE_INTERVAL:
+            return
+        last_edit = now
+        text = _format_progress_text("⬇️ Downloading (yt-dlp)", done, total, start_time)
+        try:
+            await progress_msg.edit_text(text)
+        except Exception:
+            pass
+
+    return on_progress
+
+
+def info_expires_at(info: dict) -> float:
+    """
+    get_formats ke info dict ke format URLs kab tak valid hain (unix ts).
+    Signed URLs (googlevideo `expire=`, CDN `Expires=` ...) ka sabse pehla
+    expiry, warna extraction time + YTDLP_INFO_TTL. Safety margin minus.
+    """
+    fetched = float(info.get("epoch") or time.time())
+    expiry = fetched + YTDLP_INFO_TTL
+    for f in info.get("formats") or []:
+        furl = f.get("url") or ""
+        if "?" not in furl:
+            continue
+        qs = parse_qs(urlparse(furl).query)
+        for key in ("expire", "expires", "Expires", "exp"):
+            vals = qs.get(key)
+            if vals and vals[0].isdigit():
+                ts = int(vals[0])
+                # kuch CDNs ms me dete hain
+                if ts > 10 ** 12:
+                    ts //= 1000
+                if ts > fetched:
+                    expiry = min(expiry, ts)
+    return expiry - _INFO_EXPIRY_MARGIN
+
+
+async def extract_formats(url: str, key=None) -> tuple[list[dict], dict]:
+    """
+    get_formats ka cached wrapper (event loop se call karo).
+    Cache miss pe yt-dlp pool me extraction; result host TTL tak cache hota
+    hai, lekin signed format URLs expire hone se pehle hi (info_expires_at).
+    Extraction fail ho to error thodi der (negative TTL) cache rehta hai,
+    taki same toota link baar baar yt-dlp na chalaye.
+    """
+    ckey = cache_key(url, _build_ydl_opts(url, outtmpl="NA", download=False))
+    status, cached = formats_cache.get(ckey)
+    if status == HIT:
+        return cached["formats"], cached["info"]
+    if status == NEGATIVE:
+        raise TaskError(cached, "CachedFailure")
+
+    try:
+        formats, info = await ytdlp_executor.run(
+            get_formats, url, timeout=YTDLP_EXTRACT_TIMEOUT, key=key
+        )
+    except TaskCancelled:
+        # user ne khud roka – link kharab nahi hai
+        raise
+    except Exception as e:
+        formats_cache.set_negative(ckey, str(e) or e.__class__.__name__)
+        raise
+
+    ttl = host_ttl(url)
+    if info:
+        ttl = min(ttl, int(info_expires_at(info) - time.time()))
+    formats_cache.set(ckey, {"formats": formats, "info": info}, ttl)
+    return formats, info
+
+
+def ytdlp_tmp_name(url: str, fmt_id: str | None) -> str:
+    """
+    URL + format se stable temp naam, taki restart ke baad yt-dlp
+    usi .part file ko resume kare (shuru se na kare). `url` handler ka
+    resolved URL hai – sirf string normalize, koi network call nahi.
+    """
+    key = f"{normalize_cache_url(url)}|{fmt_id or 'best'}"
+    return "ytdlp_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def download_with_ytdlp(
+    url: str,
+    fmt_id: str | None,
+    tmp_name: str,
+    info: dict | None = None,
+) -> str | None:
     """
     Download selected format using yt-dlp.
     If fmt_id is None => use bestvideo+bestaudio/best
+    `info` (get_formats wala, abhi fresh) mile to site pe dobara extract_info
+    nahi hota – seedha process_ie_result; fail ho to normal extract.
     Returns final downloaded file path or None on failure.
     """
-    url = normalize_url(url)
     parsed = urlparse(url)
     host = (parsed.netloc or "").lower()
 
@@ -357,12 +508,23 @@ def download_with_ytdlp(url: str, fmt_id: str | None, tmp_name: str) -> str | No
 
     safe_tmpl = tmp_name or "temp_ytdlp_video"
     ydl_opts["outtmpl"] = safe_tmpl + ".%(ext)s"
+    # progress parent (event loop) tak pipe se jata hai
+    ydl_opts["progress_hooks"] = [_ytdlp_progress_hook]
+    ydl_opts["postprocessor_hooks"] = [_ytdlp_postprocessor_hook]
     ydl_opts["restrictfilenames"] = True
     ydl_opts["trim_file_name"] = 80
 
     try:
         with YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
+            if info is not None:
+                try:
+                    info = ydl.process_ie_result(info, download=True)
+                except Exception as e:
+                    # signed URL jaldi expire ho gaya / 403 -> fresh extraction
+                    print(f"[downloader] cached info failed ({e}), re-extracting")
+                    info = ydl.extract_info(url, download=True)
+            else:
+                info = ydl.extract_info(url, download=True)
             real_path = None
             try:
                 real_path = ydl.prepare_filename(info)
@@ -370,15 +532,8 @@ def download_with_ytdlp(url: str, fmt_id: str | None, tmp_name: str) -> str | No
                 # fallback guess
                 real_path = None
 
-            # If file exists, try faststart and return
+            # faststart uploader me hota hai (async ffmpeg, event loop free)
             if real_path and os.path.exists(real_path):
-                try:
-                    from utils.media_tools import ensure_mp4_faststart
-                    _ens = ensure_mp4_faststart(real_path)
-                    if _ens:
-                        print(f"[downloader] faststart remux applied for {real_path}")
-                except Exception:
-                    pass
                 return real_path
 
     except Exception as e:
@@ -394,13 +549,6 @@ def download_with_ytdlp(url: str, fmt_id: str | None, tmp_name: str) -> str | No
                     try:
                         real_path = ydl.prepare_filename(info)
                         if real_path and os.path.exists(real_path):
-                            try:
-                                from utils.media_tools import ensure_mp4_faststart
-                                _ens = ensure_mp4_faststart(real_path)
-                                if _ens:
-                                    print(f"[downloader] faststart remux applied for {real_path}")
-                            except Exception:
-                                pass
                             return real_path
                     except Exception:
                         pass
@@ -414,69 +562,372 @@ def download_with_ytdlp(url: str, fmt_id: str | None, tmp_name: str) -> str | No
     return None
 
 
+# ==========================================
+#   SEGMENTED (MULTI-CONNECTION) DOWNLOAD
+# ==========================================
+
+# ek steal tabhi hoga jab victim segment me itna data bacha ho
+_MIN_STEAL_BYTES = 2 * 1024 * 1024
+_CHUNK_SIZE = 1024 * 64
+# manifest kitni der me ek baar disk pe save ho (seconds)
+_CHECKPOINT_INTERVAL = 2
+
+# in errors pe download resume karke dobara try hota hai
+_RETRYABLE_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError)
+
+
+class _RangeNotSupported(Exception):
+    """
+    Server ne Range request ko ignore kiya (200 diya, 206 nahi) ya
+    If-Range fail hua kyunki file server pe badal gayi.
+    """
+
+
+class _Segment:
+    """
+    Ek byte range [start, end] (inclusive) jo ek connection fetch karta hai.
+    `end` ko dusra worker beech me chhota kar sakta hai (work stealing).
+    """
+
+    __slots__ = ("start", "pos", "end")
+
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.pos = start
+        self.end = end
+
+    @property
+    def remaining(self) -> int:
+        return max(self.end - self.pos + 1, 0)
+
+
+async def _probe_range_support(session, url: str, req_kwargs: dict) -> tuple[int, bool, dict]:
+    """
+    `Range: bytes=0-0` GET bhej ke check karta hai ki server byte ranges deta hai ya nahi.
+    Returns: (total_size_or_0, ranges_supported, {"etag", "last_modified"})
+    """
+    validators = {"etag": None, "last_modified": None}
+    try:
+        async with session.get(url, headers={"Range": "bytes=0-0"}, **req_kwargs) as resp:
+            validators["etag"] = resp.headers.get("ETag")
+            validators["last_modified"] = resp.headers.get("Last-Modified")
+            accept = (resp.headers.get("Accept-Ranges") or "").lower()
+            if resp.status == 206 and accept != "none":
+                total = parse_content_range_total(resp.headers.get("Content-Range"))
+                return total, total > 0, validators
+            # 200 mila: server ne range ignore kiya, Accept-Ranges pe bharosa nahi
+            cl = resp.headers.get("Content-Length")
+            total = int(cl) if cl and cl.isdigit() else 0
+            return total, False, validators
+    except Exception:
+        return 0, False, validators
+
+
+def _plan_segments(missing: list, parts: int) -> list[_Segment]:
+    """
+    Missing ranges se segments banata hai; jab tak `parts` connections na
+    bhar jaye sabse bade segment ko aadha karta rehta hai.
+    """
+    segments = [_Segment(start, end - 1) for start, end in missing]
+    while len(segments) < parts:
+        biggest = max(segments, key=lambda s: s.remaining, default=None)
+        if biggest is None or biggest.remaining < 2 * _MIN_STEAL_BYTES:
+            break
+        mid = biggest.pos + biggest.remaining // 2
+        segments.append(_Segment(mid, biggest.end))
+        biggest.end = mid - 1
+    return segments
+
+
+def _steal_from(active: list[_Segment]) -> _Segment | None:
+    """
+    Sabse zyada bache hue segment ka second half naye segment me de deta hai.
+    """
+    victim = max(active, key=lambda s: s.remaining, default=None)
+    if victim is None or victim.remaining < 2 * _MIN_STEAL_BYTES:
+        return None
+    mid = victim.pos + victim.remaining // 2
+    stolen = _Segment(mid, victim.end)
+    victim.end = mid - 1
+    return stolen
+
+
+async def _download_segmented(
+    session,
+    url: str,
+    local_path: str,
+    manifest: dict,
+    connections: int,
+    req_kwargs: dict,
+    on_progress,
+    tracker=None,
+) -> int:
+    """
+    .part file ki missing byte ranges ko `connections` parallel requests se
+    fetch karta hai. Jo worker pehle free hota hai wo sabse slow segment ka
+    aadha kaam le leta hai. Pakke likhe ranges manifest me checkpoint hote hain.
+    `tracker` (GrowingFile) ho to har likha hua range usse bhi bataya jata hai.
+    Returns bytes on disk (pehle se resumed + abhi downloaded).
+    """
+    total_size = manifest["total"]
+    base = list(manifest["ranges"])
+    pending = _plan_segments(resume.missing_ranges(base, total_size), connections)
+    segments = list(pending)
+    active: list[_Segment] = []
+    downloaded = resume.done_bytes(base)
+    last_checkpoint = time.time()
+
+    headers_extra = {}
+    validator = resume.if_range_value(manifest)
+    if validator:
+        headers_extra["If-Range"] = validator
+
+    def checkpoint():
+        manifest["ranges"] = base + [[s.start, s.pos] for s in segments if s.pos > s.start]
+        resume.save_manifest(local_path, manifest)
+
+    part = resume.part_path(local_path)
+    os.makedirs(os.path.dirname(part) or ".", exist_ok=True)
+    fd = os.open(part, os.O_RDWR | os.O_CREAT, 0o644)
+
+    async def fetch(seg: _Segment):
+        nonlocal downloaded, last_checkpoint
+        headers = {"Range": f"bytes={seg.pos}-{seg.end}", **headers_extra}
+        async with session.get(url, headers=headers, **req_kwargs) as resp:
+            resp.raise_for_status()
+            if resp.status != 206:
+                raise _RangeNotSupported()
+            async for chunk in resp.content.iter_chunked(_CHUNK_SIZE):
+                if not chunk:
+                    continue
+                # segment ka end steal hone se chhota ho sakta hai
+                chunk = chunk[: seg.remaining]
+                if chunk:
+                    os.pwrite(fd, chunk, seg.pos)
+                    if tracker is not None:
+                        tracker.add(seg.pos, seg.pos + len(chunk))
+                    seg.pos += len(chunk)
+                    downloaded += len(chunk)
+                    await on_progress(downloaded)
+                    if time.time() - last_checkpoint >= _CHECKPOINT_INTERVAL:
+                        last_checkpoint = time.time()
+                        checkpoint()
+                if seg.remaining <= 0:
+                    break
+
+    async def worker():
+        while True:
+            if pending:
+                seg = pending.pop(0)
+            else:
+                seg = _steal_from(active)
+                if seg is None:
+                    return
+                segments.append(seg)
+            active.append(seg)
+            try:
+                await fetch(seg)
+            finally:
+                active.remove(seg)
+
+    try:
+        os.ftruncate(fd, total_size)
+        if tracker is not None and tracker.path is None:
+            tracker.start(part, total_size, base)
+        tasks = [asyncio.create_task(worker()) for _ in range(connections)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    finally:
+        os.close(fd)
+        # error / cancel pe bhi jitna aaya wo resume ke liye yaad rahe
+        checkpoint()
+
+    if downloaded != total_size:
+        raise aiohttp.ClientPayloadError(
+            f"Segmented download incomplete: {downloaded}/{total_size} bytes"
+        )
+    return downloaded
+
+
+async def _download_single_stream(session, url: str, local_path: str, req_kwargs: dict, on_progress) -> tuple[int, int]:
+    """
+    Range support nahi -> poori file ek GET me .part file me, shuru se.
+    Returns (total_size_or_0, downloaded)
+    """
+    downloaded = 0
+    total_size = 0
+    part = resume.part_path(local_path)
+
+    async with session.get(url, **req_kwargs) as resp:
+        resp.raise_for_status()
+
+        # gzip / deflate body aiohttp khud decompress karta hai, Content-Length
+        # compressed bytes ginta hai -> us case me size check / total nahi
+        encoding = (resp.headers.get("Content-Encoding") or "identity").lower()
+        cl = resp.headers.get("Content-Length")
+        if cl and cl.isdigit() and encoding == "identity":
+            total_size = int(cl)
+
+        os.makedirs(os.path.dirname(part) or ".", exist_ok=True)
+
+        with open(part, "wb") as f:
+            async for chunk in resp.content.iter_chunked(_CHUNK_SIZE):
+                if not chunk:
+                    continue
+                f.write(chunk)
+                downloaded += len(chunk)
+                await on_progress(downloaded)
+
+    if total_size and downloaded != total_size:
+        raise aiohttp.ClientPayloadError(
+            f"Download incomplete: {downloaded}/{total_size} bytes"
+        )
+    return total_size, downloaded
+
+
 # ==========================================
 #   DIRECT DOWNLOAD WITH PROGRESS
 # ==========================================
 
-async def download_direct_with_progress(url: str, filename: str, progress_msg):
+async def download_direct_with_progress(url: str, filename: str, progress_msg, tracker=None, workdir: str = "."):
     """
     Direct HTTP(S) download using aiohttp with telegram message progress.
+    Server byte ranges support kare to file DOWNLOAD_CONNECTIONS parallel
+    segments me aati hai, warna single stream.
+    Data pehle "<file>.part" me likha jata hai; socket error pe
+    DOWNLOAD_RETRIES baar aur process restart ke baad bhi manifest se resume hota hai.
+    Complete file download store me jati hai; agli baar wahi se (0 bytes).
+    `tracker` (utils.tg_upload.GrowingFile) diya ho to ranged download ke
+    bytes disk pe aate hi upload ho sakte hain; stream possible na ho to
+    tracker.abort() hota hai aur caller normal upload karta hai.
+    File `workdir` (job ka workspace) me banti hai.
     Returns (local_path, total_downloaded_bytes)
     """
-    url = normalize_url(url)
+    url = await resolve_url(url)
 
     filename = filename or "file_from_url"
-    local_path = os.path.join(".", filename)
+    local_path = os.path.join(workdir, filename)
 
     total_size = 0
     downloaded = 0
     last_edit_time = 0
     start_time = time.time()
 
-    timeout = aiohttp.ClientTimeout(total=0, sock_connect=20, sock_read=0)
-
-    connector_kwargs = {}
-    if PROXY_URL:
-        connector_kwargs["ssl"] = False
-
-    async with aiohttp.ClientSession(
-        timeout=timeout,
-        headers={"User-Agent": USER_AGENT},
-        **connector_kwargs,
-    ) as session:
-        kwargs = {}
-        if PROXY_URL:
-            kwargs["proxy"] = PROXY_URL
-
-        async with session.get(url, **kwargs) as resp:
-            resp.raise_for_status()
-
-            cl = resp.headers.get("Content-Length")
-            if cl and cl.isdigit():
-                total_size = int(cl)
-
-            os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
-
-            with open(local_path, "wb") as f:
-                async for chunk in resp.content.iter_chunked(1024 * 64):
-                    if not chunk:
-                        continue
-                    f.write(chunk)
-                    downloaded += len(chunk)
-
-                    now = time.time()
-                    if now - last_edit_time >= 3:
-                        last_edit_time = now
-                        text = _format_progress_text(
-                            "⬇️ Downloading",
-                            downloaded,
-                            total_size,
-                            start_time,
-                        )
-                        try:
-                            await progress_msg.edit_text(text)
-                        except Exception:
-                            pass
+    # same URL pehle download ho chuka hai -> local store se, origin hit nahi
+    if await download_store.checkout(url, None, local_path):
+        if tracker is not None:
+            tracker.abort("served from local store")
+        try:
+            await progress_msg.edit_text(
+                f"♻️ Local cache se mil gaya\n📦 Size: {human_readable(os.path.getsize(local_path))}"
+            )
+        except Exception:
+            pass
+        return local_path, 0
+
+    sample_key = throughput_key(filename)
+
+    async def report(done: int):
+        nonlocal last_edit_time
+        record_throughput(sample_key, done, total_size)
+        now = time.time()
+        if now - last_edit_time < 3:
+            return
+        last_edit_time = now
+        text = _format_progress_text(
+            "⬇️ Downloading",
+            done,
+            total_size,
+            start_time,
+        )
+        if tracker is not None and tracker.uploaded:
+            text += f"\n📤 Uploaded (saath-saath): {human_readable(tracker.uploaded)}"
+        try:
+            await progress_msg.edit_text(text)
+        except Exception:
+            pass
+
+    manifest = resume.load_manifest(local_path, url)
+
+    session = get_http_session()
+    kwargs = request_kwargs()
+
+    attempt = 0
+    while True:
+        try:
+            probed_size, ranged, validators = await _probe_range_support(session, url, kwargs)
+
+            if manifest and not (
+                ranged
+                and resume.same_resource(
+                    manifest, probed_size, validators["etag"], validators["last_modified"]
+                )
+            ):
+                # server pe file badal gayi / range band -> purana .part bekaar
+                resume.discard(local_path)
+                manifest = None
+                if tracker is not None and tracker.path is not None:
+                    tracker.abort("file changed on server")
+
+            if ranged:
+                total_size = probed_size
+                if manifest is None:
+                    manifest = resume.new_manifest(
+                        url, total_size, validators["etag"], validators["last_modified"]
+                    )
+                connections = 1
+                if total_size >= SEGMENTED_MIN_SIZE_MB * 1024 * 1024:
+                    connections = DOWNLOAD_CONNECTIONS
+                try:
+                    downloaded = await _download_segmented(
+                        session,
+                        url,
+                        local_path,
+                        manifest,
+                        connections,
+                        kwargs,
+                        report,
+                        tracker,
+                    )
+                    break
+                except _RangeNotSupported:
+                    # probe ne jhooth bola ya If-Range fail -> shuru se single stream
+                    resume.discard(local_path)
+                    manifest = None
+
+            if tracker is not None:
+                tracker.abort("server does not support byte ranges")
+
+            total_size, downloaded = await _download_single_stream(
+                session, url, local_path, kwargs, report
+            )
+            break
+        except _RETRYABLE_ERRORS as e:
+            attempt += 1
+            if attempt > DOWNLOAD_RETRIES:
+                raise
+            print(f"[downloader] direct download error ({e}), resume attempt {attempt}")
+            await asyncio.sleep(min(2 ** attempt, 30))
+
+    resume.finalize(local_path)
+    # stream tabhi maana jab uploader ne file sach me utha li (size check pass);
+    # warna abort -> normal upload, aur faststart ho sakta hai
+    streaming = tracker is not None and tracker.error is None and tracker.consuming
+    if tracker is not None:
+        if streaming:
+            tracker.finish()
+        else:
+            tracker.abort("stream upload not consuming")
+    if not streaming and is_video_ext(local_path):
+        # store me jaane se pehle (tab tak inode sirf is job ka hai) moov aage;
+        # streamed upload chal raha ho to bytes mat chhedo
+        await ensure_mp4_faststart(local_path)
+    await download_store.checkin(url, None, local_path)
 
     try:
         text = _format_progress_text(
@@ -0,0 +1,233 @@
+# utils/executor.py
+import asyncio
+import logging
+import multiprocessing
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from config import YTDLP_WORKERS
+
+# ==========================================
+#   BOUNDED PROCESS POOL (yt-dlp jobs ke liye)
+# ==========================================
+#
+# Har task ek alag child process me chalta hai (max `max_workers` ek saath).
+# Isse:
+#   - extract_info / download event loop ko block nahi karte
+#   - timeout / cancel pe sirf wahi child kill hota hai
+#   - yt-dlp crash (segfault, OOM) bot ko nahi girata
+#
+# "forkserver" context: bot process me pyrogram / aiohttp / executor threads
+# chal rahe hote hain – unke beech fork karne se child me kisi thread ka pakda
+# hua lock (logging, malloc, ssl) kabhi nahi chhutta aur child atak jata hai.
+# Forkserver ek saaf single-thread process hai jo yt-dlp modules ek baar
+# import karta hai; har task uska fork hai. Child multiprocessing ke niyam se
+# main.py ko `__mp_main__` ki tarah import karta hai – isliye `fn` module-level
+# function ho (pickle by name) aur main.py import pe koi thread / server start
+# na kare (keep-alive main() me, Mongo connect=False).
+
+_CTX = multiprocessing.get_context("forkserver")
+_CTX.set_forkserver_preload(["__main__", "utils.downloader"])
+
+
+class TaskError(Exception):
+    """
+    Child process me function ne exception raise kiya.
+    """
+
+    def __init__(self, message: str, exc_type: str = "Exception", tb: str = ""):
+        super().__init__(message)
+        self.exc_type = exc_type
+        self.tb = tb
+
+
+class TaskCrashed(TaskError):
+    """
+    Child process bina result bheje mar gaya (segfault / OOM / kill).
+    """
+
+
+class TaskTimeout(TaskError):
+    """
+    Task apne timeout se zyada chala, child kill kar diya gaya.
+    """
+
+
+class TaskCancelled(TaskError):
+    """
+    pool.cancel(key) se task beech me kill hua.
+    """
+
+
+# child process ke andar: parent tak progress bhejne wala pipe
+_CHILD_CONN = None
+_CHILD_LOCK = threading.Lock()
+
+
+def emit_progress(payload: dict):
+    """
+    Child process se event loop tak progress bhejta hai (thread-safe:
+    yt-dlp fragment threads se bhi call ho sakta hai). Parent process me no-op.
+    """
+    if _CHILD_CONN is None:
+        return
+    try:
+        with _CHILD_LOCK:
+            _CHILD_CONN.send(("progress", payload))
+    except Exception:
+        pass
+
+
+def _child_main(conn, fn, args, kwargs):
+    global _CHILD_CONN
+    _CHILD_CONN = conn
+    try:
+        result = fn(*args, **kwargs)
+        with _CHILD_LOCK:
+            conn.send(("result", result))
+    except BaseException as e:
+        try:
+            with _CHILD_LOCK:
+                conn.send(("error", (e.__class__.__name__, str(e), traceback.format_exc())))
+        except Exception:
+            pass
+    finally:
+        conn.close()
+
+
+class ProcessTaskPool:
+    """
+    asyncio-friendly process pool: `await pool.run(fn, *args, timeout=..., key=...)`.
+    `key` (e.g. user_id) dene par `pool.cancel(key)` se wo task kill ho sakta hai.
+    `on_progress` (async callable) child ke emit_progress() payloads event loop
+    pe receive karta hai; backlog ho to sirf latest payload deliver hota hai.
+    Child ke pipe pe blocking recv / join pool ke apne threads me hote hain –
+    ghanton chalne wale tasks default executor (baaki run_in_executor calls)
+    ko nahi gherte.
+    """
+
+    def __init__(self, max_workers: int, name: str = "pool"):
+        self.max_workers = max(1, max_workers)
+        self.name = name
+        # har task: ek reader thread + timeout / kill ke baad join
+        self._threads = ThreadPoolExecutor(
+            max_workers=self.max_workers * 2, thread_name_prefix=f"{name}-io"
+        )
+        self._sem: asyncio.Semaphore | None = None
+        self._running: dict[int, tuple] = {}   # pid -> (process, key)
+        self._cancelled: set[int] = set()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_workers)
+        return self._sem
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    async def run(
+        self,
+        fn,
+        *args,
+        timeout: float | None = None,
+        key=None,
+        on_progress=None,
+        **kwargs,
+    ):
+        async with self._semaphore():
+            return await self._run_in_child(fn, args, kwargs, timeout, key, on_progress)
+
+    async def _run_in_child(self, fn, args, kwargs, timeout, key, on_progress):
+        loop = asyncio.get_running_loop()
+        parent_conn, child_conn = _CTX.Pipe(duplex=False)
+        proc = _CTX.Process(
+            target=_child_main,
+            args=(child_conn, fn, args, kwargs),
+            daemon=True,
+        )
+        proc.start()
+        child_conn.close()
+        self._running[proc.pid] = (proc, key)
+
+        progress_q: asyncio.Queue = asyncio.Queue()
+
+        def recv():
+            # reader thread: progress queue me (thread-safe), final msg return
+            while True:
+                try:
+                    msg = parent_conn.recv()
+                except (EOFError, OSError):
+                    return None
+                if msg[0] != "progress":
+                    return msg
+                if on_progress is not None:
+                    loop.call_soon_threadsafe(progress_q.put_nowait, msg[1])
+
+        async def deliver():
+            while True:
+                payload = await progress_q.get()
+                while not progress_q.empty():
+                    payload = progress_q.get_nowait()
+                try:
+                    await on_progress(payload)
+                except Exception as e:
+                    logging.debug("%s progress callback error: %s", self.name, e)
+
+        deliver_task = asyncio.create_task(deliver()) if on_progress is not None else None
+
+        try:
+            try:
+                msg = await asyncio.wait_for(loop.run_in_executor(self._threads, recv), timeout)
+            except asyncio.TimeoutError:
+                raise TaskTimeout(f"{self.name} task timed out after {timeout}s", "TimeoutError")
+
+            if msg is None:
+                await loop.run_in_executor(self._threads, proc.join, 5)
+                if proc.pid in self._cancelled:
+                    raise TaskCancelled(f"{self.name} task cancelled", "TaskCancelled")
+                raise TaskCrashed(
+                    f"{self.name} worker died (exit code {proc.exitcode})", "TaskCrashed"
+                )
+
+            kind, payload = msg
+            if kind == "result":
+                return payload
+            exc_type, text, tb = payload
+            raise TaskError(text or exc_type, exc_type, tb)
+        finally:
+            # timeout / cancel / normal – child kabhi zombie na rahe
+            if deliver_task is not None:
+                deliver_task.cancel()
+            self._running.pop(proc.pid, None)
+            self._cancelled.discard(proc.pid)
+            if proc.is_alive():
+                proc.kill()
+            await loop.run_in_executor(self._threads, proc.join, 5)
+            parent_conn.close()
+
+    def cancel(self, key) -> int:
+        """
+        Is key wale saare running tasks kill karta hai. Returns kitne kill hue.
+        """
+        killed = 0
+        for proc, k in list(self._running.values()):
+            if k == key and proc.is_alive():
+                self._cancelled.add(proc.pid)
+                proc.kill()
+                killed += 1
+        return killed
+
+    def shutdown(self):
+        for proc, _ in list(self._running.values()):
+            if proc.is_alive():
+                proc.kill()
+        if self._running:
+            logging.info("🛑 %s: %s worker(s) killed on shutdown", self.name, len(self._running))
+        self._running.clear()
+        self._threads.shutdown(wait=False, cancel_futures=True)
+
+
+# yt-dlp extraction + download ke liye shared pool
+ytdlp_executor = ProcessTaskPool(YTDLP_WORKERS, name="yt-dlp")
@@ -0,0 +1,272 @@
+# utils/file_store.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+from utils.cache import normalize_cache_url
+from utils.metrics import incr
+from config import DOWNLOAD_STORE_DIR, DOWNLOAD_STORE_MAX_MB
+
+# ==========================================
+#   CONTENT-ADDRESSED DOWNLOAD STORE
+# ==========================================
+#
+# Complete downloads yahan "<sha256>" naam se rakhe jate hain (same content
+# = ek hi blob). index.json:
+#   {
+#     "blobs": {sha: {"size", "name", "created", "last_used"}},
+#     "keys":  {"<normalized url>|<format>": sha},
+#   }
+# Job ko blob ka hardlink milta hai (asli file naam ke saath). Uploader sirf
+# apna link delete karta hai, blob store me rehta hai – upload fail ho ya same
+# file dobara mange to origin se refetch nahi hota.
+#
+# DOWNLOAD_STORE_MAX_MB byte budget; upar jaye to least-recently-used blobs
+# hat-te hain, lekin jo blob kisi chalti job ne pin kiya hai wo nahi.
+# DOWNLOAD_STORE_MAX_MB=0 -> store band.
+
+_HASH_CHUNK = 1024 * 1024
+_INDEX_NAME = "index.json"
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _place(src: str, dst: str):
+    """
+    dst pe src ka hardlink; alag filesystem ho to copy.
+    """
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _write_index(path: str, data: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class FileStore:
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._index: dict | None = None
+        self._pins: dict[str, int] = {}          # sha -> pin count
+        self._checked_out: dict[str, str] = {}   # job path -> sha
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    # ----------------------- INDEX ----------------------- #
+
+    def _index_path(self) -> str:
+        return os.path.join(self.root, _INDEX_NAME)
+
+    def _blob_path(self, sha: str) -> str:
+        return os.path.join(self.root, sha)
+
+    def _load(self) -> dict:
+        if self._index is not None:
+            return self._index
+        os.makedirs(self.root, exist_ok=True)
+        index = {"blobs": {}, "keys": {}}
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning("⚠️ download store index corrupt, resetting: %s", e)
+        # disk se gayab blobs hata do
+        index["blobs"] = {
+            sha: meta
+            for sha, meta in (index.get("blobs") or {}).items()
+            if os.path.exists(self._blob_path(sha))
+        }
+        index["keys"] = {
+            k: sha for k, sha in (index.get("keys") or {}).items() if sha in index["blobs"]
+        }
+        self._index = index
+        return index
+
+    def _save(self):
+        _write_index(self._index_path(), json.dumps(self._index))
+
+    async def _save_async(self):
+        # snapshot loop pe (index isi loop pe badalta hai), disk write thread me
+        await asyncio.to_thread(_write_index, self._index_path(), json.dumps(self._index))
+
+    @staticmethod
+    def _key(url: str, fmt_id: str | None) -> str:
+        return f"{normalize_cache_url(url)}|{fmt_id or 'direct'}"
+
+    # ----------------------- PIN ----------------------- #
+
+    def _pin(self, sha: str, job_path: str):
+        self._pins[sha] = self._pins.get(sha, 0) + 1
+        self._checked_out[os.path.abspath(job_path)] = sha
+
+    def release(self, job_path: str):
+        """
+        Job khatam (uploader cleanup) -> pin hatao. Unknown path pe no-op.
+        """
+        sha = self._checked_out.pop(os.path.abspath(job_path), None)
+        if sha is None:
+            return
+        left = self._pins.get(sha, 0) - 1
+        if left > 0:
+            self._pins[sha] = left
+        else:
+            self._pins.pop(sha, None)
+
+    def discard(self, job_path: str):
+        """
+        Job ki file (link) hatao + pin release. Store ka blob bacha rehta hai.
+        """
+        try:
+            if os.path.exists(job_path):
+                os.remove(job_path)
+        except Exception:
+            pass
+        self.release(job_path)
+
+    # ----------------------- PUBLIC ----------------------- #
+
+    async def checkout(self, url: str, fmt_id: str | None, job_path: str) -> str | None:
+        """
+        Store me ye URL + format pada hai to `job_path` pe link karke (pinned)
+        path return karta hai, warna None. Link / copy (alag filesystem pe
+        multi-GB) thread me hota hai – event loop nahi rukta.
+        """
+        if not self.enabled:
+            return None
+        try:
+            index = self._load()
+            sha = index["keys"].get(self._key(url, fmt_id))
+        except Exception as e:
+            logging.debug("download store checkout failed: %s", e)
+            sha = None
+        if not sha or not os.path.exists(self._blob_path(sha)):
+            incr("store.miss")
+            return None
+        # copy ke dauraan evict na ho
+        self._pin(sha, job_path)
+        try:
+            await asyncio.to_thread(_place, self._blob_path(sha), job_path)
+            if sha in index["blobs"]:
+                index["blobs"][sha]["last_used"] = time.time()
+            await self._save_async()
+        except Exception as e:
+            logging.debug("download store checkout failed: %s", e)
+            self.release(job_path)
+            incr("store.miss")
+            return None
+        incr("store.hit")
+        return job_path
+
+    async def checkin(self, url: str, fmt_id: str | None, job_path: str) -> str:
+        """
+        Fresh download ko store me daalo (SHA-256 streaming hash, thread me),
+        job_path pe pinned link wapas rakho. Kuch bhi fail ho to file jaisi thi
+        waisi rehti hai – upload kabhi store ki wajah se nahi rukta.
+        """
+        if not self.enabled or not os.path.exists(job_path):
+            return job_path
+        try:
+            size = os.path.getsize(job_path)
+            if size > self.max_bytes:
+                return job_path
+            sha = await asyncio.to_thread(_sha256_file, job_path)
+            index = self._load()
+            blob = self._blob_path(sha)
+            now = time.time()
+
+            if sha in index["blobs"] and os.path.exists(blob):
+                # same content pehle se hai (dusra URL / format) -> dedup
+                incr("store.dedup")
+            else:
+                await asyncio.to_thread(_place, job_path, blob)
+                index["blobs"][sha] = {
+                    "size": size,
+                    "name": os.path.basename(job_path),
+                    "created": now,
+                }
+            index["blobs"][sha]["last_used"] = now
+            index["keys"][self._key(url, fmt_id)] = sha
+            self._pin(sha, job_path)
+            self._evict()
+            await self._save_async()
+        except Exception as e:
+            logging.warning("⚠️ download store checkin failed: %s", e)
+        return job_path
+
+    def forget(self, url: str, fmt_id: str | None = None) -> int:
+        """
+        URL ke keys hatao (fmt_id None = saare formats). Blob LRU se jayega.
+        """
+        if not self.enabled:
+            return 0
+        index = self._load()
+        prefix = normalize_cache_url(url) + "|"
+        wanted = self._key(url, fmt_id) if fmt_id else None
+        drop = [k for k in index["keys"] if (k == wanted if wanted else k.startswith(prefix))]
+        for k in drop:
+            del index["keys"][k]
+        if drop:
+            self._save()
+        return len(drop)
+
+    def stats(self) -> dict:
+        index = self._load() if self.enabled else {"blobs": {}, "keys": {}}
+        return {
+            "blobs": len(index["blobs"]),
+            "keys": len(index["keys"]),
+            "bytes": sum(m["size"] for m in index["blobs"].values()),
+            "max_bytes": self.max_bytes,
+            "pinned": len(self._pins),
+        }
+
+    # ----------------------- EVICTION ----------------------- #
+
+    def _evict(self):
+        index = self._index
+        total = sum(m["size"] for m in index["blobs"].values())
+        if total <= self.max_bytes:
+            return
+        for sha, meta in sorted(index["blobs"].items(), key=lambda kv: kv[1].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            if sha in self._pins:
+                continue
+            try:
+                os.remove(self._blob_path(sha))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logging.debug("download store evict failed: %s", e)
+                continue
+            total -= meta["size"]
+            del index["blobs"][sha]
+            index["keys"] = {k: v for k, v in index["keys"].items() if v != sha}
+            incr("store.evict")
+
+
+download_store = FileStore(DOWNLOAD_STORE_DIR, DOWNLOAD_STORE_MAX_MB * 1024 * 1024)
@@ -4,10 +4,11 @@ from pyrogram.client import Client
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from pyrogram.errors import UserNotParticipant
 from config import FORCE_SUB_CHANNEL
+from utils.state_store import SharedState
 
-# Har user ke liye last force-sub message ka record:
-# { user_id: (chat_id, message_id) }
-FORCE_MESSAGES: dict[int, tuple[int, int]] = {}
+# Har user ke liye last force-sub message ka record (Mongo, sab nodes share):
+# { user_id: [chat_id, message_id] }
+FORCE_MESSAGES = SharedState("force_msg", ttl=2 * 24 * 3600)
 
 
 def _parse_force_chat_id() -> int | str | None:
@@ -147,7 +148,7 @@ async def ensure_forcesub(app: Client, message: Message) -> bool:
         )
 
         # Is user ke liye last force-sub message store kar lo
-        FORCE_MESSAGES[user_id] = (sent.chat.id, sent.id)
+        FORCE_MESSAGES[user_id] = [sent.chat.id, sent.id]
         return False
 
     except Exception:
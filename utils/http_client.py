@@ -0,0 +1,90 @@
+# utils/http_client.py
+import logging
+
+import aiohttp
+
+from config import (
+    PROXY_URL,
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+)
+
+# ==========================================
+#   PROCESS-WIDE POOLED HTTP CLIENT
+# ==========================================
+#
+# main.py startup pe start_http_client() aur shutdown pe close_http_client()
+# call karta hai. Har downloader path get_http_session() se yahi session leta
+# hai, taki DNS / TCP / TLS handshake har job me dobara na ho.
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+
+# default per-request timeouts (total=None: bade downloads ghanton chal sakte hain)
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=20, sock_read=60)
+
+_session: aiohttp.ClientSession | None = None
+
+
+def _build_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        use_dns_cache=True,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+        # proxy ke peeche cert verify skip (purana behaviour)
+        ssl=False if PROXY_URL else None,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=DEFAULT_TIMEOUT,
+        headers={"User-Agent": USER_AGENT},
+    )
+
+
+async def start_http_client() -> aiohttp.ClientSession:
+    """
+    Startup pe shared session banata hai (dobara call safe hai).
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _build_session()
+        logging.info(
+            "🌐 HTTP pool ready (limit=%s, per_host=%s, proxy=%s)",
+            HTTP_POOL_LIMIT,
+            HTTP_POOL_LIMIT_PER_HOST,
+            "on" if PROXY_URL else "off",
+        )
+    return _session
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Shared session. Agar startup se pehle call ho gaya (scripts etc.) to
+    lazily bana deta hai – running event loop ke andar hi call karo.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _build_session()
+    return _session
+
+
+def request_kwargs() -> dict:
+    """
+    Har request ke saath jaane wale common kwargs (proxy).
+    """
+    return {"proxy": PROXY_URL} if PROXY_URL else {}
+
+
+async def close_http_client():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
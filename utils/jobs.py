@@ -0,0 +1,658 @@
+# utils/jobs.py
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from utils.pipeline import run_download_job
+from utils.executor import TaskCancelled
+from utils.file_store import download_store
+from utils.workspace import workspaces
+from utils.scheduler import FairScheduler, job_size
+from utils.metrics import incr
+from utils.progress import format_eta, human_readable
+from utils.reactions import react_message
+from config import (
+    JOB_WORKERS,
+    JOB_PER_USER,
+    JOB_EXPRESS_WORKERS,
+    JOB_EXPRESS_MB,
+    NODE_ID,
+    NODE_ROLE,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETENTION_HOURS,
+)
+from database import (
+    get_user_doc,
+    insert_job,
+    list_jobs,
+    claim_job,
+    set_job_state,
+    renew_job_lease,
+    reclaim_jobs,
+    expired_lease_query,
+    save_job_checkpoint,
+    cancel_user_jobs,
+    node_heartbeat,
+    live_nodes,
+    remove_node,
+    prune_jobs,
+)
+
+# ==========================================
+#   JOB QUEUE + WORKER POOL
+# ==========================================
+#
+# Handlers sirf job enqueue karte hain (Mongo "jobs" collection) aur
+# "queue me hai" dikhate hain. JOB_WORKERS workers queue se jobs claim karke
+# download -> upload pipeline chalate hain:
+#   - global: ek saath max JOB_WORKERS heavy jobs (disk / bandwidth / ffmpeg)
+#   - per user: ek user ke max JOB_PER_USER jobs chalte hain, baaki queue me
+#   - JOB_EXPRESS_WORKERS extra workers sirf <= JOB_EXPRESS_MB (size pata ho)
+#     wale jobs lete hain – 2 GB files chhoti files ko block nahi kartin
+# Kaunsa job pehle: utils/scheduler.FairScheduler (plan lanes ke weights,
+# lane me per-user round-robin, user me chhoti file pehle).
+#
+# States:
+#   queued -> probing -> downloading -> postprocessing -> uploading -> done
+#                                                      \-> failed / cancelled
+#
+# Job doc: user_id, premium, size (0 = pata nahi), chat_id, chat_msg_id,
+# progress_msg_id, job (url / fmt_id / filename / thumb_url), remaining_size,
+# state, error, created / started / updated, owner / lease_until / attempts.
+# yt-dlp ka bada info dict Mongo me nahi jata – sirf enqueue karne wale process
+# ki memory me (dusra node / restart ke baad worker fresh extraction karta hai).
+#
+# Multi-node (NODE_ROLE=front / worker, sab ek hi Mongo pe):
+#   - claim ke saath job pe node ka lease (owner = NODE_ID, lease_until),
+#     heartbeat har JOB_LEASE_SECONDS/3 pe renew karta hai
+#   - lease expire (node crash / network gaya) -> koi bhi node job wapas
+#     queue me daal deta hai (attempts + 1, JOB_MAX_ATTEMPTS ke baad failed)
+#   - renew fail = job kisi aur ko mil chuka -> is node pe uska task cancel
+#   - per-user limit sab nodes ke active jobs pe (Mongo se) lagta hai
+#   - scheduler ka fairness state har node ka apna hai
+#
+# Recovery: pipeline har stage ke baad job doc me `checkpoint` likhta hai
+# (utils/pipeline.py). Restart / reclaim ke baad job wapas queue me jata hai,
+# progress message pe "resume" dikhta hai aur worker checkpoint ke baad wale
+# stage se shuru karta hai (downloaded file disk pe ho to download skip).
+# Job final fail ho to checkpoint ki files hata di jati hain.
+#
+# Disk: har job apne workspace (utils/workspace.py) me chalta hai. Claim se
+# pehle disk watermark / quota check – jagah na ho to job queue me rukta hai.
+
+QUEUED = "queued"
+PROBING = "probing"
+DOWNLOADING = "downloading"
+POSTPROCESSING = "postprocessing"
+UPLOADING = "uploading"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATES = [PROBING, DOWNLOADING, POSTPROCESSING, UPLOADING]
+FINISHED_STATES = [DONE, FAILED, CANCELLED]
+
+# koi naya job notify na kare tab bhi itne seconds me queue dobara dekho
+# (dusre process ne enqueue kiya ho)
+_POLL_INTERVAL = 5.0
+# itne seconds tak sab workers ek hi queued / active listing share karte hain
+# (har worker har poll pe poori listing Mongo se na laye)
+_SNAPSHOT_TTL = 1.0
+# nodes collection me itne purane heartbeat wale node "dead" maane jate hain
+_NODE_TTL = max(JOB_LEASE_SECONDS, 15)
+# startup ke baad bhi itne seconds pe workspace sweep (crash ke turant baad
+# restart pe purana node tab tak "zinda" dikhta hai) aur purane khatam jobs
+# ki pruning
+_SWEEP_INTERVAL = 600
+
+
+class JobQueue:
+    def __init__(self, workers: int, per_user: int, express_workers: int = 0, express_mb: int = 0):
+        self.workers = max(1, workers)
+        self.per_user = max(1, per_user)
+        self.express_workers = max(0, express_workers)
+        self.express_max = express_mb * 1024 * 1024
+        self.scheduler = FairScheduler()
+        self._client = None
+        self._tasks: list[asyncio.Task] = []
+        self._wake: asyncio.Event | None = None
+        self._snapshot = None                # (monotonic ts, queued docs, user_id -> running)
+        self._running: dict[int, int] = {}   # user_id -> is node pe chal rahe jobs
+        self._live: dict = {}                # job_id -> (chat_msg, progress_msg, info)
+        self._active: dict = {}              # job_id -> asyncio.Task (is node pe)
+        self._lost: set = set()              # lease gaya -> cancel kiye gaye jobs
+        self._run_workers = True
+
+    # ----------------------- HANDLER SIDE ----------------------- #
+
+    async def enqueue(
+        self,
+        client,
+        chat_msg,
+        progress_msg,
+        user_id: int,
+        job: dict,
+        remaining_size: int | None = None,
+    ):
+        """
+        Job queue me daalo, progress_msg pe position dikhao. Returns job id.
+        """
+        stored = {k: v for k, v in job.items() if k != "info"}
+        job_id = insert_job(
+            {
+                "user_id": user_id,
+                "premium": bool(get_user_doc(user_id).get("is_premium")),
+                "size": int(job.get("size") or 0),
+                "chat_id": progress_msg.chat.id,
+                "chat_msg_id": chat_msg.id,
+                "progress_msg_id": progress_msg.id,
+                "job": stored,
+                "remaining_size": remaining_size,
+                "state": QUEUED,
+            }
+        )
+        self._live[job_id] = (chat_msg, progress_msg, job.get("info"))
+        incr("jobs.enqueued")
+
+        ahead, eta = self.position(user_id, job_id)
+        try:
+            await progress_msg.edit_text(
+                "🕒 Job queue me hai...\n"
+                f"📄 File: `{job['filename']}`\n"
+                f"👥 Aage: {ahead} job(s) | ⏳ Start ~{format_eta(eta)}\n"
+                "ℹ️ /queue se status dekho."
+            )
+        except Exception:
+            pass
+
+        self._kick()
+        return job_id
+
+    def cancel_queued(self, user_id: int) -> int:
+        """
+        User ke abhi tak shuru na hue jobs cancel. Returns count.
+        """
+        ids = cancel_user_jobs(user_id, QUEUED, CANCELLED)
+        for job_id in ids:
+            self._live.pop(job_id, None)
+        if ids:
+            incr("jobs.cancelled", len(ids))
+        return len(ids)
+
+    # ----------------------- WORKERS ----------------------- #
+
+    def start(self, client, run_workers: bool = True):
+        """
+        run_workers=False: front node – sirf enqueue + lease reclaim, jobs nahi chalata.
+        """
+        self._client = client
+        self._wake = asyncio.Event()
+        self._run_workers = run_workers
+        requeued, failed = self._recover()
+        if run_workers:
+            self._sweep_workspaces()
+        self._tasks = [
+            asyncio.create_task(self._announce_recovery(requeued, failed)),
+            asyncio.create_task(self._heartbeat()),
+            asyncio.create_task(self._reclaimer()),
+        ]
+        if run_workers:
+            self._tasks += [
+                asyncio.create_task(self._worker(n)) for n in range(self.workers)
+            ] + [
+                asyncio.create_task(self._worker(self.workers + n, express=True))
+                for n in range(self.express_workers if self.express_max > 0 else 0)
+            ]
+        logging.info(
+            "🧵 Node %s (%s): %s + %s express job workers (per user %s)",
+            NODE_ID, NODE_ROLE,
+            self.workers if run_workers else 0,
+            self.express_workers if run_workers else 0,
+            self.per_user,
+        )
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # adhure jobs turant dusre nodes ke liye chhod do (lease expiry ka wait nahi);
+        # deploy / graceful stop attempt me nahi ginta
+        try:
+            reclaim_jobs(
+                {"owner": NODE_ID}, ACTIVE_STATES, QUEUED, FAILED, JOB_MAX_ATTEMPTS, penalize=False
+            )
+            remove_node(NODE_ID)
+        except Exception as e:
+            logging.warning("job release on stop failed: %s", e)
+
+    def _recover(self) -> tuple[list, list]:
+        """
+        Startup recovery: isi NODE_ID ke pichhle process (crash / OOM / deploy)
+        ke adhure jobs checkpoint ke saath wapas queue me. Workers start hone se
+        pehle (sync) – warna naya claim hua job bhi "pichhla" lagta.
+        """
+        try:
+            requeued, failed = reclaim_jobs(
+                {"owner": NODE_ID}, ACTIVE_STATES, QUEUED, FAILED, JOB_MAX_ATTEMPTS
+            )
+        except Exception as e:
+            logging.warning("job recovery failed: %s", e)
+            return [], []
+        if requeued or failed:
+            logging.warning(
+                "♻️ recovery: %s job(s) resume honge, %s failed", len(requeued), len(failed)
+            )
+            incr("jobs.recovered", len(requeued))
+        return requeued, failed
+
+    def _sweep_workspaces(self):
+        """
+        Jin workspaces ka job ab queue / active me nahi (crash ke orphans,
+        adhoore /rename) unhe hatao – apne aur dead nodes ke.
+        """
+        try:
+            keep = {d["_id"] for d in list_jobs([QUEUED] + ACTIVE_STATES)}
+            live = {
+                n["_id"] for n in live_nodes(datetime.utcnow() - timedelta(seconds=_NODE_TTL))
+            }
+            live.add(NODE_ID)
+            workspaces.sweep(keep, live_nodes=live)
+        except Exception as e:
+            logging.warning("workspace sweep failed: %s", e)
+
+    async def _announce_recovery(self, requeued: list, failed: list):
+        for doc in requeued:
+            stage = (doc.get("checkpoint") or {}).get("stage")
+            await self._notify(
+                doc,
+                "♻️ Bot restart hua – aapka job wapas queue me hai"
+                + (f" aur `{stage}` stage ke baad se resume hoga." if stage else ".")
+            )
+        for doc in failed:
+            incr("jobs.failed")
+            self._drop_artifacts(doc)
+            await self._notify(doc, "❌ Job fail: bot baar baar restart hua, dobara try karo.")
+
+    @staticmethod
+    def _drop_artifacts(doc: dict):
+        """
+        Final fail hue job ki checkpoint files (downloaded link, thumbnail).
+        """
+        cp = doc.get("checkpoint") or {}
+        if cp.get("path"):
+            download_store.discard(cp["path"])
+        if cp.get("thumb"):
+            try:
+                os.remove(cp["thumb"])
+            except OSError:
+                pass
+        workspaces.release(doc["_id"])
+
+    def _lease_until(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+
+    async def _heartbeat(self):
+        """
+        Node ka heartbeat + is node ke chal rahe jobs ke lease renew.
+        """
+        while True:
+            try:
+                node_heartbeat(
+                    NODE_ID,
+                    {
+                        "role": NODE_ROLE,
+                        "workers": self.workers if self._run_workers else 0,
+                        "express_workers": self.express_workers if self._run_workers else 0,
+                        "running": self.running,
+                    },
+                )
+                for job_id, task in list(self._active.items()):
+                    ws = workspaces.get(job_id)
+                    if ws is not None:
+                        ws.usage()   # peak disk usage ka sample
+                    if not renew_job_lease(job_id, NODE_ID, ACTIVE_STATES, self._lease_until()):
+                        # kisi aur node ne reclaim kar liya – yahan ka kaam bekaar
+                        logging.warning("job %s: lease lost, cancelling", job_id)
+                        incr("jobs.lease_lost")
+                        self._lost.add(job_id)
+                        task.cancel()
+            except Exception as e:
+                logging.warning("job heartbeat failed: %s", e)
+            await asyncio.sleep(max(1.0, JOB_LEASE_SECONDS / 3))
+
+    def _prune_finished(self):
+        """
+        JOB_RETENTION_HOURS se purane done / failed / cancelled jobs hatao
+        (jobs collection hamesha badhta na rahe).
+        """
+        try:
+            n = prune_jobs(
+                FINISHED_STATES, datetime.utcnow() - timedelta(hours=JOB_RETENTION_HOURS)
+            )
+        except Exception as e:
+            logging.warning("job prune failed: %s", e)
+            return
+        if n:
+            incr("jobs.pruned", n)
+            logging.info("🧹 %s purane job(s) hataye", n)
+
+    async def _reclaimer(self):
+        """
+        Expired lease wale jobs (dead node) wapas queue me / failed.
+        Har node chalata hai – update conditional hai, do nodes double nahi karte.
+        """
+        last_sweep = time.monotonic()
+        while True:
+            await asyncio.sleep(max(1.0, JOB_LEASE_SECONDS / 2))
+            if time.monotonic() - last_sweep >= _SWEEP_INTERVAL:
+                last_sweep = time.monotonic()
+                self._prune_finished()
+                if self._run_workers:
+                    self._sweep_workspaces()
+            try:
+                requeued, failed = reclaim_jobs(
+                    expired_lease_query(datetime.utcnow()),
+                    ACTIVE_STATES, QUEUED, FAILED, JOB_MAX_ATTEMPTS,
+                )
+            except Exception as e:
+                logging.warning("job reclaim failed: %s", e)
+                continue
+            if requeued:
+                incr("jobs.reclaimed", len(requeued))
+                logging.warning("♻️ %s expired job(s) wapas queue me", len(requeued))
+                self._kick()
+            for doc in failed:
+                incr("jobs.failed")
+                self._drop_artifacts(doc)
+                await self._notify(doc, "❌ Job fail: worker baar baar band hua, dobara try karo.")
+
+    async def _notify(self, doc: dict, text: str):
+        try:
+            await self._client.edit_message_text(doc["chat_id"], doc["progress_msg_id"], text)
+        except Exception:
+            pass
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    def _kick(self):
+        """
+        Queue badli (enqueue / slot khali / reclaim): snapshot purana, workers jagao.
+        """
+        self._snapshot = None
+        if self._wake is not None:
+            self._wake.set()
+
+    def _queue_snapshot(self) -> tuple[list, dict]:
+        """
+        (queued docs, user_id -> sab nodes pe chal rahe jobs) – _SNAPSHOT_TTL
+        tak sab workers ke liye ek hi Mongo read. _claim isse apne claim ke
+        hisaab se update karta hai.
+        """
+        now = time.monotonic()
+        snap = self._snapshot
+        if snap is None or now - snap[0] >= _SNAPSHOT_TTL:
+            queued = list_jobs([QUEUED])
+            running: dict[int, int] = {}
+            if queued:
+                for d in list_jobs(ACTIVE_STATES):
+                    running[d["user_id"]] = running.get(d["user_id"], 0) + 1
+            snap = self._snapshot = (now, queued, running)
+        return snap[1], snap[2]
+
+    def _claim(self, express: bool = False):
+        shared, running = self._queue_snapshot()
+        if not shared:
+            return None
+        queued = list(shared)
+
+        def taken(job_id):
+            # claim ho gaya / kisi aur ne liya: baaki workers bhi skip karein
+            shared[:] = [d for d in shared if d["_id"] != job_id]
+
+        while True:
+            doc = self.scheduler.pick(
+                queued,
+                running,
+                self.per_user,
+                max_size=self.express_max if express else None,
+            )
+            if doc is None:
+                return None
+            refusal = workspaces.refusal(job_size(doc))
+            if refusal is not None:
+                # ye job abhi disk me fit nahi – chhote eligible jobs try karo,
+                # ye queue me rukta hai (chal rahe jobs khatam hone pe wake)
+                logging.debug("job %s waiting: %s", doc["_id"], refusal)
+                incr("workspace.throttled")
+                queued = [d for d in queued if d["_id"] != doc["_id"]]
+                continue
+            claimed = claim_job(
+                doc["_id"], QUEUED, PROBING, owner=NODE_ID, lease_until=self._lease_until()
+            )
+            taken(doc["_id"])
+            if claimed is not None:
+                # per-user limit (sab nodes pe)
+                running[claimed["user_id"]] = running.get(claimed["user_id"], 0) + 1
+                self.scheduler.commit(claimed)
+                workspaces.open(claimed["_id"], job_size(claimed), force=True)
+                return claimed
+            # kisi aur ne utha liya / cancel ho gaya
+            queued = [d for d in queued if d["_id"] != doc["_id"]]
+
+    # ----------------------- QUEUE VIEW ----------------------- #
+
+    def plan(self) -> list:
+        """
+        [(doc, start_in_seconds), ...] poori queue ka simulated order.
+        """
+        workers, express = self._cluster_workers()
+        return self.scheduler.plan(
+            list_jobs([QUEUED]),
+            list_jobs(ACTIVE_STATES),
+            workers,
+            self.per_user,
+            express_workers=express,
+            express_max=self.express_max or None,
+        )
+
+    def _cluster_workers(self) -> tuple[int, int]:
+        """
+        (workers, express) sab zinda nodes ka total – ETA poore cluster ka.
+        """
+        try:
+            nodes = live_nodes(datetime.utcnow() - timedelta(seconds=_NODE_TTL))
+        except Exception:
+            nodes = []
+        workers = sum(int(n.get("workers") or 0) for n in nodes)
+        express = sum(int(n.get("express_workers") or 0) for n in nodes)
+        if workers <= 0:
+            return self.workers, self.express_workers
+        return workers, express
+
+    def position(self, user_id: int, job_id) -> tuple[int, float]:
+        """
+        (aage kitne jobs, estimated start seconds) ek queued job ke liye.
+        """
+        for i, (doc, start) in enumerate(self.plan()):
+            if doc["_id"] == job_id:
+                return i, start
+        return 0, 0.0
+
+    async def _worker(self, n: int, express: bool = False):
+        while True:
+            # claim se pehle clear: beech me aaya enqueue wake miss nahi hota
+            self._wake.clear()
+            try:
+                doc = self._claim(express)
+            except Exception as e:
+                logging.warning("job claim failed: %s", e)
+                doc = None
+
+            if doc is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), _POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            user_id = doc["user_id"]
+            job_id = doc["_id"]
+            self._running[user_id] = self._running.get(user_id, 0) + 1
+            task = asyncio.create_task(self._run(doc))
+            self._active[job_id] = task
+            keep_workspace = False
+            try:
+                await task
+            except asyncio.CancelledError:
+                if job_id not in self._lost:
+                    # node band ho raha hai: restart ke baad isi workspace se resume
+                    keep_workspace = True
+                    raise
+                # lease gaya, job dusre node pe hai – worker chalta rahe
+            except Exception as e:
+                logging.exception("job %s crashed", job_id)
+                set_job_state(job_id, FAILED, owner=NODE_ID, error=str(e))
+            finally:
+                if keep_workspace:
+                    workspaces.detach(job_id)
+                else:
+                    workspaces.release(job_id)
+                self._active.pop(job_id, None)
+                self._lost.discard(job_id)
+                left = self._running.get(user_id, 0) - 1
+                if left > 0:
+                    self._running[user_id] = left
+                else:
+                    self._running.pop(user_id, None)
+                self._live.pop(job_id, None)
+                # slot khali -> dusra worker is user ka agla job utha sake
+                self._kick()
+
+    async def _messages(self, doc: dict):
+        live = self._live.get(doc["_id"])
+        if live is not None:
+            return live
+        msgs = await self._client.get_messages(
+            doc["chat_id"], [doc["chat_msg_id"], doc["progress_msg_id"]]
+        )
+        return msgs[0], msgs[1], None
+
+    async def _run(self, doc: dict):
+        job_id = doc["_id"]
+        chat_msg, progress_msg, info = await self._messages(doc)
+        if progress_msg is None or getattr(progress_msg, "empty", False):
+            set_job_state(job_id, FAILED, owner=NODE_ID, error="progress message missing")
+            return
+
+        job = dict(doc["job"])
+        if info is not None:
+            job["info"] = info
+        job["checkpoint"] = doc.get("checkpoint")
+        job["workspace"] = workspaces.open(job_id, job_size(doc), force=True).path
+        if doc.get("checkpoint") or doc.get("attempts"):
+            try:
+                await progress_msg.edit_text("♻️ Job resume ho raha hai...")
+            except Exception:
+                pass
+
+        async def on_state(state: str):
+            set_job_state(job_id, state, owner=NODE_ID)
+
+        async def on_checkpoint(checkpoint: dict):
+            save_job_checkpoint(job_id, NODE_ID, checkpoint)
+
+        try:
+            ok = await run_download_job(
+                self._client,
+                chat_msg,
+                progress_msg,
+                doc["user_id"],
+                job,
+                remaining_size=doc.get("remaining_size"),
+                on_state=on_state,
+                on_checkpoint=on_checkpoint,
+            )
+        except TaskCancelled:
+            # /cancel – user ki marzi, failure nahi
+            set_job_state(job_id, CANCELLED, owner=NODE_ID, lease_until=None)
+            incr("jobs.cancelled")
+            return
+        except Exception as e:
+            ok = False
+            set_job_state(job_id, FAILED, owner=NODE_ID, error=str(e))
+            incr("jobs.failed")
+            try:
+                await progress_msg.edit_text(f"❌ Error: `{e}`")
+            except Exception:
+                pass
+            return
+
+        set_job_state(job_id, DONE if ok else FAILED, owner=NODE_ID, lease_until=None)
+        incr("jobs.done" if ok else "jobs.failed")
+        if ok and doc.get("size") and doc.get("started"):
+            elapsed = (datetime.utcnow() - doc["started"]).total_seconds()
+            self.scheduler.record_job(doc["size"], elapsed)
+        if ok:
+            try:
+                await react_message(self._client, chat_msg, "success")
+            except Exception:
+                pass
+
+
+job_queue = JobQueue(JOB_WORKERS, JOB_PER_USER, JOB_EXPRESS_WORKERS, JOB_EXPRESS_MB)
+
+
+# ----------------------- /queue TEXT ----------------------- #
+
+_STATE_ICONS = {
+    PROBING: "🔍",
+    DOWNLOADING: "⬇️",
+    POSTPROCESSING: "⚙️",
+    UPLOADING: "📤",
+}
+
+
+def _job_name(doc: dict) -> str:
+    return ((doc.get("job") or {}).get("filename") or "file")[:40]
+
+
+def _job_size(doc: dict) -> str:
+    return human_readable(doc["size"]) if doc.get("size") else "size ?"
+
+
+def render_queue(user_id: int, admin: bool = False) -> str:
+    plan = job_queue.plan()
+    active = list_jobs(ACTIVE_STATES)
+    lines = [f"📋 Queue: {len(plan)} waiting | {len(active)} running"]
+
+    mine_active = [d for d in active if d["user_id"] == user_id]
+    if mine_active:
+        lines.append("\n▶️ Aapke chal rahe jobs:")
+        for d in mine_active:
+            lines.append(f"{_STATE_ICONS.get(d['state'], '•')} `{_job_name(d)}` – {d['state']}")
+
+    mine = [(i, d, start) for i, (d, start) in enumerate(plan) if d["user_id"] == user_id]
+    if mine:
+        lines.append("\n🕒 Aapke queued jobs:")
+        for i, d, start in mine:
+            lines.append(
+                f"#{i + 1} `{_job_name(d)}` ({_job_size(d)}) – start ~{format_eta(start)}"
+            )
+
+    if not mine and not mine_active:
+        lines.append("\nℹ️ Aapka koi job queue me nahi hai.")
+
+    if admin and plan:
+        lines.append("\n👮 Agle jobs (sab users):")
+        for i, (d, start) in enumerate(plan[:10]):
+            lane = "⭐" if d.get("premium") else "•"
+            lines.append(
+                f"{lane} #{i + 1} `{d['user_id']}` {_job_size(d)} – ~{format_eta(start)}"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,123 @@
+# utils/media_cache.py
+import hashlib
+import logging
+
+from utils.cache import normalize_cache_url
+from utils.metrics import incr
+from config import MEDIA_CACHE
+from database import (
+    get_cached_media,
+    save_cached_media,
+    touch_cached_media,
+    delete_cached_media,
+    delete_cached_media_by_id,
+)
+
+# ==========================================
+#   TELEGRAM file_id CACHE
+# ==========================================
+#
+# Har successful upload LOG_CHANNEL me copy hota hai. Us copy ka file_id
+# (normalized URL, format id, upload type, variant) ke against Mongo me save
+# hota hai; agli baar same link + quality aaye to bina download / upload ke
+# seedha file_id se bhej dete hain.
+#
+# variant: uploaded document me final file naam (custom naam / rename +
+# prefix / suffix) aur thumbnail andar hi hote hain – alag naam / custom thumb
+# wale user ko kisi aur ka naam / thumb na mile, isliye ye bhi key ka hissa hain.
+#
+# Counters: media_cache.hit / .miss / .stale (file_id reject hua -> entry delete)
+
+DIRECT_FMT = "direct"
+
+
+def media_key(url: str, fmt_id: str | None = None) -> tuple[str, str]:
+    return normalize_cache_url(url), fmt_id or DIRECT_FMT
+
+
+def media_variant(user: dict, final_name: str) -> str:
+    """
+    Jo cheezein uploaded file me hi baith jati hain (final file naam – prefix /
+    suffix ke saath – aur custom thumb) unka chhota hash.
+    """
+    parts = [final_name, user.get("thumb_file_id") or ""]
+    return hashlib.sha1("\x00".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def lookup_media(url: str, fmt_id: str | None, upload_type: str, variant: str = "") -> dict | None:
+    if not MEDIA_CACHE:
+        return None
+    url_key, fmt = media_key(url, fmt_id)
+    try:
+        doc = get_cached_media(url_key, fmt, upload_type, variant)
+    except Exception as e:
+        logging.debug("media cache lookup failed: %s", e)
+        doc = None
+    incr("media_cache.hit" if doc else "media_cache.miss")
+    return doc
+
+
+def mark_hit(doc: dict):
+    try:
+        touch_cached_media(doc["_id"])
+    except Exception:
+        pass
+
+
+def mark_stale(doc: dict):
+    """
+    Telegram ne cached file_id reject kiya -> entry hata do, normal flow chalega.
+    """
+    incr("media_cache.stale")
+    try:
+        delete_cached_media_by_id(doc["_id"])
+    except Exception:
+        pass
+
+
+def remember_upload(
+    url: str,
+    fmt_id: str | None,
+    upload_type: str,
+    stored_msg,
+    base_name: str,
+    file_size: int,
+    duration: int | None = None,
+    variant: str = "",
+):
+    """
+    Upload ke baad (LOG_CHANNEL copy ya original) message se file_id save karo.
+    """
+    if not MEDIA_CACHE or stored_msg is None:
+        return
+    media = stored_msg.video or stored_msg.document
+    if media is None:
+        return
+    url_key, fmt = media_key(url, fmt_id)
+    try:
+        save_cached_media(
+            url_key,
+            fmt,
+            upload_type,
+            variant,
+            {
+                "file_id": media.file_id,
+                "file_unique_id": media.file_unique_id,
+                "kind": "video" if stored_msg.video else "document",
+                "file_name": base_name,
+                "file_size": file_size,
+                "duration": duration,
+                "chat_id": stored_msg.chat.id,
+                "message_id": stored_msg.id,
+            },
+        )
+    except Exception as e:
+        logging.debug("media cache save failed: %s", e)
+
+
+def invalidate_media(url: str, fmt_id: str | None = None) -> int:
+    """
+    Is URL (aur diya ho to sirf is format) ki saari cached uploads hatao.
+    """
+    url_key, _ = media_key(url)
+    return delete_cached_media(url_key, fmt_id)
@@ -1,51 +1,227 @@
+import asyncio
+import json
+import math
 import os
-import subprocess
+from collections import OrderedDict
 from typing import Optional, List
 
+from utils.metrics import incr
+from utils.mp4 import moov_before_mdat, relocate_moov, FaststartUnsupported
+from config import FFMPEG_CONCURRENCY, FFMPEG_TIMEOUT, FFPROBE_TIMEOUT
+
+# Saare ffmpeg / ffprobe calls asyncio child processes hain: event loop kabhi
+# block nahi hota, timeout ya task cancel hone par child kill + reap hota hai,
+# aur ek saath max FFMPEG_CONCURRENCY (default CPU cores) processes chalte hain.
+
+# stderr ka itna tail log me (poora ffmpeg banner nahi)
+_STDERR_TAIL = 600
+
+_sem: Optional[asyncio.Semaphore] = None
+
 
 # -------------------------------------------------
 #   HELPERS
 # -------------------------------------------------
 
-def _run(cmd: list) -> bool:
+def _limit() -> asyncio.Semaphore:
+    global _sem
+    if _sem is None:
+        _sem = asyncio.Semaphore(FFMPEG_CONCURRENCY or os.cpu_count() or 2)
+    return _sem
+
+
+async def _kill(proc) -> None:
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+    await proc.wait()
+
+
+async def _exec(cmd: list, timeout: float) -> tuple[int, bytes, bytes]:
+    """
+    cmd chalao -> (returncode, stdout, stderr). Timeout pe asyncio.TimeoutError,
+    cancel pe CancelledError – dono me child pehle kill ho jata hai.
+    """
+    async with _limit():
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            out, err = await asyncio.wait_for(proc.communicate(), timeout)
+        except BaseException:
+            await asyncio.shield(_kill(proc))
+            raise
+        return proc.returncode, out, err
+
+
+async def _run(cmd: list, timeout: float = FFMPEG_TIMEOUT) -> bool:
     try:
-        subprocess.run(cmd, check=True)
-        return True
-    except Exception as e:
+        code, _, err = await _exec(cmd, timeout)
+    except asyncio.TimeoutError:
+        print(f"[media_tools] {cmd[0]} timeout ({timeout}s), killed")
+        return False
+    except FileNotFoundError as e:
         print("[media_tools] ffmpeg error:", e)
         return False
+    if code != 0:
+        tail = err.decode(errors="replace").strip()[-_STDERR_TAIL:]
+        print(f"[media_tools] {cmd[0]} exit {code}: {tail}")
+        return False
+    return True
 
 
 # -------------------------------------------------
-#   DURATION
+#   MEDIA INFO (ek ffprobe per file)
 # -------------------------------------------------
 
-def get_media_duration(path: str) -> Optional[int]:
-    if not os.path.exists(path):
-        return None
+# (path, size, mtime) -> MediaInfo; file badli (faststart, naya download) to
+# key apne aap badal jati hai
+_INFO_CACHE_MAX = 256
+_info_cache: "OrderedDict[tuple, MediaInfo]" = OrderedDict()
+_info_inflight: dict = {}
+
+
+class MediaInfo:
+    """
+    ffprobe -show_format -show_streams ka compact result.
+    width / height display orientation me (rotation lag chuka).
+    """
+
+    __slots__ = ("duration", "width", "height", "vcodec", "acodec", "container")
+
+    def __init__(self, duration=0.0, width=0, height=0, vcodec=None, acodec=None, container=None):
+        self.duration = duration
+        self.width = width
+        self.height = height
+        self.vcodec = vcodec
+        self.acodec = acodec
+        self.container = container
+
+    @property
+    def seconds(self) -> Optional[int]:
+        dur = int(self.duration)
+        return dur if dur > 0 else None
+
+    @classmethod
+    def from_ffprobe(cls, data: dict) -> "MediaInfo":
+        fmt = data.get("format") or {}
+        streams = data.get("streams") or []
+        video = next(
+            (
+                st for st in streams
+                if st.get("codec_type") == "video"
+                and not (st.get("disposition") or {}).get("attached_pic")
+            ),
+            None,
+        )
+        audio = next((st for st in streams if st.get("codec_type") == "audio"), None)
+
+        duration = _to_float(fmt.get("duration")) or _to_float((video or {}).get("duration"))
+        width = int((video or {}).get("width") or 0)
+        height = int((video or {}).get("height") or 0)
+        if video and abs(_rotation(video)) % 180 == 90:
+            width, height = height, width
+
+        return cls(
+            duration=duration,
+            width=width,
+            height=height,
+            vcodec=(video or {}).get("codec_name"),
+            acodec=(audio or {}).get("codec_name"),
+            container=fmt.get("format_name"),
+        )
+
+    def __repr__(self):
+        return (
+            f"MediaInfo({self.duration:.1f}s {self.width}x{self.height} "
+            f"{self.vcodec}/{self.acodec} {self.container})"
+        )
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _rotation(stream: dict) -> int:
+    for side in stream.get("side_data_list") or []:
+        if "rotation" in side:
+            return int(_to_float(side["rotation"]))
+    return int(_to_float((stream.get("tags") or {}).get("rotate")))
+
+
+async def _ffprobe(path: str) -> Optional[MediaInfo]:
     try:
-        out = subprocess.check_output(
+        code, out, err = await _exec(
             [
                 "ffprobe",
                 "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
+                "-show_format",
+                "-show_streams",
+                "-of", "json",
                 path,
-            ]
-        ).decode().strip()
-
-        dur = int(float(out))
-        return dur if dur > 0 else None
+            ],
+            FFPROBE_TIMEOUT,
+        )
+        if code != 0:
+            raise RuntimeError(err.decode(errors="replace").strip()[-_STDERR_TAIL:])
+        return MediaInfo.from_ffprobe(json.loads(out.decode(errors="replace") or "{}"))
     except Exception as e:
-        print("[media_tools] duration error:", e)
+        print("[media_tools] probe error:", e)
         return None
 
 
+async def probe_media(path: str) -> Optional[MediaInfo]:
+    """
+    File ka MediaInfo – same (path, size, mtime) ke liye ffprobe sirf ek baar,
+    ek saath aaye callers ek hi ffprobe ka result share karte hain.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+    info = _info_cache.get(key)
+    if info is not None:
+        _info_cache.move_to_end(key)
+        incr("mediainfo.hit")
+        return info
+
+    task = _info_inflight.get(key)
+    if task is None:
+        incr("mediainfo.miss")
+        task = asyncio.ensure_future(_ffprobe(path))
+        _info_inflight[key] = task
+        try:
+            info = await asyncio.shield(task)
+        finally:
+            _info_inflight.pop(key, None)
+        if info is not None:
+            _info_cache[key] = info
+            while len(_info_cache) > _INFO_CACHE_MAX:
+                _info_cache.popitem(last=False)
+        return info
+    return await asyncio.shield(task)
+
+
+async def get_media_duration(path: str) -> Optional[int]:
+    info = await probe_media(path)
+    return info.seconds if info else None
+
+
 # -------------------------------------------------
 #   THUMBNAIL
 # -------------------------------------------------
 
-def generate_thumbnail_frame(
+async def generate_thumbnail_frame(
     path: str,
     out_path: str,
     at_second: int = 3
@@ -54,6 +230,11 @@ def generate_thumbnail_frame(
     try:
         os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
 
+        # chhoti clip me end ke baad seek karne se koi frame nahi milta
+        info = await probe_media(path)
+        if info and info.duration and at_second >= info.duration:
+            at_second = int(info.duration / 2)
+
         cmd_fast = [
             "ffmpeg", "-y",
             "-ss", str(at_second),
@@ -63,7 +244,7 @@ def generate_thumbnail_frame(
             out_path,
         ]
 
-        if _run(cmd_fast) and os.path.exists(out_path):
+        if await _run(cmd_fast, FFPROBE_TIMEOUT) and os.path.exists(out_path):
             return out_path
 
         # fallback seek
@@ -76,7 +257,7 @@ def generate_thumbnail_frame(
             out_path,
         ]
 
-        if _run(cmd_safe) and os.path.exists(out_path):
+        if await _run(cmd_safe, FFPROBE_TIMEOUT) and os.path.exists(out_path):
             return out_path
 
     except Exception as e:
@@ -89,7 +270,7 @@ def generate_thumbnail_frame(
 #   SAMPLE CLIP (SMART)
 # -------------------------------------------------
 
-def generate_sample_clip(
+async def generate_sample_clip(
     path: str,
     out_path: str,
     duration: int = 0,
@@ -99,7 +280,7 @@ def generate_sample_clip(
     try:
         os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
 
-        total = get_media_duration(path)
+        total = await get_media_duration(path)
 
         # AUTO SAMPLE LENGTH
         if not duration:
@@ -125,7 +306,7 @@ def generate_sample_clip(
             out_path,
         ]
 
-        if _run(cmd_copy) and os.path.exists(out_path):
+        if await _run(cmd_copy) and os.path.exists(out_path):
             return out_path
 
         # 2️⃣ SAFE RE-ENCODE (Telegram compatible)
@@ -145,7 +326,7 @@ def generate_sample_clip(
             out_path,
         ]
 
-        if _run(cmd_re) and os.path.exists(out_path):
+        if await _run(cmd_re) and os.path.exists(out_path):
             return out_path
 
     except Exception as e:
@@ -158,10 +339,38 @@ def generate_sample_clip(
 #   FASTSTART
 # -------------------------------------------------
 
-def ensure_mp4_faststart(path: str) -> bool:
+async def ensure_mp4_faststart(path: str, in_place: bool = True) -> bool:
+    """
+    True = file ab faststart hai. Pehle atom layout dekha jata hai; moov already
+    mdat se pehle ho (yt-dlp +faststart merge) ya file MP4/MOV hi na ho (mkv,
+    webm) to remux nahi hota.
+    `in_place`: moov file ke andar hi khiskao (bina doosri copy). False tab do
+    jab file ka inode kisi aur ke saath shared ho (download store hardlink) –
+    tab ffmpeg nayi file likhta hai aur sirf ye path badalta hai.
+    """
+    layout = await asyncio.to_thread(moov_before_mdat, path)
+    if layout is None:
+        incr("faststart.not_mp4")
+        return False
+    if layout:
+        incr("faststart.skip")
+        return True
+
+    if in_place:
+        try:
+            if await asyncio.to_thread(relocate_moov, path):
+                incr("faststart.in_place")
+                return True
+        except FaststartUnsupported as e:
+            # file abhi untouched hai -> ffmpeg remux
+            print("[media_tools] in-place faststart skipped:", e)
+        except Exception as e:
+            print("[media_tools] in-place faststart error:", e)
+            return False
+
+    base, _ = os.path.splitext(path)
+    tmp = base + "_faststart.mp4"
     try:
-        base, _ = os.path.splitext(path)
-        tmp = base + "_faststart.mp4"
 
         cmd = [
             "ffmpeg", "-y",
@@ -171,12 +380,20 @@ def ensure_mp4_faststart(path: str) -> bool:
             tmp,
         ]
 
-        if _run(cmd) and os.path.exists(tmp):
+        if await _run(cmd) and os.path.exists(tmp):
             os.replace(tmp, path)
+            incr("faststart.remux")
             return True
 
     except Exception as e:
         print("[media_tools] faststart error:", e)
+    finally:
+        # fail / timeout / cancel -> adhoori copy disk pe na rahe
+        if os.path.exists(tmp):
+            try:
+                os.remove(tmp)
+            except Exception:
+                pass
 
     return False
 
@@ -185,29 +402,155 @@ def ensure_mp4_faststart(path: str) -> bool:
 #   SCREENSHOTS
 # -------------------------------------------------
 
-def generate_screenshots(
+# Saare timestamps ek hi ffmpeg process me: har timestamp ek alag input hai
+# (`-ss T -i file`, keyframe pe fast seek + wahan se exact frame tak decode),
+# har input ka pehla frame apni output jpg me. `tile=True` pe sab frames ek
+# contact sheet (grid) image me – media group ki jagah ek photo.
+
+# contact sheet ke ek cell ki width (height video aspect se)
+_TILE_CELL_WIDTH = 480
+
+
+def _screenshot_times(duration: int, count: int) -> List[int]:
+    step = max(1, duration // (count + 1))
+    return [i * step for i in range(1, count + 1)]
+
+
+def _seek_inputs(path: str, stamps: List[int]) -> list:
+    args: list = []
+    for sec in stamps:
+        args += ["-ss", str(sec), "-i", path]
+    return args
+
+
+def _tile_grid(count: int) -> tuple[int, int]:
+    cols = math.ceil(math.sqrt(count))
+    return cols, math.ceil(count / cols)
+
+
+async def _screenshots_single_pass(path: str, out_dir: str, stamps: List[int]) -> List[str]:
+    outs = [os.path.join(out_dir, f"screenshot_{i}.jpg") for i in range(1, len(stamps) + 1)]
+    cmd = ["ffmpeg", "-y"] + _seek_inputs(path, stamps)
+    for i, outp in enumerate(outs):
+        cmd += ["-map", f"{i}:v:0", "-frames:v", "1", "-q:v", "2", outp]
+
+    if not await _run(cmd):
+        return []
+    return [o for o in outs if os.path.exists(o)]
+
+
+async def _screenshots_per_frame(path: str, out_dir: str, stamps: List[int]) -> List[str]:
+    """
+    Purana tarika: har screenshot ke liye alag ffmpeg (fallback + bench ke liye).
+    """
+    shots: List[str] = []
+    for i, sec in enumerate(stamps, start=1):
+        outp = os.path.join(out_dir, f"screenshot_{i}.jpg")
+        thumb = await generate_thumbnail_frame(path, outp, at_second=sec)
+        if thumb:
+            shots.append(thumb)
+    return shots
+
+
+async def _contact_sheet(path: str, out_dir: str, stamps: List[int], info: MediaInfo) -> Optional[str]:
+    cell_w = _TILE_CELL_WIDTH
+    if info.width and info.height:
+        cell_h = max(2, int(cell_w * info.height / info.width) // 2 * 2)
+    else:
+        cell_h = cell_w * 9 // 16
+    cols, rows = _tile_grid(len(stamps))
+
+    chains = [
+        f"[{i}:v:0]trim=end_frame=1,"
+        f"scale={cell_w}:{cell_h}:force_original_aspect_ratio=decrease,"
+        f"pad={cell_w}:{cell_h}:(ow-iw)/2:(oh-ih)/2,setsar=1[v{i}]"
+        for i in range(len(stamps))
+    ]
+    joined = "".join(f"[v{i}]" for i in range(len(stamps)))
+    graph = ";".join(chains) + (
+        f";{joined}concat=n={len(stamps)}:v=1:a=0,"
+        f"tile={cols}x{rows}:padding=4:margin=4[sheet]"
+    )
+
+    outp = os.path.join(out_dir, "screenshots_tile.jpg")
+    cmd = (
+        ["ffmpeg", "-y"]
+        + _seek_inputs(path, stamps)
+        + ["-filter_complex", graph, "-map", "[sheet]", "-frames:v", "1", "-q:v", "3", outp]
+    )
+    if await _run(cmd) and os.path.exists(outp):
+        return outp
+    return None
+
+
+async def generate_screenshots(
     path: str,
     out_dir: str,
-    count: int = 3
+    count: int = 3,
+    tile: bool = False,
 ) -> List[str]:
-
-    screenshots: List[str] = []
-    dur = get_media_duration(path)
+    """
+    `count` screenshots ke paths (tile=True pe sirf ek contact sheet image).
+    """
+    info = await probe_media(path)
+    dur = info.seconds if info else None
 
     if not dur:
         print("[media_tools] screenshots skipped (no duration)")
-        return screenshots
+        return []
 
     os.makedirs(out_dir, exist_ok=True)
+    stamps = _screenshot_times(dur, count)
 
-    step = max(1, dur // (count + 1))
+    if tile:
+        sheet = await _contact_sheet(path, out_dir, stamps, info)
+        if sheet:
+            return [sheet]
+        # sheet nahi bani -> normal screenshots hi sahi
 
-    for i in range(1, count + 1):
-        sec = i * step
-        outp = os.path.join(out_dir, f"screenshot_{i}.jpg")
+    shots = await _screenshots_single_pass(path, out_dir, stamps)
+    if shots:
+        return shots
 
-        thumb = generate_thumbnail_frame(path, outp, at_second=sec)
-        if thumb:
-            screenshots.append(thumb)
+    # kisi ek seek pe poora process fail ho sakta hai -> ek-ek karke
+    return await _screenshots_per_frame(path, out_dir, stamps)
+
+
+# -------------------------------------------------
+#   BENCH: python -m utils.media_tools bench <video> [count]
+# -------------------------------------------------
 
-    return screenshots
+async def _bench(path: str, count: int):
+    import shutil
+    import tempfile
+    import time
+
+    stamps = _screenshot_times(await get_media_duration(path) or 0, count)
+    if not stamps or not stamps[0]:
+        print("duration nahi mila")
+        return
+    info = await probe_media(path)
+    print(info)
+    for label, fn in (
+        ("per-frame loop", lambda d: _screenshots_per_frame(path, d, stamps)),
+        ("single pass", lambda d: _screenshots_single_pass(path, d, stamps)),
+        ("contact sheet", lambda d: _contact_sheet(path, d, stamps, info)),
+    ):
+        out_dir = tempfile.mkdtemp(prefix="shots_")
+        try:
+            t0 = time.perf_counter()
+            result = await fn(out_dir)
+            took = time.perf_counter() - t0
+            n = len(result) if isinstance(result, list) else int(bool(result))
+            print(f"{label:>15}: {took:6.2f}s  ({n} image(s))")
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3 or sys.argv[1] != "bench":
+        print("usage: python -m utils.media_tools bench <video> [count]")
+        sys.exit(2)
+    asyncio.run(_bench(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 6))
@@ -0,0 +1,93 @@
+# utils/metrics.py
+import itertools
+import time
+from collections import OrderedDict, deque
+
+# ==========================================
+#   IN-PROCESS RUNTIME METRICS
+# ==========================================
+#
+# - simple named counters (cache hit/miss etc.)
+# - per-job download throughput samples – admin /jobstats se dekh sakte hain.
+
+MAX_JOBS = 50        # itne recent jobs ke samples yaad rahenge
+MAX_SAMPLES = 300    # per job
+
+_COUNTERS: dict[str, int] = {}
+_THROUGHPUT: "OrderedDict[str, dict]" = OrderedDict()
+_SEQ = itertools.count(1)
+
+
+def incr(name: str, n: int = 1):
+    _COUNTERS[name] = _COUNTERS.get(name, 0) + n
+
+
+def get_counter(name: str) -> int:
+    return _COUNTERS.get(name, 0)
+
+
+def counters(prefix: str = "") -> dict[str, int]:
+    return {k: v for k, v in sorted(_COUNTERS.items()) if k.startswith(prefix)}
+
+
+def hit_rate(prefix: str) -> float:
+    """
+    `<prefix>.hit` / (`hit` + `miss`) – 0.0 agar abhi koi lookup nahi hua.
+    """
+    hits = get_counter(f"{prefix}.hit")
+    misses = get_counter(f"{prefix}.miss")
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+def throughput_key(label: str) -> str:
+    """
+    Har download / upload call ki alag sample key (label + counter) – same
+    file naam ke do jobs ke samples ek series me mix na hon.
+    """
+    return f"{label} #{next(_SEQ)}"
+
+
+def record_throughput(job: str, done: int, total: int, speed: float | None = None):
+    """
+    Ek sample: (timestamp, bytes done, total, speed bytes/s).
+    """
+    now = time.time()
+    entry = _THROUGHPUT.get(job)
+    if entry is None:
+        entry = {"started": now, "samples": deque(maxlen=MAX_SAMPLES)}
+        _THROUGHPUT[job] = entry
+        while len(_THROUGHPUT) > MAX_JOBS:
+            _THROUGHPUT.popitem(last=False)
+    else:
+        _THROUGHPUT.move_to_end(job)
+    entry["samples"].append((now, int(done or 0), int(total or 0), float(speed or 0)))
+
+
+def throughput_summary(job: str) -> dict | None:
+    entry = _THROUGHPUT.get(job)
+    if not entry or not entry["samples"]:
+        return None
+    samples = entry["samples"]
+    last_ts, done, total, _ = samples[-1]
+    elapsed = max(last_ts - entry["started"], 1e-3)
+    speeds = [s[3] for s in samples if s[3] > 0]
+    return {
+        "job": job,
+        "samples": len(samples),
+        "done": done,
+        "total": total,
+        "elapsed": elapsed,
+        "avg_speed": done / elapsed,
+        "peak_speed": max(speeds) if speeds else 0.0,
+        "last_ts": last_ts,
+    }
+
+
+def recent_throughput(limit: int = 10) -> list[dict]:
+    jobs = list(_THROUGHPUT.keys())[-limit:]
+    out = []
+    for job in reversed(jobs):
+        s = throughput_summary(job)
+        if s:
+            out.append(s)
+    return out
@@ -0,0 +1,252 @@
+# utils/mp4.py
+import os
+import struct
+from typing import Optional, List, Tuple
+
+# ==========================================
+#   MP4 / MOV TOP-LEVEL ATOM SCANNER
+# ==========================================
+#
+# Sirf top-level box headers padhta hai (8 / 16 bytes har box, seek karke
+# aage) – multi-GB file pe bhi kuch hi reads. Faststart check ke liye:
+# `moov` agar `mdat` se pehle hai to file already streamable hai, remux ki
+# zaroorat nahi.
+
+# valid top-level box types (pehla box inme se na ho to file MP4 nahi maante)
+_TOP_LEVEL = {
+    b"ftyp", b"styp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pdin",
+    b"uuid", b"moof", b"mfra", b"sidx", b"meta", b"prft", b"emsg", b"pnot",
+}
+
+
+def scan_atoms(path: str) -> Optional[List[Tuple[str, int, int]]]:
+    """
+    Returns [(type, offset, size), ...] top-level boxes ki list,
+    ya None agar file MP4/MOV jaisi parse nahi hui.
+    """
+    try:
+        file_size = os.path.getsize(path)
+        atoms: List[Tuple[str, int, int]] = []
+        with open(path, "rb") as f:
+            offset = 0
+            while offset + 8 <= file_size:
+                f.seek(offset)
+                header = f.read(16)
+                if len(header) < 8:
+                    break
+                size, kind = struct.unpack(">I4s", header[:8])
+                if size == 1:
+                    if len(header) < 16:
+                        return None
+                    size = struct.unpack(">Q", header[8:16])[0]
+                elif size == 0:
+                    # box file ke end tak
+                    size = file_size - offset
+                if size < 8 or (not atoms and kind not in _TOP_LEVEL):
+                    return None
+                atoms.append((kind.decode("latin-1"), offset, size))
+                offset += size
+        return atoms or None
+    except Exception as e:
+        print("[mp4] atom scan error:", e)
+        return None
+
+
+def moov_before_mdat(path: str) -> Optional[bool]:
+    """
+    True  -> moov pehle (faststart already), False -> mdat pehle (remux chahiye),
+    None  -> MP4 nahi / moov ya mdat nahi mila (remux se kuch nahi milega).
+    """
+    atoms = scan_atoms(path)
+    if not atoms:
+        return None
+    kinds = [a[0] for a in atoms]
+    if "moov" not in kinds or "mdat" not in kinds:
+        return None
+    return kinds.index("moov") < kinds.index("mdat")
+
+
+# ==========================================
+#   IN-PLACE FASTSTART (moov ko mdat se pehle)
+# ==========================================
+#
+# ffmpeg -movflags +faststart poori file ki doosri copy likhta hai (2x disk,
+# 2x I/O). Yahan:
+#   1. moov memory me padho (aam taur pe kuch MB), uske stco / co64 chunk
+#      offsets shift ke hisaab se patch karo
+#   2. [pehla mdat ... moov se pehle] wala region peeche se aage ki taraf
+#      bade blocks me moov-size aage khiskao (pread / pwrite, overlap safe)
+#   3. patched moov khaali hui jagah pe likh do
+# File size same rehta hai, extra disk = 0, extra memory ~ moov + ek block.
+# Jo layout yahan handle nahi hota (cmov, 32-bit stco overflow, ajeeb boxes)
+# uspe FaststartUnsupported – caller ffmpeg remux pe chala jaye. Ye error
+# hamesha file chhune se PEHLE aata hai.
+# Shift ke dauran crash / kill = file ki akeli copy kharab, size wahi. Isliye
+# file badalne se pehle "<file>.moovshift" marker likha jata hai aur kaam
+# poora (fsync) hone ke baad hi hatta hai – marker bacha ho to file pe bharosa
+# mat karo (relocation_pending).
+
+_SHIFT_BLOCK = 8 * 1024 * 1024
+RELOCATE_MARKER = ".moovshift"
+
+# moov ke andar in containers me hi stco / co64 milte hain
+_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+
+class FaststartUnsupported(Exception):
+    """
+    Is file ka moov native relocation se nahi badla ja sakta.
+    """
+
+
+def _child_boxes(buf: bytearray, start: int, end: int):
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", buf, pos)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", buf, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise FaststartUnsupported(f"bad box {kind!r} inside moov")
+        yield kind, pos, header, size
+        pos += size
+
+
+def _patch_chunk_offsets(buf: bytearray, start: int, end: int, lo: int, hi: int, shift: int) -> int:
+    """
+    [lo, hi) me padne wale saare chunk offsets += shift. Returns patched tables.
+    """
+    tables = 0
+    for kind, pos, header, size in _child_boxes(buf, start, end):
+        body = pos + header
+        if kind in _CONTAINERS:
+            tables += _patch_chunk_offsets(buf, body, pos + size, lo, hi, shift)
+        elif kind == b"cmov":
+            raise FaststartUnsupported("compressed moov")
+        elif kind in (b"stco", b"co64"):
+            code = "Q" if kind == b"co64" else "I"
+            width = struct.calcsize(">" + code)
+            count = struct.unpack_from(">I", buf, body + 4)[0]
+            first = body + 8
+            if first + count * width > pos + size:
+                raise FaststartUnsupported(f"truncated {kind!r}")
+            fmt = f">{count}{code}"
+            offsets = [
+                off + shift if lo <= off < hi else off
+                for off in struct.unpack_from(fmt, buf, first)
+            ]
+            if code == "I" and offsets and max(offsets) > 0xFFFFFFFF:
+                raise FaststartUnsupported("stco offset overflow (co64 chahiye)")
+            struct.pack_into(fmt, buf, first, *offsets)
+            tables += 1
+    return tables
+
+
+def _pwrite_all(fd: int, data, offset: int):
+    view = memoryview(data)
+    while view:
+        n = os.pwrite(fd, view, offset)
+        view = view[n:]
+        offset += n
+
+
+def relocation_pending(path: str) -> bool:
+    """
+    True = is file pe relocate_moov beech me ruka tha (file kharab ho sakti hai).
+    """
+    return os.path.exists(path + RELOCATE_MARKER)
+
+
+def relocate_moov(path: str) -> bool:
+    """
+    Blocking (thread me chalao). True = moov ab mdat se pehle hai
+    (pehle se tha ya ab move hua), False = MP4 nahi / moov-mdat nahi mila.
+    """
+    atoms = scan_atoms(path)
+    if not atoms:
+        return False
+    kinds = [a[0] for a in atoms]
+    if "moov" not in kinds or "mdat" not in kinds:
+        return False
+    moov_i = kinds.index("moov")
+    mdat_i = kinds.index("mdat")
+    if moov_i < mdat_i:
+        return True
+
+    _, moov_off, moov_size = atoms[moov_i]
+    lo = atoms[mdat_i][1]      # moov yahan aayega
+    hi = moov_off              # [lo, hi) aage khiskega
+
+    with open(path, "r+b") as f:
+        fd = f.fileno()
+        moov = bytearray(os.pread(fd, moov_size, moov_off))
+        if len(moov) != moov_size:
+            raise FaststartUnsupported("short moov read")
+        if _patch_chunk_offsets(moov, 0, moov_size, lo, hi, moov_size) == 0:
+            raise FaststartUnsupported("no chunk offset tables")
+
+        # ---- yahan se file badalti hai ----
+        marker = path + RELOCATE_MARKER
+        with open(marker, "w") as m:
+            m.write(f"{lo} {hi} {moov_size}\n")
+            m.flush()
+            os.fsync(m.fileno())
+        end = hi
+        while end > lo:
+            start = max(lo, end - _SHIFT_BLOCK)
+            _pwrite_all(fd, os.pread(fd, end - start, start), start + moov_size)
+            end = start
+        _pwrite_all(fd, moov, lo)
+        os.fsync(fd)
+    os.remove(marker)
+    return True
+
+
+# -------------------------------------------------
+#   CHECK: python -m utils.mp4 <file.mp4>
+# -------------------------------------------------
+#
+# File ki copy pe relocate_moov chala ke ffprobe ke packet list (pts / dts /
+# size / flags + packet data MD5) original se compare karta hai.
+
+def _ffprobe_packets(path: str) -> list:
+    import subprocess
+
+    out = subprocess.check_output(
+        [
+            "ffprobe", "-v", "error",
+            "-show_packets", "-show_data_hash", "MD5",
+            "-show_entries", "packet=stream_index,pts,dts,duration,size,flags,data_hash",
+            "-of", "csv=p=0",
+            path,
+        ]
+    )
+    return out.decode().splitlines()
+
+
+def _check(path: str) -> int:
+    import shutil
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, "relocated" + os.path.splitext(path)[1])
+        shutil.copyfile(path, copy)
+        before = moov_before_mdat(copy)
+        relocate_moov(copy)
+        after = moov_before_mdat(copy)
+        same = _ffprobe_packets(path) == _ffprobe_packets(copy)
+        print(f"moov_before_mdat: {before} -> {after}")
+        print("ffprobe packets:", "identical" if same else "MISMATCH")
+        return 0 if same and after else 1
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 2:
+        print("usage: python -m utils.mp4 <file.mp4>")
+        sys.exit(2)
+    sys.exit(_check(sys.argv[1]))
@@ -0,0 +1,392 @@
+# utils/pipeline.py
+import asyncio
+import os
+import time
+
+from utils.downloader import (
+    download_direct_with_progress,
+    download_with_ytdlp,
+    ytdlp_tmp_name,
+    ytdlp_progress_renderer,
+    download_thumbnail,
+    is_video_ext,
+)
+from utils.media_tools import ensure_mp4_faststart
+from utils.mp4 import relocation_pending, RELOCATE_MARKER
+from utils.uploader import upload_with_thumb_and_progress, send_cached_media
+from utils.file_store import download_store
+from utils.workspace import TMP_SUBDIR
+from utils.single_flight import download_flights, flight_key, FanoutMessage
+from utils.executor import ytdlp_executor, TaskError, TaskCancelled
+from utils.metrics import incr
+from utils.progress import human_readable, edit_progress_message
+from utils.tg_upload import GrowingFile, upload_big_file
+from config import (
+    MAX_FILE_SIZE,
+    YTDLP_DOWNLOAD_TIMEOUT,
+    STREAM_UPLOAD,
+    STREAM_UPLOAD_MIN_MB,
+    PROGRESS_UPDATE_INTERVAL,
+)
+from database import update_stats
+
+# ==========================================
+#   DOWNLOAD -> UPLOAD PIPELINE (ek job)
+# ==========================================
+#
+# job dict:
+#   {
+#     "url": ...,
+#     "fmt_id": yt-dlp format id | None (direct file),
+#     "filename": final file name,
+#     "thumb_url": site thumbnail | None,
+#     "info": get_formats info | None, "info_expires": unix ts,
+#     "checkpoint": pichhle run ka last checkpoint | None (recovery),
+#     "workspace": job ki directory (utils/workspace.py) | None (cwd),
+#   }
+#
+# Order: file_id cache -> single-flight (same link + format chal raha ho to
+# attach) -> local store / origin download -> size checks -> upload.
+#
+# `on_state(state)` (optional async callback) job queue ko stage batata hai:
+# "downloading" -> "postprocessing" -> "uploading".
+#
+# `on_checkpoint(dict)` (optional async) har stage poora hone pe:
+#   probed         -> cache miss, format / naam final
+#   downloaded     -> {"path", "size", "downloaded_bytes"}
+#   postprocessed  -> + {"thumb"} (size checks + stats ho chuke)
+#   upload_started -> upload shuru (crash ke baad file_id cache pehle dekha
+#                     jata hai, warna local file se dobara upload)
+# Restart ke baad job["checkpoint"] ki file disk pe same size ki mile to
+# download skip; adhoora direct download .part manifest se waise bhi resume
+# hota hai.
+
+CP_PROBED = "probed"
+CP_DOWNLOADED = "downloaded"
+CP_POSTPROCESSED = "postprocessed"
+CP_UPLOAD_STARTED = "upload_started"
+
+_CP_ORDER = [CP_PROBED, CP_DOWNLOADED, CP_POSTPROCESSED, CP_UPLOAD_STARTED]
+
+
+async def run_download_job(
+    client,
+    chat_msg,
+    progress_msg,
+    user_id: int,
+    job: dict,
+    remaining_size: int | None = None,
+    on_state=None,
+    on_checkpoint=None,
+) -> bool:
+    """
+    Returns True agar user tak file pahunch gayi. User ne /cancel kiya ho to
+    TaskCancelled raise hota hai.
+    """
+    url = job["url"]
+    fmt_id = job.get("fmt_id")
+    filename = job["filename"]
+
+    # 1) pehle upload ho chuka hai -> file_id se turant
+    if await send_cached_media(
+        client, chat_msg, url, fmt_id, user_id, progress_msg,
+        file_name=filename, remaining_size=remaining_size,
+    ):
+        return True
+
+    # 2) same link + format abhi kisi aur ke liye chal raha hai -> attach
+    key = flight_key(url, fmt_id)
+    flight = download_flights.get(key)
+    if flight is not None:
+        incr("singleflight.join")
+        await _set_state(on_state, "downloading")
+        try:
+            await progress_msg.edit_text(
+                "👥 Ye link abhi kisi aur user ke liye download ho raha hai, "
+                "wahi file tumhe bhi mil jayegi..."
+            )
+        except Exception:
+            pass
+        if await flight.wait(progress_msg) and await send_cached_media(
+            client, chat_msg, url, fmt_id, user_id, progress_msg,
+            file_name=filename, remaining_size=remaining_size,
+        ):
+            incr("singleflight.fanout")
+            return True
+        # leader fail / alag upload settings -> apna job (file local store se milegi)
+        return await _execute(
+            client, chat_msg, progress_msg, user_id, job, remaining_size, on_state, on_checkpoint
+        )
+
+    flight = download_flights.lead(key)
+    ok = False
+    try:
+        ok = await _execute(
+            client, chat_msg, FanoutMessage(progress_msg, flight), user_id, job, remaining_size,
+            on_state, on_checkpoint,
+        )
+        return ok
+    finally:
+        download_flights.finish(flight, ok)
+
+
+async def _set_state(on_state, state: str):
+    if on_state is None:
+        return
+    try:
+        await on_state(state)
+    except Exception as e:
+        print("Job state update error:", e)
+
+
+async def _checkpoint(on_checkpoint, stage: str, **data):
+    if on_checkpoint is None:
+        return
+    try:
+        await on_checkpoint({"stage": stage, **data})
+    except Exception as e:
+        print("Job checkpoint error:", e)
+
+
+def resume_point(job: dict) -> dict | None:
+    """
+    Pichhle run ka checkpoint jiski downloaded file abhi bhi disk pe (same
+    size, adhoora in-place faststart nahi) hai, warna None (shuru se).
+    """
+    cp = job.get("checkpoint") or {}
+    if cp.get("stage") not in _CP_ORDER[1:]:
+        return None
+    path = cp.get("path")
+    try:
+        if not path or os.path.getsize(path) != cp.get("size"):
+            return None
+    except OSError:
+        return None
+    if relocation_pending(path):
+        # in-place faststart beech me ruka – size same, bytes kharab
+        for p in (path, path + RELOCATE_MARKER):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+        return None
+    return cp
+
+
+async def _download(progress_msg, user_id: int, job: dict, tracker=None) -> tuple[str, int]:
+    """
+    Returns (path, origin se aaye bytes).
+    """
+    url = job["url"]
+    fmt_id = job.get("fmt_id")
+    workdir = job.get("workspace") or "."
+    filename = job["filename"]
+    job_path = os.path.join(workdir, filename)
+
+    if fmt_id is None:
+        return await download_direct_with_progress(url, filename, progress_msg, tracker, workdir)
+
+    # same URL + quality local store me ho to yt-dlp chalane ki zaroorat nahi
+    path = await download_store.checkout(url, fmt_id, job_path)
+    if path is not None:
+        return path, 0
+
+    try:
+        await progress_msg.edit_text(
+            f"⬇️ `{fmt_id}` quality me download ho raha hai... (yt-dlp)\n"
+            f"📄 File: `{filename}`"
+        )
+    except Exception:
+        pass
+
+    tmp_name = os.path.join(workdir, ytdlp_tmp_name(url, fmt_id))
+
+    # signed format URLs abhi valid hain to stored info se hi download
+    cached_info = job.get("info")
+    if cached_info is not None and time.time() >= job.get("info_expires", 0):
+        cached_info = None
+
+    try:
+        path = await ytdlp_executor.run(
+            download_with_ytdlp,
+            url,
+            fmt_id,
+            tmp_name,
+            cached_info,
+            timeout=YTDLP_DOWNLOAD_TIMEOUT,
+            key=user_id,
+            on_progress=ytdlp_progress_renderer(progress_msg, filename),
+        )
+        if not path:
+            raise TaskError("yt-dlp ne koi file nahi di")
+    except Exception:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+    os.replace(path, job_path)
+    if is_video_ext(job_path):
+        # store me faststart wali copy jaye: agli checkouts pe kuch nahi karna
+        await ensure_mp4_faststart(job_path)
+    path = await download_store.checkin(url, fmt_id, job_path)
+    # yt-dlp bytes ka hisaab pehle bhi stats me nahi jata tha
+    return path, 0
+
+
+def _stream_progress(progress_msg, tracker: GrowingFile):
+    """
+    Download chal raha ho tab tak progress downloader dikhata hai (upload line
+    ke saath); download khatam hone ke baad normal upload progress.
+    """
+    start_time = time.time()
+    last_edit = 0.0
+
+    async def on_progress(current, total):
+        nonlocal last_edit
+        now = time.time()
+        if not tracker.complete or now - last_edit < PROGRESS_UPDATE_INTERVAL:
+            return
+        last_edit = now
+        speed = current / max(now - start_time, 1e-3)
+        eta = (total - current) / speed if speed > 0 else None
+        await edit_progress_message(progress_msg, "📤 Uploading...", current, total, speed, eta)
+
+    return on_progress
+
+
+async def _drop_stream(task):
+    if task is None:
+        return
+    if not task.done():
+        task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+async def _execute(
+    client, chat_msg, progress_msg, user_id: int, job: dict, remaining_size,
+    on_state=None, on_checkpoint=None,
+) -> bool:
+    resume = resume_point(job)
+    if resume is None:
+        await _checkpoint(on_checkpoint, CP_PROBED, fmt_id=job.get("fmt_id"), filename=job["filename"])
+
+    # direct file: size pata chalte hi parts download ke saath upload hone lagte hain
+    tracker = None
+    stream_task = None
+    if STREAM_UPLOAD and job.get("fmt_id") is None and resume is None:
+        tracker = GrowingFile()
+        stream_task = asyncio.create_task(
+            upload_big_file(
+                client,
+                tracker,
+                job["filename"],
+                progress=_stream_progress(progress_msg, tracker),
+                min_size=STREAM_UPLOAD_MIN_MB * 1024 * 1024,
+            )
+        )
+
+    try:
+        return await _download_and_upload(
+            client, chat_msg, progress_msg, user_id, job, remaining_size, tracker, stream_task,
+            on_state, on_checkpoint, resume,
+        )
+    finally:
+        if tracker is not None:
+            tracker.abort("job finished")
+        await _drop_stream(stream_task)
+
+
+async def _download_and_upload(
+    client, chat_msg, progress_msg, user_id: int, job: dict, remaining_size, tracker, stream_task,
+    on_state=None, on_checkpoint=None, resume: dict | None = None,
+) -> bool:
+    if resume is not None:
+        # restart se pehle file aa chuki thi
+        incr("jobs.resumed_after_download")
+        path, downloaded_bytes = resume["path"], resume.get("downloaded_bytes", 0)
+    else:
+        await _set_state(on_state, "downloading")
+        try:
+            path, downloaded_bytes = await _download(progress_msg, user_id, job, tracker)
+        except TaskCancelled:
+            try:
+                await progress_msg.edit_text("🛑 Download cancel kar diya gaya.")
+            except Exception:
+                pass
+            # job queue ise failed nahi, cancelled record kare
+            raise
+        except Exception as e:
+            label = "yt-dlp download" if job.get("fmt_id") else "Download"
+            try:
+                await progress_msg.edit_text(f"❌ {label} fail: `{e}`")
+            except Exception:
+                pass
+            return False
+        await _checkpoint(
+            on_checkpoint, CP_DOWNLOADED,
+            path=path, size=os.path.getsize(path), downloaded_bytes=downloaded_bytes,
+        )
+
+    await _set_state(on_state, "postprocessing")
+    file_size = os.path.getsize(path)
+    if file_size > MAX_FILE_SIZE:
+        try:
+            await progress_msg.edit_text("❌ File Telegram limit se badi hai, upload nahi ho sakti.")
+        except Exception:
+            pass
+        download_store.discard(path)
+        return False
+
+    if remaining_size is not None and file_size > remaining_size:
+        try:
+            await progress_msg.edit_text(
+                "⛔ Daily size limit exceed ho jayega is file se.\n"
+                f"Remain: {human_readable(remaining_size)}, File: {human_readable(file_size)}"
+            )
+        except Exception:
+            pass
+        download_store.discard(path)
+        return False
+
+    postprocessed = resume is not None and resume["stage"] != CP_DOWNLOADED
+    # thumbnail / sample / screenshots ke liye job ki apni temp directory
+    work_tmp = os.path.join(job.get("workspace") or ".", TMP_SUBDIR)
+    os.makedirs(work_tmp, exist_ok=True)
+
+    # YouTube / site original thumbnail – final upload ke liye
+    job_thumb_path = None
+    if postprocessed and resume.get("thumb") and os.path.exists(resume["thumb"]):
+        job_thumb_path = resume["thumb"]
+    elif job.get("thumb_url"):
+        job_thumb_path = await download_thumbnail(
+            job["thumb_url"], os.path.join(work_tmp, "site_thumb.jpg")
+        )
+
+    if not postprocessed:
+        # stats ek hi baar (resume pe dobara nahi)
+        update_stats(downloaded=downloaded_bytes, uploaded=0)
+    cp = {"path": path, "size": file_size, "downloaded_bytes": downloaded_bytes, "thumb": job_thumb_path}
+    await _checkpoint(on_checkpoint, CP_POSTPROCESSED, **cp)
+    try:
+        await progress_msg.edit_text("📤 Upload start ho raha hai...")
+    except Exception:
+        pass
+
+    async def on_upload():
+        await _checkpoint(on_checkpoint, CP_UPLOAD_STARTED, **cp)
+        await _set_state(on_state, "uploading")
+
+    sent = await upload_with_thumb_and_progress(
+        client,
+        chat_msg,
+        path,
+        user_id,
+        progress_msg,
+        job_thumb_path=job_thumb_path,
+        source_url=job["url"],
+        fmt_id=job.get("fmt_id"),
+        streamed_upload=stream_task,
+        on_upload=on_upload,
+        work_dir=work_tmp,
+    )
+    return sent is not None
@@ -0,0 +1,378 @@
+# utils/probe.py
+import asyncio
+import mimetypes
+import os
+from urllib.parse import urlparse, unquote
+
+import aiohttp
+
+from utils.http_client import get_http_session, request_kwargs
+from utils.cache import probe_cache, cache_key, host_ttl, HIT, NEGATIVE
+from config import PROBE_TIMEOUT
+
+# ==========================================
+#   ASYNC URL PROBE ENGINE
+# ==========================================
+#
+# head_info ki jagah: HEAD -> (zaroorat ho to) chhota ranged GET, sab kuch
+# shared HTTP pool pe aur ek strict deadline ke andar. Event loop kabhi block
+# nahi hota, slow origin sirf apne user ko wait karata hai.
+
+# sniff ke liye kitne shuru ke bytes mangwaye
+SNIFF_BYTES = 4096
+
+# ye content types "pata nahi" ke barabar hain -> bytes sniff karo
+_GENERIC_TYPES = {
+    "",
+    "application/octet-stream",
+    "binary/octet-stream",
+    "application/binary",
+    "application/x-download",
+    "application/force-download",
+    "application/unknown",
+}
+
+
+# ----------------------- HEADER PARSING ----------------------- #
+
+def parse_content_range_total(value: str | None) -> int:
+    """
+    "bytes 0-0/12345" -> 12345 (unknown "*" -> 0)
+    """
+    if not value or "/" not in value:
+        return 0
+    total = value.rsplit("/", 1)[-1].strip()
+    return int(total) if total.isdigit() else 0
+
+
+def parse_content_disposition(value: str | None) -> str | None:
+    """
+    RFC 6266 filename nikalta hai. `filename*=UTF-8''...` ko priority,
+    phir quoted / unquoted `filename=`.
+    """
+    if not value:
+        return None
+
+    params: dict[str, str] = {}
+    for part in _split_params(value)[1:]:
+        if "=" not in part:
+            continue
+        key, val = part.split("=", 1)
+        key = key.strip().lower()
+        val = val.strip()
+        if len(val) >= 2 and val[0] == val[-1] == '"':
+            val = val[1:-1].replace('\\"', '"')
+        params[key] = val
+
+    name = None
+    ext_value = params.get("filename*")
+    if ext_value:
+        # charset'lang'percent-encoded
+        pieces = ext_value.split("'", 2)
+        if len(pieces) == 3:
+            charset = pieces[0] or "utf-8"
+            try:
+                name = unquote(pieces[2], encoding=charset, errors="replace")
+            except LookupError:
+                name = unquote(pieces[2])
+        else:
+            name = unquote(ext_value)
+    if not name:
+        name = params.get("filename")
+
+    if not name:
+        return None
+    # path traversal / folder part hatao
+    name = os.path.basename(name.replace("\\", "/")).strip()
+    return name or None
+
+
+def _split_params(value: str) -> list[str]:
+    """
+    `;` pe split, quoted strings ke andar wale `;` ko chhod ke.
+    """
+    parts = []
+    buf = []
+    in_quotes = False
+    prev = ""
+    for ch in value:
+        if ch == '"' and prev != "\\":
+            in_quotes = not in_quotes
+        if ch == ";" and not in_quotes:
+            parts.append("".join(buf).strip())
+            buf = []
+        else:
+            buf.append(ch)
+        prev = ch
+    parts.append("".join(buf).strip())
+    return parts
+
+
+# ----------------------- MIME SNIFF ----------------------- #
+
+def sniff_mime(head: bytes) -> str | None:
+    """
+    File ke shuru ke bytes (magic numbers) se asli MIME type.
+    """
+    if not head:
+        return None
+
+    if len(head) >= 12 and head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand == b"qt  ":
+            return "video/quicktime"
+        if brand in (b"M4A ", b"M4B "):
+            return "audio/mp4"
+        return "video/mp4"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video/webm" if b"webm" in head[:64] else "video/x-matroska"
+    if head.startswith(b"FLV"):
+        return "video/x-flv"
+    if head.startswith(b"RIFF") and head[8:12] == b"AVI ":
+        return "video/x-msvideo"
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return "audio/wav"
+    if head[:1] == b"\x47" and len(head) > 188 and head[188:189] == b"\x47":
+        return "video/mp2t"
+    if head.startswith(b"\x00\x00\x01\xba"):
+        return "video/mpeg"
+    if head.startswith(b"#EXTM3U"):
+        return "application/vnd.apple.mpegurl"
+    if head.startswith(b"ID3") or head[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "audio/mpeg"
+    if head.startswith(b"OggS"):
+        return "audio/ogg"
+    if head.startswith(b"fLaC"):
+        return "audio/flac"
+    if head.startswith(b"%PDF"):
+        return "application/pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return "application/zip"
+    if head.startswith(b"Rar!\x1a\x07"):
+        return "application/vnd.rar"
+    if head.startswith(b"7z\xbc\xaf\x27\x1c"):
+        return "application/x-7z-compressed"
+    if head.startswith(b"\x1f\x8b"):
+        return "application/gzip"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"GIF8"):
+        return "image/gif"
+
+    text = head[:512].lstrip().lower()
+    if text.startswith(b"<!doctype html") or text.startswith(b"<html") or b"<head" in text:
+        return "text/html"
+    return None
+
+
+def _guess_extension_from_type(content_type: str | None) -> str | None:
+    if not content_type:
+        return None
+    return mimetypes.guess_extension(content_type.split(";")[0].strip()) or None
+
+
+# ----------------------- PROBE ----------------------- #
+
+def _empty_result(url: str) -> dict:
+    return {
+        "url": url,
+        "final_url": url,
+        "status": 0,
+        "size": 0,
+        "content_type": None,   # server ka header
+        "sniffed_type": None,   # bytes se pata chala
+        "filename": None,
+        "accept_ranges": False,
+        "etag": None,
+        "last_modified": None,
+        "error": None,
+    }
+
+
+def effective_type(result: dict) -> str:
+    """
+    Header generic / missing ho to sniffed type, warna header type (lowercase, bina params).
+    """
+    header = (result.get("content_type") or "").split(";")[0].strip().lower()
+    if header in _GENERIC_TYPES and result.get("sniffed_type"):
+        return result["sniffed_type"]
+    return header or (result.get("sniffed_type") or "")
+
+
+def _apply_headers(result: dict, resp) -> None:
+    h = resp.headers
+    result["status"] = resp.status
+    result["final_url"] = str(resp.url)
+    result["content_type"] = h.get("Content-Type") or result["content_type"]
+    result["etag"] = h.get("ETag") or result["etag"]
+    result["last_modified"] = h.get("Last-Modified") or result["last_modified"]
+
+    if resp.status == 206:
+        total = parse_content_range_total(h.get("Content-Range"))
+        if total:
+            result["size"] = total
+        result["accept_ranges"] = (h.get("Accept-Ranges") or "").lower() != "none"
+    else:
+        cl = h.get("Content-Length")
+        if cl and cl.isdigit():
+            result["size"] = int(cl)
+        if (h.get("Accept-Ranges") or "").lower() == "bytes":
+            result["accept_ranges"] = True
+
+    name = parse_content_disposition(h.get("Content-Disposition"))
+    if name:
+        result["filename"] = name
+
+
+async def _probe(url: str, result: dict) -> dict:
+    session = get_http_session()
+    kwargs = request_kwargs()
+
+    head_ok = False
+    try:
+        async with session.head(url, allow_redirects=True, **kwargs) as resp:
+            if resp.status < 400:
+                _apply_headers(result, resp)
+                head_ok = True
+    except aiohttp.ClientError:
+        head_ok = False
+
+    ctype = (result["content_type"] or "").split(";")[0].strip().lower()
+    need_get = (
+        not head_ok
+        or not result["size"]
+        or ctype in _GENERIC_TYPES
+    )
+
+    if need_get:
+        # HEAD fail / adhoori info -> chhota ranged GET; isi se sniff bhi ho jayega
+        headers = {"Range": f"bytes=0-{SNIFF_BYTES - 1}"}
+        async with session.get(url, headers=headers, allow_redirects=True, **kwargs) as resp:
+            if resp.status >= 400:
+                result["status"] = resp.status
+                result["error"] = f"HTTP {resp.status}"
+                return result
+            _apply_headers(result, resp)
+            # 200 aaya to poori body aa rahi hai -> sirf shuru ke bytes padho
+            head = await resp.content.read(SNIFF_BYTES)
+            result["sniffed_type"] = sniff_mime(head)
+
+    if not result["filename"]:
+        base = os.path.basename(unquote(urlparse(result["final_url"]).path))
+        if base:
+            result["filename"] = base
+
+    if not result["filename"] or "." not in result["filename"]:
+        ext = _guess_extension_from_type(effective_type(result))
+        if ext:
+            result["filename"] = (result["filename"] or "file") + ext
+
+    return result
+
+
+async def probe_url(url: str, deadline: float | None = None, use_cache: bool = True) -> dict:
+    """
+    URL ke bare me size / type / filename / range support etc. nikalta hai.
+    Kabhi raise nahi karta; problem ho to result["error"] set hota hai.
+    Poora probe `deadline` (default PROBE_TIMEOUT) seconds ke andar khatam.
+    Result probe_cache me jata hai (error wale chhote negative TTL ke saath).
+    """
+    key = cache_key(url)
+    if use_cache:
+        status, cached = probe_cache.get(key)
+        if status == HIT:
+            return dict(cached)
+        if status == NEGATIVE:
+            result = _empty_result(url)
+            result["error"] = cached
+            return result
+
+    result = _empty_result(url)
+    try:
+        result = await asyncio.wait_for(_probe(url, result), deadline or PROBE_TIMEOUT)
+    except asyncio.TimeoutError:
+        result["error"] = "timeout"
+    except Exception as e:
+        result["error"] = str(e) or e.__class__.__name__
+
+    if result["error"]:
+        probe_cache.set_negative(key, result["error"])
+    else:
+        probe_cache.set(key, result, host_ttl(url))
+    return dict(result)
+
+
+# ----------------------- ROUTE CLASSIFIER ----------------------- #
+
+ROUTE_DIRECT = "direct"     # seedha file download, yt-dlp extraction skip
+ROUTE_EXTRACT = "extract"   # webpage / stream -> yt-dlp se formats nikalo
+
+# in sites pe hamesha extractor chahiye (page URL, media nahi)
+_EXTRACTOR_HOSTS = (
+    "youtube.com", "youtu.be", "instagram.com", "facebook.com", "fb.watch",
+    "tiktok.com", "twitter.com", "x.com", "reddit.com", "vimeo.com",
+    "dailymotion.com",
+)
+
+# playlist / manifest types – yt-dlp hi inhe theek se merge karta hai
+_STREAM_TYPES = {
+    "application/vnd.apple.mpegurl",
+    "application/x-mpegurl",
+    "audio/mpegurl",
+    "audio/x-mpegurl",
+    "application/dash+xml",
+}
+
+_DIRECT_PREFIXES = ("video/", "audio/", "image/")
+
+_DIRECT_TYPES = {
+    "application/pdf",
+    "application/zip",
+    "application/gzip",
+    "application/x-tar",
+    "application/vnd.rar",
+    "application/x-rar-compressed",
+    "application/x-7z-compressed",
+    "application/vnd.android.package-archive",
+    "application/x-msdownload",
+    "application/x-matroska",
+    "application/mp4",
+    "application/ogg",
+    "application/epub+zip",
+}
+
+
+def _is_direct_type(ctype: str) -> bool:
+    if not ctype or ctype in _STREAM_TYPES:
+        return False
+    return ctype.startswith(_DIRECT_PREFIXES) or ctype in _DIRECT_TYPES
+
+
+def classify_url(result: dict) -> str:
+    """
+    Probe result se jaldi decide: direct media file hai (ROUTE_DIRECT) ya
+    yt-dlp extraction chahiye (ROUTE_EXTRACT). Shak ho to ROUTE_EXTRACT –
+    extraction ka fallback pehle jaisa direct mode hi hai.
+    """
+    if result.get("error") or result.get("status", 0) >= 400:
+        return ROUTE_EXTRACT
+
+    host = (urlparse(result.get("final_url") or result.get("url") or "").netloc or "").lower()
+    host = host.split(":")[0]
+    if any(host == h or host.endswith("." + h) for h in _EXTRACTOR_HOSTS):
+        return ROUTE_EXTRACT
+
+    ctype = effective_type(result)
+    if _is_direct_type(ctype):
+        return ROUTE_DIRECT
+
+    # generic header + sniff se kuch nahi mila -> naam ke extension pe bharosa,
+    # lekin sirf jab server ne size bataya ho (webpage ka size aksar unknown hota hai)
+    if ctype in _GENERIC_TYPES and result.get("size"):
+        guessed = mimetypes.guess_type(result.get("filename") or "")[0] or ""
+        if _is_direct_type(guessed.lower()):
+            return ROUTE_DIRECT
+
+    return ROUTE_EXTRACT
@@ -0,0 +1,152 @@
+# utils/resume.py
+import json
+import os
+import time
+
+# ==========================================
+#   .part FILE + SIDECAR MANIFEST
+# ==========================================
+#
+# Direct download pehle "<file>.part" me likha jata hai. Saath me
+# "<file>.part.json" manifest rakha jata hai:
+#   {
+#     "url": ...,
+#     "etag": ... | None,
+#     "last_modified": ... | None,
+#     "total": <bytes>,
+#     "ranges": [[start, end), ...],   # jo bytes disk pe pakke likh chuke
+#     "updated": <unix ts>,
+#   }
+# Socket error ya process restart ke baad isi se Range/If-Range resume hota hai.
+
+PART_SUFFIX = ".part"
+MANIFEST_SUFFIX = ".part.json"
+
+
+def part_path(local_path: str) -> str:
+    return local_path + PART_SUFFIX
+
+
+def manifest_path(local_path: str) -> str:
+    return local_path + MANIFEST_SUFFIX
+
+
+# ----------------------- RANGE HELPERS ----------------------- #
+
+def merge_ranges(ranges: list) -> list[list[int]]:
+    """
+    Half-open [start, end) ranges ko sort + merge karta hai.
+    """
+    merged: list[list[int]] = []
+    for start, end in sorted((int(a), int(b)) for a, b in ranges if int(b) > int(a)):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_ranges(done: list, total: int) -> list[list[int]]:
+    """
+    [0, total) me se jo ranges abhi download nahi hui.
+    """
+    missing = []
+    pos = 0
+    for start, end in merge_ranges(done):
+        if start > pos:
+            missing.append([pos, start])
+        pos = max(pos, end)
+    if pos < total:
+        missing.append([pos, total])
+    return missing
+
+
+def done_bytes(ranges: list) -> int:
+    return sum(end - start for start, end in merge_ranges(ranges))
+
+
+# ----------------------- MANIFEST ----------------------- #
+
+def new_manifest(url: str, total: int, etag: str | None, last_modified: str | None) -> dict:
+    return {
+        "url": url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "total": total,
+        "ranges": [],
+        "updated": time.time(),
+    }
+
+
+def load_manifest(local_path: str, url: str) -> dict | None:
+    """
+    Pichla manifest tabhi milega jab same URL ho aur .part file bhi disk pe ho.
+    """
+    mpath = manifest_path(local_path)
+    if not os.path.exists(mpath) or not os.path.exists(part_path(local_path)):
+        return None
+    try:
+        with open(mpath, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except Exception:
+        return None
+    if manifest.get("url") != url or not manifest.get("total"):
+        return None
+    manifest["ranges"] = merge_ranges(manifest.get("ranges") or [])
+    return manifest
+
+
+def save_manifest(local_path: str, manifest: dict):
+    """
+    Atomic write (tmp + os.replace) taki crash me manifest aadha na likha jaye.
+    """
+    manifest["ranges"] = merge_ranges(manifest.get("ranges") or [])
+    manifest["updated"] = time.time()
+    mpath = manifest_path(local_path)
+    tmp = mpath + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, mpath)
+
+
+def same_resource(manifest: dict, total: int, etag: str | None, last_modified: str | None) -> bool:
+    """
+    Server pe file badli to nahi? Size + ETag/Last-Modified (jo available ho) match.
+    """
+    if int(manifest.get("total") or 0) != total:
+        return False
+    if manifest.get("etag") and etag and manifest["etag"] != etag:
+        return False
+    if manifest.get("last_modified") and last_modified and manifest["last_modified"] != last_modified:
+        return False
+    return True
+
+
+def if_range_value(manifest: dict) -> str | None:
+    """
+    If-Range me sirf strong ETag chalta hai, warna Last-Modified.
+    """
+    etag = manifest.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return manifest.get("last_modified")
+
+
+def discard(local_path: str):
+    for p in (part_path(local_path), manifest_path(local_path)):
+        try:
+            if os.path.exists(p):
+                os.remove(p)
+        except Exception:
+            pass
+
+
+def finalize(local_path: str):
+    """
+    .part ko final naam pe le aata hai aur manifest hata deta hai.
+    """
+    os.replace(part_path(local_path), local_path)
+    try:
+        os.remove(manifest_path(local_path))
+    except Exception:
+        pass
@@ -0,0 +1,201 @@
+# utils/scheduler.py
+import copy
+from datetime import datetime
+
+from config import JOB_PREMIUM_WEIGHT, JOB_FREE_WEIGHT, JOB_EST_MBPS
+
+# ==========================================
+#   WEIGHTED FAIR JOB SCHEDULER
+# ==========================================
+#
+# Queued jobs me se agla job teen level pe chuna jata hai:
+#   1. Lane (plan): premium / free – stride scheduling. Har pick pe lane ka
+#      "pass" 1/weight badhta hai, sabse chhote pass wali lane jeet-ti hai.
+#      Weights 3:1 = dono lanes busy hon to 4 me se 3 slots premium ko.
+#      Idle lane wapas aaye to uska pass aage khiska diya jata hai (jama
+#      hua "credit" burst nahi banta).
+#   2. User (lane ke andar): round-robin – jis user ko sabse pehle serve
+#      kiya tha (ya kabhi nahi) uski baari. Ek heavy user baaki ko starve
+#      nahi kar sakta.
+#   3. Job (user ke andar): chhoti file pehle, lekin wait ke saath badi file
+#      ka effective size ghat-ta hai (aging) taki wo hamesha peeche na rahe.
+#
+# Pure logic – Mongo / asyncio kuch nahi. `pick()` state nahi badalta,
+# `commit()` karta hai (claim race haare to commit nahi hota). /queue ka ETA
+# isi scheduler ki copy pe poori queue simulate karke nikalta hai.
+
+PREMIUM = "premium"
+FREE = "free"
+
+# size pata na ho to itna maan ke chalo (ordering + ETA)
+UNKNOWN_SIZE = 256 * 1024 * 1024
+# itne seconds wait ke baad job ka effective size aadha
+AGING_SECONDS = 600
+# har job ka fixed overhead (probe, faststart, send), seconds
+JOB_OVERHEAD = 10.0
+# speed EWMA smoothing
+_EWMA_ALPHA = 0.3
+
+
+def job_lane(doc: dict) -> str:
+    return PREMIUM if doc.get("premium") else FREE
+
+
+def job_size(doc: dict) -> int:
+    return int(doc.get("size") or 0) or UNKNOWN_SIZE
+
+
+def _waited(doc: dict, now: datetime) -> float:
+    created = doc.get("created")
+    return max(0.0, (now - created).total_seconds()) if created else 0.0
+
+
+class FairScheduler:
+    def __init__(self, weights: dict[str, int] | None = None):
+        self.weights = weights or {PREMIUM: max(1, JOB_PREMIUM_WEIGHT), FREE: max(1, JOB_FREE_WEIGHT)}
+        self.passes = {lane: 0.0 for lane in self.weights}
+        self.vtime = 0.0                       # last picked lane ka pass
+        self.last_served: dict[int, int] = {}  # user_id -> serve sequence
+        self._seq = 0
+        self.speed = JOB_EST_MBPS * 1024 * 1024   # bytes/sec (EWMA)
+
+    def clone(self) -> "FairScheduler":
+        return copy.deepcopy(self)
+
+    # ----------------------- PICK ----------------------- #
+
+    def pick(
+        self,
+        queued: list,
+        running: dict[int, int],
+        per_user: int,
+        max_size: int | None = None,
+        now: datetime | None = None,
+    ) -> dict | None:
+        """
+        `queued` me se agla job (None = koi eligible nahi).
+        running: user_id -> chal rahe jobs; max_size: express slot ki limit.
+        """
+        now = now or datetime.utcnow()
+        eligible = [
+            d for d in queued
+            if running.get(d["user_id"], 0) < per_user
+            and (max_size is None or 0 < int(d.get("size") or 0) <= max_size)
+        ]
+        if not eligible:
+            return None
+
+        # 1) lane
+        lanes = {job_lane(d) for d in eligible}
+        lane = min(lanes, key=lambda ln: (max(self.passes.get(ln, 0.0), self.vtime), ln != PREMIUM))
+        in_lane = [d for d in eligible if job_lane(d) == lane]
+
+        # 2) user – round robin (kabhi serve nahi hua = sabse pehle)
+        users: dict[int, list] = {}
+        for d in in_lane:
+            users.setdefault(d["user_id"], []).append(d)
+        user_id = min(
+            users,
+            key=lambda u: (
+                self.last_served.get(u, -1),
+                min(d.get("created") or now for d in users[u]),
+            ),
+        )
+
+        # 3) job – aging ke saath smallest first
+        return min(
+            users[user_id],
+            key=lambda d: (job_size(d) / (1.0 + _waited(d, now) / AGING_SECONDS), d.get("created") or now),
+        )
+
+    def commit(self, doc: dict):
+        lane = job_lane(doc)
+        start = max(self.passes.get(lane, 0.0), self.vtime)
+        self.vtime = start
+        self.passes[lane] = start + 1.0 / self.weights.get(lane, 1)
+        self._seq += 1
+        self.last_served[doc["user_id"]] = self._seq
+
+    # ----------------------- ETA ----------------------- #
+
+    def record_job(self, size: int, elapsed: float):
+        """
+        Khatam hue job se speed estimate update (ETA ke liye).
+        """
+        if size <= 0 or elapsed <= JOB_OVERHEAD:
+            return
+        observed = size / (elapsed - JOB_OVERHEAD)
+        self.speed = (1 - _EWMA_ALPHA) * self.speed + _EWMA_ALPHA * observed
+
+    def estimate(self, doc: dict) -> float:
+        return JOB_OVERHEAD + job_size(doc) / max(self.speed, 1.0)
+
+    def plan(
+        self,
+        queued: list,
+        running_docs: list,
+        workers: int,
+        per_user: int,
+        express_workers: int = 0,
+        express_max: int | None = None,
+    ) -> list[tuple[dict, float]]:
+        """
+        Poori queue ka simulated order: [(doc, start_in_seconds), ...].
+        """
+        sim = self.clone()
+        now = datetime.utcnow()
+
+        def remaining(d: dict) -> float:
+            started = d.get("started")
+            done = (now - started).total_seconds() if started else 0.0
+            return max(1.0, sim.estimate(d) - done)
+
+        # worker slots: (free_at, express?) ; running jobs pehle slots bharte hain
+        slots = [[0.0, False] for _ in range(max(1, workers))]
+        slots += [[0.0, True] for _ in range(max(0, express_workers))]
+        user_free: dict[int, list[float]] = {}
+        busy = sorted((remaining(d), d["user_id"]) for d in running_docs)
+        for i, (left, uid) in enumerate(busy):
+            if i < len(slots):
+                slots[i][0] = left
+            user_free.setdefault(uid, []).append(left)
+
+        pending = list(queued)
+        order: list[tuple[dict, float]] = []
+        while pending:
+            slots.sort(key=lambda s: s[0])
+            t = slots[0][0]
+            # is waqt tak jo users free ho chuke unke hisaab se running count
+            running = {
+                uid: sum(1 for x in ends if x > t) for uid, ends in user_free.items()
+            }
+            picked = None
+            for slot in slots:
+                if slot[0] > t:
+                    break
+                picked = sim.pick(
+                    pending, running, per_user,
+                    max_size=express_max if slot[1] else None,
+                    now=now,
+                )
+                if picked is not None:
+                    break
+            if picked is None:
+                # koi slot abhi kuch nahi utha sakta -> agle event tak time aage
+                future = [s[0] for s in slots if s[0] > t] + [
+                    x for ends in user_free.values() for x in ends if x > t
+                ]
+                if not future:
+                    break
+                bump = min(future)
+                for s in slots:
+                    if s[0] <= t:
+                        s[0] = bump
+                continue
+            sim.commit(picked)
+            pending.remove(picked)
+            end = t + sim.estimate(picked)
+            slot[0] = end
+            user_free.setdefault(picked["user_id"], []).append(end)
+            order.append((picked, t))
+        return order
@@ -0,0 +1,117 @@
+# utils/single_flight.py
+import asyncio
+import logging
+import time
+
+from utils.cache import normalize_cache_url
+from utils.metrics import incr
+
+# ==========================================
+#   SINGLE-FLIGHT (same URL + format ek hi baar)
+# ==========================================
+#
+# Kai users ek saath same link + quality bhejein to sirf pehla (leader)
+# download -> upload karta hai. Baaki (followers) usi flight se attach hote
+# hain: leader ka progress unke apne progress message pe mirror hota hai,
+# aur leader khatam hone par unhe file_id se (bina download) file milti hai.
+
+# followers ke messages itne seconds me ek baar edit (flood wait se bachne ko)
+_FOLLOWER_EDIT_INTERVAL = 3.0
+
+
+def flight_key(url: str, fmt_id: str | None) -> str:
+    return f"{normalize_cache_url(url)}|{fmt_id or 'direct'}"
+
+
+class Flight:
+    def __init__(self, key: str):
+        self.key = key
+        self.started = time.time()
+        self.done = asyncio.Event()
+        self.ok = False
+        self.followers: list = []     # follower progress messages
+        self.last_text: str | None = None
+        self._last_fanout = 0.0
+
+    async def fanout(self, text: str, force: bool = False):
+        """
+        Leader ka progress text followers tak (throttled).
+        """
+        self.last_text = text
+        now = time.time()
+        if not self.followers or (not force and now - self._last_fanout < _FOLLOWER_EDIT_INTERVAL):
+            return
+        self._last_fanout = now
+        shared = f"👥 Shared download (same link)\n\n{text}"
+        for msg in list(self.followers):
+            try:
+                await msg.edit_text(shared)
+            except Exception:
+                pass
+
+    async def wait(self, progress_msg) -> bool:
+        """
+        Follower: progress_msg pe mirror milta rahe, leader ka result (True/False).
+        """
+        self.followers.append(progress_msg)
+        try:
+            await self.done.wait()
+        finally:
+            try:
+                self.followers.remove(progress_msg)
+            except ValueError:
+                pass
+        return self.ok
+
+
+class FanoutMessage:
+    """
+    Leader ke progress message ka proxy: edit_text primary message pe hota hai
+    aur followers tak bhi jata hai. Baaki sab attributes primary ke.
+    """
+
+    def __init__(self, primary, flight: Flight):
+        self._primary = primary
+        self._flight = flight
+
+    async def edit_text(self, text, *args, **kwargs):
+        result = await self._primary.edit_text(text, *args, **kwargs)
+        await self._flight.fanout(str(text))
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._primary, name)
+
+
+class SingleFlight:
+    def __init__(self, name: str = "flight"):
+        self.name = name
+        self._flights: dict[str, Flight] = {}
+
+    def get(self, key: str) -> Flight | None:
+        return self._flights.get(key)
+
+    def lead(self, key: str) -> Flight:
+        flight = Flight(key)
+        self._flights[key] = flight
+        incr(f"{self.name}.lead")
+        return flight
+
+    def finish(self, flight: Flight, ok: bool):
+        flight.ok = ok
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+        if flight.followers:
+            logging.info(
+                "👥 %s: %s follower(s) served by one job (%s)",
+                self.name, len(flight.followers), flight.key[:80],
+            )
+        flight.done.set()
+
+    @property
+    def active(self) -> int:
+        return len(self._flights)
+
+
+# download -> upload pipeline ke liye
+download_flights = SingleFlight("singleflight")
@@ -0,0 +1,85 @@
+# utils/state_store.py
+import time
+from datetime import datetime, timedelta
+
+from database import state_get, state_set, state_delete
+
+# ==========================================
+#   SHARED PER-USER STATE (Mongo)
+# ==========================================
+#
+# Pehle PENDING_DOWNLOAD / THUMB_PENDING / FORCE_MESSAGES module-level dicts
+# the – bot sirf ek process me chal sakta tha. SharedState wahi dict jaisa
+# interface deta hai lekin value Mongo "runtime_state" me rehti hai (TTL ke
+# saath), isliye kisi bhi node pe aaya agla update / callback same state
+# dekhta hai.
+#
+# Dhyan rahe: get() har baar nayi copy deta hai. Value badalne ke baad
+# `STATE[user_id] = value` se wapas save karna zaroori hai.
+#
+# `local_keys`: bade / non-BSON fields (jaise yt-dlp ka poora info dict) sirf
+# is process ki memory me rehte hain; same node pe get() unhe wapas jod deta
+# hai, dusre node pe wo field missing hoti hai (caller fallback kare).
+
+
+class SharedState:
+    def __init__(self, kind: str, ttl: int, local_keys: tuple = ()):
+        self.kind = kind
+        self.ttl = ttl
+        self.local_keys = local_keys
+        self._local: dict[int, tuple[float, dict]] = {}
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.kind}:{user_id}"
+
+    def _split(self, user_id: int, value):
+        if not self.local_keys or not isinstance(value, dict):
+            return value
+        local = {k: value[k] for k in self.local_keys if k in value}
+        if local:
+            self._local[user_id] = (time.time() + self.ttl, local)
+        else:
+            self._local.pop(user_id, None)
+        return {k: v for k, v in value.items() if k not in self.local_keys}
+
+    def _join(self, user_id: int, value):
+        entry = self._local.get(user_id)
+        if entry is None or not isinstance(value, dict):
+            return value
+        expires, local = entry
+        if expires < time.time():
+            self._local.pop(user_id, None)
+            return value
+        return {**value, **local}
+
+    # ----------------------- DICT API ----------------------- #
+
+    def get(self, user_id: int, default=None):
+        doc = state_get(self._key(user_id))
+        if doc is None:
+            return default
+        return self._join(user_id, doc["value"])
+
+    def __getitem__(self, user_id: int):
+        value = self.get(user_id)
+        if value is None:
+            raise KeyError(user_id)
+        return value
+
+    def __setitem__(self, user_id: int, value):
+        state_set(
+            self._key(user_id),
+            self._split(user_id, value),
+            datetime.utcnow() + timedelta(seconds=self.ttl),
+        )
+
+    def __contains__(self, user_id: int) -> bool:
+        return state_get(self._key(user_id)) is not None
+
+    def pop(self, user_id: int, default=None):
+        self._local.pop(user_id, None)
+        doc = state_delete(self._key(user_id))
+        return doc["value"] if doc else default
+
+    def __delitem__(self, user_id: int):
+        self.pop(user_id)
@@ -0,0 +1,412 @@
+# utils/tg_upload.py
+import asyncio
+import logging
+import math
+import os
+import time
+
+from pyrogram import raw, types, utils
+from pyrogram.errors import FilePartMissing, FloodWait
+from pyrogram.session import Session
+
+from utils import resume
+from utils.metrics import incr, record_throughput, throughput_key
+from config import UPLOAD_SESSIONS, UPLOAD_WORKERS_PER_SESSION, UPLOAD_PART_RETRIES
+
+# ==========================================
+#   RAW BIG-FILE UPLOADER (SaveBigFilePart)
+# ==========================================
+#
+# Pyrogram ka save_file poori file pehle se disk pe maan ke chalta hai aur
+# fp.read() event loop pe hi karta hai. Yahan parts khud bheje jate hain:
+#   - FileSource:   normal complete file
+#   - GrowingFile:  abhi download ho rahi file – jo part ke bytes disk pe aa
+#                   gaye wahi upload hota hai, baaki ke liye wait (download
+#                   aage ho to disk buffer karta hai, upload aage ho to ruk ke
+#                   intezar) – end-to-end time ~ dono me se slow wala leg.
+# Result InputFileBig -> send_uploaded_media() se normal caption / thumb /
+# spoiler ke saath message.
+#
+# Parts UPLOAD_SESSIONS alag media sessions (alag TCP connections, same
+# upload DC) pe UPLOAD_WORKERS_PER_SESSION workers se parallel jate hain.
+# Sessions process bhar me reuse hote hain (har upload pe naya handshake
+# nahi). Fail hua part UPLOAD_PART_RETRIES baar backoff ke saath dobara.
+
+PART_SIZE = 512 * 1024
+# Telegram "big file" (SaveBigFilePart) isse badi files ke liye hi
+BIG_FILE_MIN = 10 * 1024 * 1024
+# ek file me max parts (512 KiB * 4000 = ~2000 MiB)
+MAX_PARTS = 4000
+# retry backoff ki upper limit, seconds
+_MAX_BACKOFF = 16
+
+
+class StreamAborted(Exception):
+    """
+    GrowingFile stream nahi ho sakti (size unknown / file server pe badli /
+    download fail) – caller normal upload pe fallback kare.
+    """
+
+
+class FileSource:
+    """
+    Disk pe complete file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.total = os.path.getsize(path)
+
+    async def wait_started(self):
+        return
+
+    def is_available(self, start: int, end: int) -> bool:
+        return True
+
+    async def wait_change(self):
+        return
+
+    async def read(self, start: int, length: int) -> bytes:
+        return await asyncio.to_thread(_pread, self.path, start, length)
+
+
+class GrowingFile:
+    """
+    Downloader aur uploader ke beech shared state. Downloader:
+      start(path, total, done_ranges) -> add(start, end) ... -> finish() / abort()
+    Uploader parts ke liye is_available / wait_change use karta hai.
+    """
+
+    def __init__(self):
+        self.path: str | None = None
+        self.total = 0
+        self.ranges: list[list[int]] = []
+        self.complete = False
+        self.error: str | None = None
+        self.uploaded = 0   # uploader update karta hai (progress text ke liye)
+        self.consuming = False   # uploader ne size check pass karke parts lena shuru kiya
+        self._fd: int | None = None
+        self._changed = asyncio.Event()
+        self._started = asyncio.Event()
+
+    # ---------- downloader side ----------
+
+    def start(self, path: str, total: int, done_ranges: list | None = None):
+        # fd pehle hi khol lo: download ke end me .part rename hone ke baad bhi
+        # same inode padhte rahenge
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+        self.total = total
+        self.ranges = resume.merge_ranges(done_ranges or [])
+        self._started.set()
+        self._notify()
+
+    def add(self, start: int, end: int):
+        self.ranges = resume.merge_ranges(self.ranges + [[start, end]])
+        self._notify()
+
+    def finish(self):
+        if self.total:
+            self.ranges = [[0, self.total]]
+        self.complete = True
+        self._notify()
+
+    def abort(self, reason: str):
+        if self.error is None:
+            self.error = reason
+        self._started.set()
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+
+    # ---------- uploader side ----------
+
+    async def wait_started(self):
+        await self._started.wait()
+        if self.error:
+            raise StreamAborted(self.error)
+
+    def is_available(self, start: int, end: int) -> bool:
+        if self.error:
+            raise StreamAborted(self.error)
+        for a, b in self.ranges:
+            if a <= start and end <= b:
+                return True
+            if a > start:
+                break
+        return False
+
+    async def wait_change(self):
+        await self._changed.wait()
+        self._changed.clear()
+        if self.error:
+            raise StreamAborted(self.error)
+
+    async def read(self, start: int, length: int) -> bytes:
+        return await asyncio.to_thread(os.pread, self._fd, length, start)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def _pread(path: str, start: int, length: int) -> bytes:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.pread(fd, length, start)
+    finally:
+        os.close(fd)
+
+
+class _SessionPool:
+    """
+    Upload DC ke media sessions – lazily start, uploads ke beech reuse.
+    """
+
+    def __init__(self):
+        self._sessions: list[Session] = []
+        self._lock: asyncio.Lock | None = None
+
+    async def get(self, app, count: int) -> list[Session]:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while len(self._sessions) < count:
+                session = Session(
+                    app,
+                    await app.storage.dc_id(),
+                    await app.storage.auth_key(),
+                    await app.storage.test_mode(),
+                    is_media=True,
+                )
+                await session.start()
+                self._sessions.append(session)
+            return self._sessions[:count]
+
+    async def close(self):
+        sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            try:
+                await session.stop()
+            except Exception:
+                pass
+
+
+_pool = _SessionPool()
+
+
+async def close_upload_sessions():
+    await _pool.close()
+
+
+async def _media_sessions(app, count: int) -> list[Session]:
+    return await _pool.get(app, max(1, count))
+
+
+async def _save_part(session: Session, rpc) -> None:
+    """
+    Ek part bhejo; network / RPC error pe backoff ke saath retry,
+    FloodWait pe bataya hua time ruk ke (retry count me nahi ginta).
+    """
+    attempt = 0
+    while True:
+        try:
+            if await session.invoke(rpc):
+                return
+            error: Exception = RuntimeError(f"part {rpc.file_part} not saved")
+        except FloodWait as e:
+            incr("upload.flood_wait")
+            await asyncio.sleep(e.value)
+            continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+        attempt += 1
+        if attempt > UPLOAD_PART_RETRIES:
+            raise error
+        incr("upload.part_retry")
+        logging.info("upload part %s retry %s: %s", rpc.file_part, attempt, error)
+        await asyncio.sleep(min(2 ** (attempt - 1), _MAX_BACKOFF))
+
+
+async def upload_big_file(app, source, file_name: str, progress=None, min_size: int = BIG_FILE_MIN):
+    """
+    source ke saare parts SaveBigFilePart se bhejta hai, InputFileBig return.
+    `progress(done, total)` async callback, har part ke baad.
+    """
+    try:
+        await source.wait_started()
+    except StreamAborted:
+        if isinstance(source, GrowingFile):
+            source.close()
+        raise
+    total = source.total
+    total_parts = math.ceil(total / PART_SIZE)
+    if total <= max(min_size, BIG_FILE_MIN) or total_parts > MAX_PARTS:
+        reason = f"size {total} not suitable for big-file upload"
+        if isinstance(source, GrowingFile):
+            # downloader ko pata chale ki stream nahi hua (faststart skip na kare)
+            source.abort(reason)
+            source.close()
+        raise StreamAborted(reason)
+    if isinstance(source, GrowingFile):
+        source.consuming = True
+
+    file_id = app.rnd_id()
+    pending = list(range(total_parts))
+    done_bytes = 0
+    started = time.time()
+    job = throughput_key(f"⬆️ {file_name}")
+
+    def part_span(index: int) -> tuple[int, int]:
+        start = index * PART_SIZE
+        return start, min(start + PART_SIZE, total)
+
+    def next_ready() -> int | None:
+        # sabse chhota part jiske bytes disk pe aa chuke (segmented download
+        # me parts order se nahi aate)
+        for i, index in enumerate(pending):
+            if source.is_available(*part_span(index)):
+                return pending.pop(i)
+        return None
+
+    async def worker(session: Session):
+        nonlocal done_bytes
+        while pending:
+            index = next_ready()
+            if index is None:
+                await source.wait_change()
+                continue
+            start, end = part_span(index)
+            chunk = await source.read(start, end - start)
+            await _save_part(
+                session,
+                raw.functions.upload.SaveBigFilePart(
+                    file_id=file_id,
+                    file_part=index,
+                    file_total_parts=total_parts,
+                    bytes=chunk,
+                ),
+            )
+            done_bytes += len(chunk)
+            if isinstance(source, GrowingFile):
+                source.uploaded = done_bytes
+            record_throughput(job, done_bytes, total)
+            if progress is not None:
+                await progress(done_bytes, total)
+
+    try:
+        sessions = await _media_sessions(app, UPLOAD_SESSIONS)
+        tasks = [
+            asyncio.create_task(worker(session))
+            for session in sessions
+            for _ in range(max(1, UPLOAD_WORKERS_PER_SESSION))
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    finally:
+        if isinstance(source, GrowingFile):
+            source.close()
+
+    elapsed = max(time.time() - started, 1e-3)
+    logging.info(
+        "⬆️ %s: %s parts in %.1fs (%.2f MB/s, %s sessions x %s workers)",
+        file_name, total_parts, elapsed, total / elapsed / (1024 * 1024),
+        len(sessions), max(1, UPLOAD_WORKERS_PER_SESSION),
+    )
+    return raw.types.InputFileBig(id=file_id, parts=total_parts, name=file_name)
+
+
+async def _reupload_part(app, path: str, input_file, part: int):
+    start = part * PART_SIZE
+    chunk = await asyncio.to_thread(_pread, path, start, PART_SIZE)
+    session = (await _media_sessions(app, 1))[0]
+    await _save_part(
+        session,
+        raw.functions.upload.SaveBigFilePart(
+            file_id=input_file.id,
+            file_part=part,
+            file_total_parts=input_file.parts,
+            bytes=chunk,
+        ),
+    )
+
+
+async def send_uploaded_media(
+    app,
+    chat_id: int,
+    input_file,
+    path: str,
+    file_name: str,
+    caption: str,
+    as_video: bool,
+    thumb: str | None = None,
+    spoiler: bool = False,
+    duration: int | None = None,
+    width: int = 0,
+    height: int = 0,
+):
+    """
+    Pehle se upload hua InputFileBig send_video / send_document jaisa bhejta hai.
+    FilePartMissing pe wo part dobara bhej ke retry – UPLOAD_PART_RETRIES ke
+    baad bhi parts missing hon to FilePartMissing raise (caller normal upload
+    pe fallback kare). Returns pyrogram Message.
+    """
+    thumb_file = await app.save_file(thumb) if thumb else None
+    attributes = [raw.types.DocumentAttributeFilename(file_name=file_name)]
+    if as_video:
+        attributes.insert(
+            0,
+            raw.types.DocumentAttributeVideo(
+                supports_streaming=True,
+                duration=duration or 0,
+                w=width or 0,
+                h=height or 0,
+            ),
+        )
+    media = raw.types.InputMediaUploadedDocument(
+        mime_type=app.guess_mime_type(file_name) or ("video/mp4" if as_video else "application/octet-stream"),
+        file=input_file,
+        thumb=thumb_file,
+        spoiler=spoiler if as_video else None,
+        force_file=None if as_video else True,
+        attributes=attributes,
+    )
+
+    missing = 0
+    while True:
+        try:
+            r = await app.invoke(
+                raw.functions.messages.SendMedia(
+                    peer=await app.resolve_peer(chat_id),
+                    media=media,
+                    random_id=app.rnd_id(),
+                    **await utils.parse_text_entities(app, caption, None, None),
+                )
+            )
+        except FilePartMissing as e:
+            missing += 1
+            if missing > UPLOAD_PART_RETRIES:
+                incr("upload.parts_missing_giveup")
+                raise
+            logging.info("re-uploading missing part %s of %s", e.value, file_name)
+            await _reupload_part(app, path, input_file, int(e.value))
+            continue
+
+        for u in r.updates:
+            if isinstance(u, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)):
+                return await types.Message._parse(
+                    app,
+                    u.message,
+                    {i.id: i for i in r.users},
+                    {i.id: i for i in r.chats},
+                )
+        return None
@@ -1,22 +1,154 @@
 # utils/uploader.py
+import asyncio
 import os
+import shutil
+import tempfile
 import time
 from pyrogram.client import Client
 from pyrogram.types import Message, InputMediaPhoto
+from pyrogram.errors import (
+    FilePartMissing,
+    FileIdInvalid,
+    FileReferenceEmpty,
+    FileReferenceExpired,
+    FileReferenceInvalid,
+    MediaEmpty,
+    MediaInvalid,
+)
 
 from utils.progress import edit_progress_message, human_readable
 from utils.downloader import is_video_ext
 from utils.media_tools import (
     generate_screenshots,
     generate_sample_clip,
-    get_media_duration,
+    probe_media,
     generate_thumbnail_frame,
     ensure_mp4_faststart,
 )
-from config import MAX_FILE_SIZE, LOG_CHANNEL, PROGRESS_UPDATE_INTERVAL
+from utils.file_store import download_store
+from utils.tg_upload import send_uploaded_media, upload_big_file, FileSource, BIG_FILE_MIN
+from utils.media_cache import lookup_media, mark_hit, mark_stale, remember_upload, media_variant
+from config import MAX_FILE_SIZE, LOG_CHANNEL, PROGRESS_UPDATE_INTERVAL, UPLOAD_SESSIONS
 from database import get_user_doc, increment_usage, update_stats
 
 
+# sirf inpe cached file_id sach me bekaar hai; FloodWait / network error pe
+# entry rehti hai, normal flow chalta hai
+_STALE_FILE_ERRORS = (
+    FileIdInvalid,
+    FileReferenceEmpty,
+    FileReferenceExpired,
+    FileReferenceInvalid,
+    MediaEmpty,
+    MediaInvalid,
+)
+
+
+def build_caption(user: dict, base_name: str) -> tuple[str, str]:
+    """
+    User ke prefix / suffix / caption template se (final_name, caption).
+    """
+    prefix = user.get("prefix") or ""
+    suffix = user.get("suffix") or ""
+    final_name = f"{prefix}{base_name}{suffix}"
+
+    caption_template = user.get("caption")
+    caption = caption_template.replace("{file_name}", final_name) if caption_template else f"📁 `{final_name}`"
+    return final_name, caption
+
+
+async def send_cached_media(
+    app: Client,
+    message: Message,
+    url: str,
+    fmt_id: str | None,
+    user_id: int,
+    progress_msg: Message,
+    file_name: str | None = None,
+    remaining_size: int | None = None,
+) -> bool:
+    """
+    Same URL + format pehle upload ho chuka hai to stored file_id se turant
+    bhej do (zero download / upload). True = bhej diya, False = normal flow.
+    Sample / screenshots wale users ke liye skip (wo file se hi bante hain).
+    """
+    user = get_user_doc(user_id)
+    if user.get("send_sample") or user.get("send_screenshots"):
+        return False
+
+    if not file_name:
+        # final naam pata nahi -> variant match nahi ho sakta
+        return False
+
+    upload_type = user.get("upload_type", "video")
+    final_name, caption = build_caption(user, file_name)
+    doc = lookup_media(url, fmt_id, upload_type, media_variant(user, final_name))
+    if not doc:
+        return False
+
+    file_size = int(doc.get("file_size") or 0)
+    if remaining_size is not None and file_size > remaining_size:
+        return False
+
+    try:
+        if doc.get("kind") == "video":
+            sent = await app.send_video(
+                chat_id=message.chat.id,
+                video=doc["file_id"],
+                caption=caption,
+                supports_streaming=True,
+                has_spoiler=bool(user.get("spoiler")),
+                duration=doc.get("duration") or 0,
+            )
+        else:
+            sent = await app.send_document(
+                chat_id=message.chat.id,
+                document=doc["file_id"],
+                caption=caption,
+            )
+    except _STALE_FILE_ERRORS as e:
+        print("Cached media stale:", e)
+        mark_stale(doc)
+        return False
+    except Exception as e:
+        print("Cached media send error:", e)
+        return False
+
+    if not sent:
+        return False
+
+    mark_hit(doc)
+    increment_usage(user_id, file_size)
+    try:
+        await progress_msg.edit_text(
+            f"⚡ Cache se turant bhej diya\n📦 Size: {human_readable(file_size)}"
+        )
+    except Exception:
+        pass
+    return True
+
+
+async def _drop_tasks(*tasks):
+    pending = [t for t in tasks if t is not None]
+    for t in pending:
+        if not t.done():
+            t.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _remove_artifacts(sample_path: str, shots_dir: str):
+    try:
+        if os.path.exists(sample_path):
+            os.remove(sample_path)
+        if os.path.isdir(shots_dir):
+            for f in os.listdir(shots_dir):
+                os.remove(os.path.join(shots_dir, f))
+            os.rmdir(shots_dir)
+    except Exception:
+        pass
+
+
 async def upload_with_thumb_and_progress(
     app: Client,
     message: Message,
@@ -24,7 +156,22 @@ async def upload_with_thumb_and_progress(
     user_id: int,
     progress_msg: Message,
     job_thumb_path: str | None = None,
+    source_url: str | None = None,
+    fmt_id: str | None = None,
+    streamed_upload=None,
+    on_upload=None,
+    work_dir: str | None = None,
 ):
+    """
+    `source_url` (+ yt-dlp `fmt_id`) diya ho to upload ka file_id media cache
+    me save hota hai, taki agli baar send_cached_media se bhej sakein.
+    `streamed_upload`: download ke saath-saath chal raha upload_big_file task;
+    uska InputFileBig seedha bheja jata hai (fail ho to normal upload).
+    `on_upload()`: async callback, faststart / probe ke baad asli upload shuru
+    hone se theek pehle (job queue ka "uploading" state).
+    `work_dir`: thumbnail / sample / screenshots yahan bante hain (job ka
+    workspace); na diya ho to apni temp directory, upload ke baad hat jati hai.
+    """
 
     # ==============================
     #   BASIC CHECKS
@@ -36,26 +183,21 @@ async def upload_with_thumb_and_progress(
     file_size = os.path.getsize(path)
     if file_size > MAX_FILE_SIZE:
         await message.reply_text("❌ File Telegram limit se badi hai.")
-        try:
-            os.remove(path)
-        except Exception:
-            pass
+        download_store.discard(path)
         return
 
+    own_work_dir = work_dir is None
+    if own_work_dir:
+        work_dir = tempfile.mkdtemp(prefix="upload_")
     user = get_user_doc(user_id)
     base_name = os.path.basename(path)
 
-    prefix = user.get("prefix") or ""
-    suffix = user.get("suffix") or ""
-    final_name = f"{prefix}{base_name}{suffix}"
-
     upload_type = user.get("upload_type", "video")
 
     # ==============================
     #   CAPTION
     # ==============================
-    caption_template = user.get("caption")
-    caption = caption_template.replace("{file_name}", final_name) if caption_template else f"📁 `{final_name}`"
+    final_name, caption = build_caption(user, base_name)
 
     # ==============================
     #   THUMBNAIL
@@ -71,17 +213,17 @@ async def upload_with_thumb_and_progress(
         try:
             thumb_downloaded_path = await app.download_media(
                 user["thumb_file_id"],
-                file_name=f"thumb_{user_id}.jpg"
+                file_name=os.path.join(work_dir, "user_thumb.jpg")
             )
             thumb_path = thumb_downloaded_path
         except Exception:
             thumb_path = None
 
     if thumb_path is None and is_video_ext(path):
-        auto_thumb_dir = f"/tmp/auto_thumb_{user_id}"
+        auto_thumb_dir = os.path.join(work_dir, "auto_thumb")
         os.makedirs(auto_thumb_dir, exist_ok=True)
         auto_thumb = os.path.join(auto_thumb_dir, "thumb.jpg")
-        t = generate_thumbnail_frame(path, auto_thumb)
+        t = await generate_thumbnail_frame(path, auto_thumb)
         if t and os.path.exists(t):
             thumb_path = t
         else:
@@ -114,25 +256,98 @@ async def upload_with_thumb_and_progress(
         )
 
     # ==============================
-    #   VIDEO DURATION
+    #   STREAMED UPLOAD RESULT
+    # ==============================
+    input_file = None
+    if streamed_upload is not None:
+        try:
+            input_file = await streamed_upload
+        except Exception as e:
+            print("Streamed upload fallback:", e)
+
+    # ==============================
+    #   VIDEO INFO (duration / dimensions)
     # ==============================
     duration = None
+    width = height = 0
     if is_video_ext(path):
-        try:
-            ensure_mp4_faststart(path)
-        except Exception:
-            pass
-        try:
-            duration = get_media_duration(path)
-        except Exception:
-            duration = None
+        # streamed file ke bytes pehle hi Telegram pe hain, ab rewrite bekaar.
+        # File download store ke blob ka hardlink ho to in-place nahi (blob
+        # bhi badal jata) – tab ffmpeg alag file likhta hai.
+        if input_file is None:
+            try:
+                await ensure_mp4_faststart(path, in_place=os.stat(path).st_nlink == 1)
+            except Exception:
+                pass
+        # faststart ke baad probe (in-place move se mtime badalta hai)
+        info = await probe_media(path)
+        if info is not None:
+            duration = info.seconds
+            width, height = info.width, info.height
 
     # ==============================
-    #   MAIN UPLOAD
+    #   SAMPLE + SCREENSHOTS (upload ke saath-saath)
     # ==============================
+    # ffmpeg kaam main upload ke dauraan hi chal jata hai; upload khatam hote
+    # hi ready artifacts bheje jate hain. Upload fail ho to tasks cancel.
+    sample_duration = int(user.get("sample_duration") or 15)
+    sample_path = os.path.join(work_dir, "sample.mp4")
+    shots_dir = os.path.join(work_dir, "screens")
+    sample_task = None
+    shots_task = None
+    if is_video_ext(path):
+        if user.get("send_sample"):
+            sample_task = asyncio.create_task(
+                generate_sample_clip(path, sample_path, sample_duration)
+            )
+        if user.get("send_screenshots"):
+            shots_task = asyncio.create_task(
+                generate_screenshots(
+                    path, out_dir=shots_dir, count=6, tile=bool(user.get("screens_tile"))
+                )
+            )
+
     sent = None
     try:
-        if upload_type == "video" and is_video_ext(path):
+        if on_upload is not None:
+            await on_upload()
+
+        # ==============================
+        #   PARALLEL PART UPLOAD (big files)
+        # ==============================
+        if input_file is None and UPLOAD_SESSIONS > 0 and os.path.getsize(path) > BIG_FILE_MIN:
+            try:
+                input_file = await upload_big_file(
+                    app, FileSource(path), final_name, progress=upload_progress
+                )
+            except Exception as e:
+                print("Parallel upload fallback:", e)
+
+        # ==============================
+        #   MAIN UPLOAD
+        # ==============================
+        if input_file is not None:
+            try:
+                sent = await send_uploaded_media(
+                    app,
+                    message.chat.id,
+                    input_file,
+                    path,
+                    final_name,
+                    caption,
+                    as_video=upload_type == "video" and is_video_ext(path),
+                    thumb=thumb_path,
+                    spoiler=spoiler_flag,
+                    duration=duration,
+                    width=width,
+                    height=height,
+                )
+            except FilePartMissing as e:
+                # Telegram baar baar part missing bata raha hai -> pyrogram upload
+                print("Uploaded parts rejected, normal upload fallback:", e)
+                input_file = None
+
+        if input_file is None and upload_type == "video" and is_video_ext(path):
             try:
                 sent = await app.send_video(
                     chat_id=message.chat.id,
@@ -143,6 +358,8 @@ async def upload_with_thumb_and_progress(
                     supports_streaming=True,
                     has_spoiler=spoiler_flag,
                     duration=duration if duration else None,
+                    width=width or None,
+                    height=height or None,
                     progress=upload_progress,
                 )
             except Exception:
@@ -154,7 +371,7 @@ async def upload_with_thumb_and_progress(
                     thumb=thumb_path,
                     progress=upload_progress,
                 )
-        else:
+        elif input_file is None:
             sent = await app.send_document(
                 chat_id=message.chat.id,
                 document=path,
@@ -167,64 +384,46 @@ async def upload_with_thumb_and_progress(
         # ==============================
         #   POST-UPLOAD: SAMPLE + SCREENSHOTS
         # ==============================
-        if sent and is_video_ext(path):
-
-            # -------- SAMPLE CLIP --------
-            if user.get("send_sample"):
-                sample_duration = int(user.get("sample_duration") or 15)
-                sample_path = f"/tmp/sample_{user_id}.mp4"
-
-                print("[DEBUG] Generating sample:", sample_path)
-                sample = generate_sample_clip(path, sample_path, sample_duration)
-
-                if sample and os.path.exists(sample_path):
-                    try:
-                        await app.send_video(
-                            chat_id=message.chat.id,
-                            video=sample_path,
-                            caption=f"🎬 Sample clip ({sample_duration}s)",
-                            thumb=thumb_path,
-                            supports_streaming=True,
+        if sent and sample_task is not None:
+            sample = await sample_task
+            if sample and os.path.exists(sample_path):
+                try:
+                    await app.send_video(
+                        chat_id=message.chat.id,
+                        video=sample_path,
+                        caption=f"🎬 Sample clip ({sample_duration}s)",
+                        thumb=thumb_path,
+                        supports_streaming=True,
+                        has_spoiler=spoiler_flag,
+                    )
+                except Exception as e:
+                    print("Sample send error:", e)
+
+        if sent and shots_task is not None:
+            shots = await shots_task
+            if shots:
+                media = []
+                for i, s in enumerate(shots):
+                    media.append(
+                        InputMediaPhoto(
+                            s,
+                            caption="📸 Video screenshots" if i == 0 else None,
                             has_spoiler=spoiler_flag,
                         )
-                    except Exception as e:
-                        print("Sample send error:", e)
-                    finally:
-                        try:
-                            os.remove(sample_path)
-                        except Exception:
-                            pass
-
-            # -------- SCREENSHOTS --------
-            if user.get("send_screenshots"):
-                from_dir = f"/tmp/screens_{user_id}"
-                print("[DEBUG] Generating screenshots:", from_dir)
-
-                shots = generate_screenshots(path, out_dir=from_dir, count=6)
-                if shots:
-                    media = []
-                    for i, s in enumerate(shots):
-                        media.append(
-                            InputMediaPhoto(
-                                s,
-                                caption="📸 Video screenshots" if i == 0 else None,
-                                has_spoiler=spoiler_flag,
-                            )
+                    )
+                try:
+                    if len(shots) == 1:
+                        # contact sheet (media group me kam se kam 2 chahiye)
+                        await app.send_photo(
+                            message.chat.id,
+                            shots[0],
+                            caption="📸 Video screenshots",
+                            has_spoiler=spoiler_flag,
                         )
-                    try:
+                    else:
                         await app.send_media_group(message.chat.id, media)
-                    except Exception as e:
-                        print("Screenshot send error:", e)
-                    finally:
-                        for s in shots:
-                            try:
-                                os.remove(s)
-                            except Exception:
-                                pass
-                        try:
-                            os.rmdir(from_dir)
-                        except Exception:
-                            pass
+                except Exception as e:
+                    print("Screenshot send error:", e)
 
         # ==============================
         #   STATS
@@ -236,27 +435,41 @@ async def upload_with_thumb_and_progress(
             f"✅ Upload complete\n📦 Size: {human_readable(file_size)}"
         )
 
+        stored = sent
         if LOG_CHANNEL and sent:
             try:
-                await app.copy_message(
+                stored = await app.copy_message(
                     LOG_CHANNEL,
                     sent.chat.id,
                     sent.id
-                )
+                ) or sent
             except Exception:
                 pass
 
+        if source_url and sent:
+            remember_upload(
+                source_url,
+                fmt_id,
+                upload_type,
+                stored,
+                base_name,
+                file_size,
+                duration,
+                media_variant(user, final_name),
+            )
+
         return sent
 
     finally:
         # ==============================
         #   CLEANUP
         # ==============================
-        try:
-            if os.path.exists(path):
-                os.remove(path)
-        except Exception:
-            pass
+        # upload fail / cancel -> adhoore ffmpeg jobs band (file hatne se pehle)
+        await _drop_tasks(sample_task, shots_task)
+        _remove_artifacts(sample_path, shots_dir)
+
+        # sirf job ka link hat-ta hai; asli copy download store me rehti hai
+        download_store.discard(path)
 
         for p in [thumb_downloaded_path, job_thumb_path]:
             if p and os.path.exists(p):
@@ -272,3 +485,6 @@ async def upload_with_thumb_and_progress(
                 os.rmdir(auto_thumb_dir)
             except Exception:
                 pass
+
+        if own_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
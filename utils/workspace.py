@@ -0,0 +1,254 @@
+# utils/workspace.py
+import logging
+import os
+import shutil
+
+from utils.metrics import incr
+from config import WORKSPACE_DIR, WORKSPACE_MAX_MB, WORKSPACE_MIN_FREE_MB, NODE_ID
+
+# ==========================================
+#   PER-JOB WORKSPACES + DISK ADMISSION
+# ==========================================
+#
+# Pehle temp files fixed naamon pe bante the (/tmp/sample_<user>.mp4,
+# yt_thumb_<user>.jpg, cwd me file ka naam ...) – same user / same naam ke do
+# jobs ek dusre ki files overwrite kar dete. Ab har job ko
+#   WORKSPACE_DIR/<NODE_ID>/<job id>/
+# milta hai: downloaded file root me, thumbnail / sample / screenshots
+# `.tmp/` me (file naam kuch bhi ho, takraata nahi).
+#
+# Admission: job shuru hone se pehle uska expected size (x _RESERVE_FACTOR)
+# reserve hota hai. Chal rahe jobs ka bacha hua reserve + naya reserve
+#   - WORKSPACE_MAX_MB (total) se upar, ya
+#   - disk pe WORKSPACE_MIN_FREE_MB se kam free chhode
+# to job queue me hi rehta hai. Koi workspace active na ho to job hamesha
+# admit hota hai (warna ek bada job kabhi shuru hi na ho).
+#
+# Cleanup: job khatam -> release() poori directory hata deta hai. Node band
+# ho raha ho to detach() (files rehti hain, recovery wahi se resume karti
+# hai). Startup pe (aur har _SWEEP_INTERVAL) sweep() un directories ko hatata
+# hai jinka job ab queue / active me nahi (crash ke orphans) – apne node ke
+# saath un sibling node directories me bhi jinka heartbeat band hai (restart pe
+# hostname / NODE_ID badal gaya). Sibling sirf tab chhua jata hai jab usme
+# NODE_MARKER file ho (node root banate waqt likhi jati hai) – WORKSPACE_DIR
+# me koi aur directory (download store, source tree ...) kabhi nahi hatti.
+
+# remux / sample / thumbnails ke liye file size ke upar thoda extra
+_RESERVE_FACTOR = 1.2
+# size pata na ho to itna reserve
+_UNKNOWN_RESERVE = 256 * 1024 * 1024
+TMP_SUBDIR = ".tmp"
+# node root ki pehchaan (content = NODE_ID)
+NODE_MARKER = ".node"
+
+
+class WorkspaceFull(Exception):
+    """
+    Disk watermark / quota ki wajah se abhi naya job nahi.
+    """
+
+
+def _dir_bytes(path: str) -> int:
+    total = 0
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        total += _dir_bytes(entry.path)
+                    else:
+                        total += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return total
+
+
+def _sweep_dir(root: str, keep: set) -> tuple[int, int]:
+    dirs = freed = 0
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return 0, 0
+    for entry in entries:
+        if entry.name in keep:
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            freed += _dir_bytes(entry.path)
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            try:
+                freed += entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                continue
+        dirs += 1
+    return dirs, freed
+
+
+class Workspace:
+    def __init__(self, key: str, path: str, reserved: int):
+        self.key = key
+        self.path = path
+        self.reserved = reserved
+        self.peak = 0
+
+    @property
+    def tmp(self) -> str:
+        path = os.path.join(self.path, TMP_SUBDIR)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def usage(self) -> int:
+        used = _dir_bytes(self.path)
+        self.peak = max(self.peak, used)
+        return used
+
+
+class WorkspaceManager:
+    def __init__(self, root: str, max_bytes: int, min_free: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.min_free = min_free
+        self._active: dict[str, Workspace] = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, str(key))
+
+    def _ensure_root(self):
+        os.makedirs(self.root, exist_ok=True)
+        marker = os.path.join(self.root, NODE_MARKER)
+        if not os.path.exists(marker):
+            with open(marker, "w") as f:
+                f.write(os.path.basename(self.root))
+
+    @staticmethod
+    def reserve_for(expected: int) -> int:
+        return int((expected or _UNKNOWN_RESERVE) * _RESERVE_FACTOR)
+
+    # ----------------------- ADMISSION ----------------------- #
+
+    def refusal(self, expected: int) -> str | None:
+        """
+        None = expected bytes ka job abhi shuru ho sakta hai, warna wajah.
+        """
+        if not self._active:
+            return None
+        need = self.reserve_for(expected)
+        usage = {k: ws.usage() for k, ws in self._active.items()}
+        outstanding = sum(
+            max(0, ws.reserved - usage[k]) for k, ws in self._active.items()
+        )
+        if self.max_bytes > 0 and sum(usage.values()) + outstanding + need > self.max_bytes:
+            return "workspace quota"
+        self._ensure_root()
+        free = shutil.disk_usage(self.root).free
+        if free - outstanding - need < self.min_free:
+            return "disk watermark"
+        return None
+
+    def open(self, key, expected: int = 0, force: bool = False) -> Workspace:
+        """
+        Job ka workspace (pehle se ho – recovery – to wahi). force=True admission
+        check skip karta hai (caller ne abhi refusal() dekha ho).
+        """
+        key = str(key)
+        ws = self._active.get(key)
+        if ws is not None:
+            return ws
+        if not force:
+            reason = self.refusal(expected)
+            if reason is not None:
+                incr("workspace.refused")
+                raise WorkspaceFull(reason)
+        self._ensure_root()
+        path = self._path(key)
+        os.makedirs(path, exist_ok=True)
+        ws = Workspace(key, path, self.reserve_for(expected))
+        self._active[key] = ws
+        return ws
+
+    def get(self, key) -> Workspace | None:
+        return self._active.get(str(key))
+
+    # ----------------------- CLEANUP ----------------------- #
+
+    def release(self, key) -> int:
+        """
+        Workspace ki saari files hatao. Returns job ka peak disk usage.
+        """
+        key = str(key)
+        ws = self._active.pop(key, None)
+        peak = 0
+        if ws is not None:
+            ws.usage()
+            peak = ws.peak
+            incr("workspace.bytes", peak)
+        shutil.rmtree(self._path(key), ignore_errors=True)
+        return peak
+
+    def detach(self, key):
+        """
+        Accounting se hatao lekin files rehne do (restart ke baad resume).
+        """
+        self._active.pop(str(key), None)
+
+    def sweep(self, keep: set, live_nodes: set | None = None) -> tuple[int, int]:
+        """
+        `keep` (queued / active job ids) ke alawa saare workspaces hatao.
+        live_nodes diya ho to WORKSPACE_DIR ke un sibling node directories ko
+        bhi saaf karo jinka node zinda nahi (hostname badla / node hata) –
+        sirf NODE_MARKER wali directories; unke live jobs ki directories
+        rehti hain (checkpoint resume).
+        Returns (directories, bytes).
+        """
+        keep = {str(k) for k in keep} | set(self._active) | {NODE_MARKER}
+        dirs, freed = _sweep_dir(self.root, keep)
+        if live_nodes is not None:
+            parent = os.path.dirname(self.root)
+            own = os.path.basename(self.root)
+            try:
+                siblings = [
+                    e.path for e in os.scandir(parent)
+                    if e.is_dir(follow_symlinks=False)
+                    and e.name != own and e.name not in live_nodes
+                    and os.path.isfile(os.path.join(e.path, NODE_MARKER))
+                ]
+            except OSError:
+                siblings = []
+            for node_dir in siblings:
+                d, b = _sweep_dir(node_dir, keep)
+                dirs, freed = dirs + d, freed + b
+                try:
+                    # sirf marker bacha ho tabhi node directory hatao
+                    if os.listdir(node_dir) == [NODE_MARKER]:
+                        os.remove(os.path.join(node_dir, NODE_MARKER))
+                        os.rmdir(node_dir)
+                except OSError:
+                    pass
+        if dirs:
+            logging.info("🧹 workspace sweep: %s orphan(s), %s bytes", dirs, freed)
+            incr("workspace.swept", dirs)
+        return dirs, freed
+
+    def stats(self) -> dict:
+        usage = {k: ws.usage() for k, ws in self._active.items()}
+        try:
+            free = shutil.disk_usage(self.root).free
+        except OSError:
+            free = 0
+        return {
+            "active": len(self._active),
+            "used": sum(usage.values()),
+            "reserved": sum(ws.reserved for ws in self._active.values()),
+            "free": free,
+            "jobs": {k: (usage[k], ws.peak) for k, ws in self._active.items()},
+        }
+
+
+workspaces = WorkspaceManager(
+    os.path.join(WORKSPACE_DIR, NODE_ID),
+    WORKSPACE_MAX_MB * 1024 * 1024,
+    WORKSPACE_MIN_FREE_MB * 1024 * 1024,
+)